@@ -0,0 +1,46 @@
+"""
+Profil de déploiement ASGI : gunicorn gère les processus, uvicorn sert chaque worker.
+
+    gunicorn registre_national.asgi:application -c deploiement/gunicorn_asgi.conf.py
+
+Équivalent sans gunicorn (pas de remplacement automatique d'un worker tombé) :
+
+    uvicorn registre_national.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+Sous ASGI, les vues de consultation (recherche, fiche, acte, statistiques) sont
+asynchrones : cache et middlewares ne mobilisent pas de thread. L'ORM asynchrone de
+Django exécute toutefois chaque requête SQL dans un thread (sync_to_async) ; les vues
+d'écriture, synchrones, passent entièrement par ce chemin. Le gain porte donc sur les
+attentes hors base, pas sur le débit SQLite.
+
+Points d'attention :
+- SQLite n'accepte qu'un écrivain à la fois, quel que soit le nombre de workers : garder
+  peu de workers par machine, et servir les lectures par les répliques
+  (REGISTRE_DB_REPLIQUES, voir personnes.routage).
+- Garder CONN_MAX_AGE à 0 (valeur par défaut) : sous ASGI les connexions sont liées aux
+  threads de sync_to_async et ne sont pas réutilisées d'une requête à l'autre.
+- Les métriques (/metriques/) sont propres à chaque worker : Prometheus doit agréger.
+
+Variables d'environnement : REGISTRE_BIND (défaut 0.0.0.0:8000), REGISTRE_WORKERS
+(défaut : nombre de cœurs), plus celles du registre (REGISTRE_DB_CHEMIN, ...).
+"""
+import multiprocessing
+import os
+
+wsgi_app = "registre_national.asgi:application"
+bind = os.environ.get("REGISTRE_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("REGISTRE_WORKERS", multiprocessing.cpu_count()))
+
+# Un worker bloqué au-delà de timeout est remplacé ; arrêt propre en graceful_timeout
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recyclage périodique des workers (dérive mémoire des caches locaux), étalé dans le temps
+max_requests = 10000
+max_requests_jitter = 1000
+
+raw_env = ["DJANGO_SETTINGS_MODULE=registre_national.settings"]
+accesslog = "-"
+errorlog = "-"
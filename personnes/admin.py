@@ -1,9 +1,96 @@
+"""
+Admin du registre, utilisable sur des tables de plusieurs millions de lignes :
+- objets liés joints dans la requête de la liste (list_select_related), jamais chargés ligne par ligne ;
+- total estimé au lieu d'un COUNT(*) exact (PaginateurEstime) ;
+- date_hierarchy et tris sur des colonnes indexées ;
+- recherche par préfixe sur les colonnes normalisées indexées (personnes.recherche), sans icontains ;
+- clés étrangères en saisie d'identifiant (raw_id_fields) : pas de liste déroulante de tout le registre.
+"""
+import re
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
 from .models import Personne, ActeNaissance, JournalAudit
+from .pagination import compter_avec_plafond
+from .recherche import filtre_prefixe, normaliser
+from . import statistiques
+
+
+def total_estime(modele):
+    """
+    Nombre de lignes d'une table, sans la parcourir : totaux tenus par personnes.statistiques
+    pour Personne et ActeNaissance, étendue des identifiants pour les autres
+    (surestime seulement en cas de trous, ex. lignes supprimées au milieu de la table).
+    """
+    if modele is Personne:
+        return statistiques.lire().total_citoyens
+    if modele is ActeNaissance:
+        return statistiques.lire().total_actes
+    # Deux lectures d'index : SQLite n'optimise pas MIN() et MAX() réunis dans une même requête
+    identifiants = modele._default_manager.values_list("pk", flat=True)
+    haut = identifiants.order_by("-pk").first()
+    return haut - identifiants.order_by("pk").first() + 1 if haut is not None else 0
+
+
+class PaginateurEstime(Paginator):
+    """
+    Paginator de l'admin : liste complète -> total estimé ; liste filtrée ou recherche ->
+    comptage arrêté à REGISTRE_ADMIN_PLAFOND_COMPTAGE (les pages au-delà ne sont pas proposées).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return total_estime(queryset.model)
+        nombre, _ = compter_avec_plafond(queryset, settings.REGISTRE_ADMIN_PLAFOND_COMPTAGE)
+        return nombre
+
+
+def filtre_personnes(terme):
+    """
+    Filtre d'un terme de recherche sur Personne : préfixe du numéro national si le terme
+    est numérique, sinon préfixe du nom, du postnom ou du prénom normalisés.
+    """
+    chiffres = re.sub(r"\D", "", terme)
+    if chiffres and chiffres == re.sub(r"[\s-]", "", terme):
+        return filtre_prefixe("numero_national", chiffres)
+    valeur = normaliser(terme)
+    if not valeur:
+        return Q()
+    return (
+        filtre_prefixe("nom_normalise", valeur)
+        | filtre_prefixe("postnom_normalise", valeur)
+        | filtre_prefixe("prenom_normalise", valeur)
+    )
+
+
+class AdminGrandeEchelle(admin.ModelAdmin):
+    """
+    Réglages communs des listes du registre (voir la docstring du module).
+    Une sous-classe qui définit filtre_recherche(terme) -> Q remplace la recherche
+    standard de l'admin (search_fields) par ce filtre indexé.
+    """
+    paginator = PaginateurEstime
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        if not hasattr(self, "filtre_recherche"):
+            return super().get_search_results(request, queryset, search_term)
+        # Chaque mot doit correspondre (ET), comme la recherche standard de l'admin
+        for terme in search_term.split():
+            queryset = queryset.filter(self.filtre_recherche(terme))
+        return queryset, False
 
 
 @admin.register(Personne)
-class PersonneAdmin(admin.ModelAdmin):
+class PersonneAdmin(AdminGrandeEchelle):
     list_display = (
         "numero_national",
         "nom",
@@ -13,42 +100,67 @@ class PersonneAdmin(admin.ModelAdmin):
         "sexe",
         "type_enregistrement",
     )
-    search_fields = ("numero_national", "nom", "postnom", "prenom")
+    search_fields = ("numero_national", "nom_normalise", "postnom_normalise", "prenom_normalise")
+    search_help_text = "Numéro national ou début du nom, postnom ou prénom (accents et casse ignorés)."
     list_filter = ("type_enregistrement", "sexe")
-    ordering = ("nom", "postnom", "prenom")
+    date_hierarchy = "date_naissance"
+    raw_id_fields = ("pere", "mere")
+    # Index personne_ordre_alpha_idx ; l'id final évite le tri complémentaire sur -pk
+    ordering = ("nom", "postnom", "prenom", "id")
+
+    def filtre_recherche(self, terme):
+        return filtre_personnes(terme)
 
 
 @admin.register(ActeNaissance)
-class ActeNaissanceAdmin(admin.ModelAdmin):
+class ActeNaissanceAdmin(AdminGrandeEchelle):
     list_display = (
+        "numero_acte",
         "personne",
         "type_acte",
+        "lieu_etablissement",
         "date_etablissement",
     )
-    list_filter = ("type_acte", "date_etablissement")
-    search_fields = (
-        "personne__numero_national",
-        "personne__nom",
-        "personne__postnom",
-    )
-    ordering = ("-date_etablissement",)
+    list_select_related = ("personne",)
+    list_filter = ("type_acte",)
+    date_hierarchy = "date_etablissement"
+    search_fields = ("numero_acte", "personne__numero_national", "personne__nom_normalise")
+    search_help_text = "Numéro d'acte, numéro national ou début du nom du titulaire."
+    raw_id_fields = ("personne",)
+    ordering = ("-date_etablissement", "-id")
+
+    def filtre_recherche(self, terme):
+        if terme.upper().startswith("AN-"):
+            return filtre_prefixe("numero_acte", terme.upper())
+        return Q(personne__in=Personne.objects.filter(filtre_personnes(terme)))
 
 
 @admin.register(JournalAudit)
-class JournalAuditAdmin(admin.ModelAdmin):
+class JournalAuditAdmin(AdminGrandeEchelle):
     list_display = (
         "created_at",
         "user",
         "action",
         "personne",
-        "acte",
+        "numero_acte",
         "ip_address",
     )
-    list_filter = ("action", "created_at")
-    search_fields = (
-        "user__username",
-        "personne__numero_national",
-        "personne__nom",
-        "personne__postnom",
-    )
-    ordering = ("-created_at",)
+    list_select_related = ("user", "personne", "acte")
+    list_filter = ("action",)
+    date_hierarchy = "created_at"
+    search_fields = ("user__username", "personne__numero_national", "personne__nom_normalise")
+    search_help_text = "Nom d'utilisateur exact, numéro national ou début du nom de la personne."
+    raw_id_fields = ("user", "personne", "acte")
+    # Index audit_created_idx (l'id, clé primaire SQLite, termine chaque entrée d'index)
+    ordering = ("-created_at", "-id")
+
+    @admin.display(description="Acte", ordering="acte__numero_acte")
+    def numero_acte(self, entree):
+        return entree.acte.numero_acte if entree.acte else None
+
+    def filtre_recherche(self, terme):
+        # Sous-requêtes par identifiant : chaque branche du OU passe par un index du journal
+        return (
+            Q(user__in=get_user_model().objects.filter(username=terme))
+            | Q(personne__in=Personne.objects.filter(filtre_personnes(terme)))
+        )
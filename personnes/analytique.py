@@ -0,0 +1,248 @@
+"""
+Séries démographiques du registre, lues sur des agrégats précalculés.
+
+AgregatNaissances compte les personnes par jour de naissance, sexe, type d'enregistrement,
+type et lieu d'établissement de l'acte, avec le délai entre la naissance et l'établissement
+de l'acte (somme et répartition par tranche). Chaque écriture de Personne / ActeNaissance
+retire la contribution de la fiche à son ancienne clé et l'ajoute à la nouvelle, dans la
+même transaction (voir personnes.signals et personnes.lots).
+
+Les séries par jour, mois ou année (page Tendances, API) ne lisent que ces agrégats ;
+`manage.py rebuild_analytique` les recalcule depuis les tables sources.
+"""
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+
+from .models import Personne, AgregatNaissances
+
+DIMENSIONS = ("sexe", "type_enregistrement", "type_acte", "lieu_etablissement")
+CLE = ("jour", *DIMENSIONS)
+
+TRANCHES_DELAI = (
+    (30, "delai_moins_30j"),
+    (365, "delai_moins_1an"),
+    (5 * 365, "delai_moins_5ans"),
+    (None, "delai_5ans_et_plus"),
+)
+CHAMPS_TRANCHES = tuple(champ for _, champ in TRANCHES_DELAI)
+MESURES = ("naissances", "actes", "somme_delais_jours", *CHAMPS_TRANCHES)
+
+GRANULARITES = {
+    "jour": (F("jour"), "%Y-%m-%d"),
+    "mois": (TruncMonth("jour"), "%Y-%m"),
+    "annee": (TruncYear("jour"), "%Y"),
+}
+
+# Au-delà de ce nombre de clés, ajuster() groupe les écritures (lots d'import)
+SEUIL_EN_MASSE = 20
+TAILLE_PAQUET_JOURS = 500
+
+# Colonnes d'une fiche et de son acte, dans l'ordre des paramètres de contribution()
+CHAMPS_SOURCE = (
+    "date_naissance",
+    "sexe",
+    "type_enregistrement",
+    "acte_naissance__type_acte",
+    "acte_naissance__lieu_etablissement",
+    "acte_naissance__date_etablissement",
+)
+
+
+def tranche_delai(jours):
+    for limite, champ in TRANCHES_DELAI:
+        if limite is None or jours < limite:
+            return champ
+
+
+def contribution(date_naissance, sexe, type_enregistrement, type_acte=None, lieu_etablissement=None,
+                 date_etablissement=None):
+    """
+    (clé, mesures) d'une fiche dans les agrégats : une naissance, plus un acte et son délai
+    si la fiche en a un.
+    """
+    if not type_acte:
+        return (date_naissance, sexe, type_enregistrement, "", ""), {"naissances": 1}
+    delai = (date_etablissement - date_naissance).days
+    return (date_naissance, sexe, type_enregistrement, type_acte, lieu_etablissement), {
+        "naissances": 1,
+        "actes": 1,
+        "somme_delais_jours": delai,
+        tranche_delai(delai): 1,
+    }
+
+
+def contribution_personne(personne, acte=None):
+    """
+    Contribution d'une Personne, avec ou sans son acte (instances).
+    """
+    if acte is None:
+        return contribution(personne.date_naissance, personne.sexe, personne.type_enregistrement)
+    return contribution(
+        personne.date_naissance, personne.sexe, personne.type_enregistrement,
+        acte.type_acte, acte.lieu_etablissement, acte.date_etablissement,
+    )
+
+
+def contribution_valeurs(valeurs):
+    """
+    Contribution d'une fiche lue par values(*CHAMPS_SOURCE).
+    """
+    return contribution(*(valeurs[champ] for champ in CHAMPS_SOURCE))
+
+
+def deltas(ajouts=(), retraits=()):
+    """
+    {clé: {mesure: delta}} : contributions ajoutées moins contributions retirées.
+    Les mesures inchangées sont omises, ainsi que les clés sans aucun changement.
+    """
+    total = defaultdict(Counter)
+    for signe, contributions in ((1, ajouts), (-1, retraits)):
+        for cle, mesures in contributions:
+            for champ, valeur in mesures.items():
+                total[cle][champ] += signe * valeur
+    resultat = {}
+    for cle, mesures in total.items():
+        mesures = {champ: valeur for champ, valeur in mesures.items() if valeur}
+        if mesures:
+            resultat[cle] = mesures
+    return resultat
+
+
+def _ajuster_cle(cle, mesures):
+    agregat = AgregatNaissances.objects.filter(**dict(zip(CLE, cle)))
+    maj = {champ: F(champ) + valeur for champ, valeur in mesures.items()}
+    if agregat.update(**maj):
+        return
+    try:
+        with transaction.atomic():
+            AgregatNaissances.objects.create(**dict(zip(CLE, cle)), **mesures)
+    except IntegrityError:
+        # Un autre worker vient de créer la ligne
+        agregat.update(**maj)
+
+
+def _ajuster_en_masse(deltas):
+    """
+    Lots (imports) : lignes existantes repérées en une requête par paquet de jours puis
+    incrémentées par clé primaire, clés nouvelles insérées par bulk_create
+    (au lieu d'un UPDATE sans effet suivi d'un INSERT par clé).
+    """
+    jours = sorted({cle[0] for cle in deltas})
+    existantes = {}
+    for debut in range(0, len(jours), TAILLE_PAQUET_JOURS):
+        lignes = (
+            AgregatNaissances.objects.select_for_update()
+            .filter(jour__in=jours[debut:debut + TAILLE_PAQUET_JOURS])
+            .values_list("pk", *CLE)
+        )
+        existantes.update({tuple(cle): pk for pk, *cle in lignes})
+
+    for cle, mesures in deltas.items():
+        if cle in existantes:
+            AgregatNaissances.objects.filter(pk=existantes[cle]).update(
+                **{champ: F(champ) + valeur for champ, valeur in mesures.items()}
+            )
+    nouvelles = {cle: mesures for cle, mesures in deltas.items() if cle not in existantes}
+    try:
+        with transaction.atomic():
+            AgregatNaissances.objects.bulk_create(
+                [AgregatNaissances(**dict(zip(CLE, cle)), **mesures) for cle, mesures in nouvelles.items()],
+                batch_size=500,
+            )
+    except IntegrityError:
+        # Clé créée entre-temps par un autre worker : repli clé par clé
+        for cle, mesures in nouvelles.items():
+            _ajuster_cle(cle, mesures)
+
+
+def ajuster(deltas):
+    """
+    Applique les deltas aux agrégats dans la transaction de l'appelant : un UPDATE atomique
+    par clé (la ligne est créée si la clé n'existe pas encore), ou un passage groupé
+    au-delà de SEUIL_EN_MASSE clés.
+    """
+    if len(deltas) > SEUIL_EN_MASSE:
+        _ajuster_en_masse(deltas)
+        return
+    for cle, mesures in deltas.items():
+        _ajuster_cle(cle, mesures)
+
+
+def recalculer(taille_lot=5000):
+    """
+    Reconstruit tous les agrégats depuis Personne et ActeNaissance (lecture en flux,
+    une seule transaction) et retourne le nombre de lignes écrites.
+    """
+    sources = Personne.objects.values(*CHAMPS_SOURCE).iterator(chunk_size=taille_lot)
+    with transaction.atomic():
+        totaux = deltas(ajouts=(contribution_valeurs(valeurs) for valeurs in sources))
+        AgregatNaissances.objects.all().delete()
+        AgregatNaissances.objects.bulk_create(
+            [AgregatNaissances(**dict(zip(CLE, cle)), **mesures) for cle, mesures in totaux.items()],
+            batch_size=1000,
+        )
+    return len(totaux)
+
+
+def lire_parametres(parametres):
+    """
+    Paramètres d'une série depuis une requête GET : granularite, par (dimensions séparées
+    par des virgules), depuis, jusqua (AAAA-MM-JJ) et un filtre par dimension.
+    Lève ValueError avec un message lisible si un paramètre est invalide.
+    """
+    granularite = parametres.get("granularite") or "mois"
+    if granularite not in GRANULARITES:
+        raise ValueError(f"granularite : {', '.join(GRANULARITES)} attendu.")
+    par = tuple(filter(None, (parametres.get("par") or "").split(",")))
+    inconnues = set(par) - set(DIMENSIONS)
+    if inconnues:
+        raise ValueError(f"par : dimensions inconnues {', '.join(sorted(inconnues))}.")
+
+    bornes = {}
+    for nom in ("depuis", "jusqua"):
+        if parametres.get(nom):
+            try:
+                bornes[nom] = date.fromisoformat(parametres[nom])
+            except ValueError:
+                raise ValueError(f"{nom} : date AAAA-MM-JJ attendue.")
+    filtres = {dimension: parametres[dimension] for dimension in DIMENSIONS if dimension in parametres}
+    return {"granularite": granularite, "par": par, **bornes, "filtres": filtres}
+
+
+def series(granularite="mois", par=(), depuis=None, jusqua=None, filtres=None):
+    """
+    Une ligne par période et par combinaison des dimensions `par`, avec la somme des mesures.
+    Requête GROUP BY sur les agrégats seulement, jamais sur Personne / ActeNaissance.
+    `filtres` restreint les dimensions ({"sexe": "F"}, {"type_acte": ""} pour les fiches sans acte).
+    """
+    expression, _ = GRANULARITES[granularite]
+    queryset = AgregatNaissances.objects.filter(**(filtres or {}))
+    if depuis:
+        queryset = queryset.filter(jour__gte=depuis)
+    if jusqua:
+        queryset = queryset.filter(jour__lte=jusqua)
+    return (
+        queryset.values(*par, periode=expression)
+        .annotate(**{mesure: Sum(mesure) for mesure in MESURES})
+        .filter(naissances__gt=0)
+        .order_by("periode", *par)
+    )
+
+
+def mettre_en_forme(ligne, granularite):
+    """
+    Ligne de série prête pour le JSON ou le gabarit : période lisible, délai moyen des actes.
+    """
+    _, format_periode = GRANULARITES[granularite]
+    return {
+        "periode": ligne["periode"].strftime(format_periode),
+        **{dimension: ligne[dimension] for dimension in DIMENSIONS if dimension in ligne},
+        "naissances": ligne["naissances"],
+        "actes": ligne["actes"],
+        "delai_moyen_jours": round(ligne["somme_delais_jours"] / ligne["actes"], 1) if ligne["actes"] else None,
+        "delais": {champ: ligne[champ] for champ in CHAMPS_TRANCHES},
+    }
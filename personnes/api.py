@@ -0,0 +1,211 @@
+"""
+API JSON du registre destinée aux institutions partenaires et au ministère.
+
+Authentification : session Django ou HTTP Basic (comptes partenaires),
+avec la permission personnes.view_personne ; lots des bureaux hors ligne signés par HMAC.
+Le flux de changements (miroirs provinciaux) est lu avec les mêmes comptes.
+"""
+import base64
+import binascii
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.http import JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import Personne
+from .numerotation import nettoyer_numero_national, numero_national_valide
+from .audit import log_audit
+from .routage import lecture_seule
+from . import analytique, flux, synchronisation
+
+CHAMPS_IDENTITE = ("numero_national", "nom", "postnom", "prenom", "sexe", "date_naissance")
+
+
+def _authentifier(request):
+    """
+    (utilisateur, par_session) : utilisateur de la session, sinon celui de l'en-tête
+    Authorization: Basic ; (None, False) si aucun.
+    """
+    if request.user.is_authenticated:
+        return request.user, True
+
+    entete = request.META.get("HTTP_AUTHORIZATION", "")
+    methode, _, jeton = entete.partition(" ")
+    if methode.lower() != "basic" or not jeton:
+        return None, False
+    try:
+        identifiant, _, mot_de_passe = base64.b64decode(jeton).decode().partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return None, False
+    user = authenticate(request, username=identifiant, password=mot_de_passe)
+    if user is not None:
+        request.user = user
+    return user, False
+
+
+def _refus_csrf(request):
+    """
+    Contrôle CSRF de CsrfViewMiddleware : réponse de refus, ou None si la requête passe
+    (méthodes sûres comprises).
+    """
+    controle = CsrfViewMiddleware(lambda request: None)
+    controle.process_request(request)
+    return controle.process_view(request, None, (), {})
+
+
+def _erreur(message, statut):
+    reponse = JsonResponse({"erreur": message}, status=statut)
+    if statut == 401:
+        reponse["WWW-Authenticate"] = 'Basic realm="registre-national"'
+    return reponse
+
+
+def api_protegee(vue):
+    """
+    Authentification session/Basic + permission de consultation du registre.
+    Pas de jeton CSRF pour les appels Basic des serveurs partenaires ; un appel avec la
+    session (navigateur d'un agent) passe le contrôle CSRF habituel.
+    """
+    @csrf_exempt
+    @wraps(vue)
+    def enveloppe(request, *args, **kwargs):
+        user, par_session = _authentifier(request)
+        if user is None:
+            return _erreur("Authentification requise.", 401)
+        if par_session and _refus_csrf(request) is not None:
+            return _erreur("Jeton CSRF manquant ou invalide.", 403)
+        if not user.has_perm("personnes.view_personne"):
+            return _erreur("Permission personnes.view_personne requise.", 403)
+        return vue(request, *args, **kwargs)
+
+    return enveloppe
+
+
+@api_protegee
+@require_POST
+def verification_identites(request):
+    """
+    Vérification en lot : {"numeros_nationaux": ["25120900114", ...]}
+
+    Les numéros mal formés (format, date, clé mod 97) sont rejetés sans requête ;
+    les autres sont résolus par une seule requête IN. La réponse est diffusée en flux,
+    dans l'ordre de la demande, avec une seule entrée au journal d'audit.
+    """
+    try:
+        corps = json.loads(request.body)
+        saisies = corps["numeros_nationaux"]
+        if not isinstance(saisies, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return _erreur('Corps JSON attendu : {"numeros_nationaux": [...]}', 400)
+
+    maximum = settings.REGISTRE_API_VERIFICATION_MAX
+    if len(saisies) > maximum:
+        return _erreur(f"Au plus {maximum} numéros par requête.", 413)
+
+    numeros = [nettoyer_numero_national(saisie) for saisie in saisies]
+    valides = {numero for numero in numeros if numero_national_valide(numero)}
+    trouves = {
+        identite["numero_national"]: identite
+        for identite in Personne.objects.filter(numero_national__in=valides).values(*CHAMPS_IDENTITE)
+    } if valides else {}
+
+    nb_invalides = sum(1 for numero in numeros if numero not in valides)
+    nb_trouves = sum(1 for numero in numeros if numero in trouves)
+    log_audit(
+        request,
+        action="VERIFICATION_LOT",
+        details=f"{len(numeros)} numéros demandés : {nb_trouves} trouvés, {nb_invalides} invalides",
+    )
+
+    def flux():
+        yield json.dumps({"demandes": len(numeros), "trouves": nb_trouves, "invalides": nb_invalides})[:-1]
+        yield ', "resultats": ['
+        for indice, numero in enumerate(numeros):
+            if numero not in valides:
+                resultat = {"numero_national": numero, "statut": "INVALIDE"}
+            elif numero in trouves:
+                identite = dict(trouves[numero], date_naissance=trouves[numero]["date_naissance"].isoformat())
+                resultat = {"statut": "TROUVE", **identite}
+            else:
+                resultat = {"numero_national": numero, "statut": "INCONNU"}
+            yield ("," if indice else "") + json.dumps(resultat, ensure_ascii=False)
+        yield "]}"
+
+    return StreamingHttpResponse(flux(), content_type="application/json")
+
+
+@api_protegee
+@require_GET
+@lecture_seule
+def series_naissances(request):
+    """
+    Séries démographiques : ?granularite=jour|mois|annee&par=sexe,type_acte&depuis=AAAA-MM-JJ
+    &jusqua=AAAA-MM-JJ, plus un filtre par dimension (ex. &type_acte=TARDIF).
+
+    Lues sur les agrégats précalculés (personnes.analytique), jamais sur les tables du registre ;
+    au plus REGISTRE_ANALYTIQUE_LIGNES_MAX lignes par réponse.
+    """
+    try:
+        parametres = analytique.lire_parametres(request.GET)
+    except ValueError as erreur:
+        return _erreur(str(erreur), 400)
+
+    maximum = settings.REGISTRE_ANALYTIQUE_LIGNES_MAX
+    lignes = list(analytique.series(**parametres)[:maximum + 1])
+    if len(lignes) > maximum:
+        return _erreur(f"Plus de {maximum} lignes : restreindre la période, la granularité ou les dimensions.", 400)
+
+    granularite = parametres["granularite"]
+    return JsonResponse({
+        "granularite": granularite,
+        "par": list(parametres["par"]),
+        "series": [analytique.mettre_en_forme(ligne, granularite) for ligne in lignes],
+    }, json_dumps_params={"ensure_ascii": False})
+
+
+@csrf_exempt
+@require_POST
+def synchronisation_bureau(request):
+    """
+    Lot d'enregistrements d'un bureau hors ligne (voir personnes.synchronisation).
+
+    En-têtes X-Registre-Bureau et X-Registre-Signature (HMAC-SHA256 du corps avec la clé
+    du bureau) ; pas de session ni de jeton CSRF. Réponse : correspondances id_client -> fiche.
+    """
+    bureau = request.headers.get("X-Registre-Bureau", "")
+    if not synchronisation.verifier_signature(bureau, request.headers.get("X-Registre-Signature", ""), request.body):
+        return _erreur("Bureau inconnu ou signature du lot invalide.", 403)
+    try:
+        lot = synchronisation.lire_lot(request.body)
+        bilan = synchronisation.synchroniser(bureau, lot, request=request)
+    except synchronisation.ErreurSynchronisation as erreur:
+        if erreur.erreurs:
+            return JsonResponse({"erreur": erreur.message, "erreurs": erreur.erreurs}, status=erreur.statut)
+        return _erreur(erreur.message, erreur.statut)
+    return JsonResponse(bilan, json_dumps_params={"ensure_ascii": False})
+
+
+@api_protegee
+@require_GET
+def flux_changements(request):
+    """
+    Flux de changements des miroirs provinciaux : ?curseur=...&limite=1000, et
+    ?modifie_depuis=AAAA-MM-JJ[THH:MM:SS] au premier appel (voir personnes.flux).
+    Réponse : changements de la page, curseur de la suivante, « fin » quand tout est lu.
+    Lu sur la primaire : une réplique en retard de plus de REGISTRE_FLUX_RECUL ferait
+    sauter au curseur des séquences qu'elle n'a pas encore reçues.
+    """
+    limite = request.GET.get("limite")
+    if limite and not limite.isdigit():
+        return _erreur("limite : entier attendu.", 400)
+    try:
+        page = flux.page(request.GET.get("curseur"), int(limite or 0), request.GET.get("modifie_depuis"))
+    except ValueError as erreur:
+        return _erreur(str(erreur), 400)
+    return JsonResponse(page, json_dumps_params={"ensure_ascii": False})
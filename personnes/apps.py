@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PersonnesConfig(AppConfig):
     name = 'personnes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,162 @@
+"""
+Archivage du journal d'audit dans des fichiers JSONL compressés et vérifiables.
+
+Chaque archive est un fichier `journal_audit_<debut>_<fin>_<horodatage>.jsonl.gz`
+accompagné d'un manifeste `.json` (nombre d'entrées, bornes d'identifiants et de dates,
+empreinte SHA-256 du fichier compressé). Les archives se consultent sans les réimporter.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import JournalAudit
+
+CHAMPS_ARCHIVES = (
+    "id",
+    "created_at",
+    "user_id",
+    "user__username",
+    "action",
+    "personne_id",
+    "personne__numero_national",
+    "acte_id",
+    "acte__numero_acte",
+    "ip_address",
+    "user_agent",
+    "details",
+)
+
+
+class ArchiveCorrompue(Exception):
+    pass
+
+
+def empreinte_fichier(chemin):
+    sha = hashlib.sha256()
+    with open(chemin, "rb") as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b""):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def _ligne_archive(valeurs):
+    entree = {champ.replace("__", "_"): valeurs[champ] for champ in CHAMPS_ARCHIVES}
+    entree["created_at"] = valeurs["created_at"].isoformat()
+    return json.dumps(entree, ensure_ascii=False) + "\n"
+
+
+def archiver(avant, dossier, taille_lot=5000, progression=None):
+    """
+    Déplace les entrées antérieures à `avant` dans une nouvelle archive de `dossier`.
+
+    Les entrées sont lues par lots (pagination sur l'id), écrites puis vérifiées ;
+    elles ne sont supprimées de la table qu'une fois l'archive complète et son empreinte
+    contrôlée. Retourne le manifeste, ou None s'il n'y avait rien à archiver.
+    """
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    horodatage = timezone.now().strftime("%Y%m%dT%H%M%S")
+    partiel = dossier / f"journal_audit_{horodatage}.jsonl.gz.partiel"
+
+    qs = JournalAudit.objects.filter(created_at__lt=avant).order_by("id")
+    manifeste = {"nombre": 0, "premier_id": None, "dernier_id": None}
+    dernier_id = 0
+    date_min = date_max = None
+
+    with gzip.open(partiel, "wt", encoding="utf-8") as sortie:
+        while True:
+            lot = list(qs.filter(id__gt=dernier_id).values(*CHAMPS_ARCHIVES)[:taille_lot])
+            if not lot:
+                break
+            for valeurs in lot:
+                sortie.write(_ligne_archive(valeurs))
+            dates = [valeurs["created_at"] for valeurs in lot]
+            date_min = min(dates + ([date_min] if date_min else []))
+            date_max = max(dates + ([date_max] if date_max else []))
+            dernier_id = lot[-1]["id"]
+            manifeste["premier_id"] = manifeste["premier_id"] or lot[0]["id"]
+            manifeste["dernier_id"] = dernier_id
+            manifeste["nombre"] += len(lot)
+            if progression:
+                progression(manifeste["nombre"])
+
+    if not manifeste["nombre"]:
+        partiel.unlink()
+        return None
+
+    # Contrôle de l'archive avant toute suppression
+    nom = f"journal_audit_{manifeste['premier_id']}_{manifeste['dernier_id']}_{horodatage}.jsonl.gz"
+    archive = dossier / nom
+    os.replace(partiel, archive)
+    manifeste.update({
+        "fichier": nom,
+        "avant": avant.isoformat(),
+        "date_min": date_min.isoformat(),
+        "date_max": date_max.isoformat(),
+        "sha256": empreinte_fichier(archive),
+    })
+    relues = sum(1 for _ in _lire_fichier(archive))
+    if relues != manifeste["nombre"]:
+        raise ArchiveCorrompue(f"{nom} : {relues} entrées relues pour {manifeste['nombre']} écrites")
+    (dossier / f"{nom}.json").write_text(json.dumps(manifeste, indent=2))
+
+    # Suppression par tranches d'identifiants, bornée au seuil de date
+    debut = manifeste["premier_id"]
+    while debut <= manifeste["dernier_id"]:
+        fin = debut + taille_lot
+        with transaction.atomic():
+            JournalAudit.objects.filter(
+                id__gte=debut, id__lt=fin, id__lte=manifeste["dernier_id"], created_at__lt=avant
+            ).delete()
+        debut = fin
+
+    return manifeste
+
+
+def _lire_fichier(chemin):
+    with gzip.open(chemin, "rt", encoding="utf-8") as fichier:
+        for ligne in fichier:
+            yield json.loads(ligne)
+
+
+def manifestes(dossier):
+    for chemin in sorted(Path(dossier).glob("journal_audit_*.jsonl.gz.json")):
+        yield json.loads(chemin.read_text())
+
+
+def rechercher(dossier, action=None, utilisateur=None, numero_national=None, depuis=None, jusqua=None, verifier=True):
+    """
+    Parcourt les archives en flux et retourne les entrées correspondant aux critères.
+
+    Les manifestes permettent d'écarter les fichiers hors de l'intervalle [depuis, jusqua]
+    sans les ouvrir. Avec `verifier`, l'empreinte de chaque fichier ouvert est contrôlée
+    (ArchiveCorrompue en cas d'écart).
+    """
+    for manifeste in manifestes(dossier):
+        if depuis and datetime.fromisoformat(manifeste["date_max"]) < depuis:
+            continue
+        if jusqua and datetime.fromisoformat(manifeste["date_min"]) > jusqua:
+            continue
+
+        chemin = Path(dossier) / manifeste["fichier"]
+        if verifier and empreinte_fichier(chemin) != manifeste["sha256"]:
+            raise ArchiveCorrompue(f"Empreinte SHA-256 invalide : {chemin}")
+
+        for entree in _lire_fichier(chemin):
+            if action and entree["action"] != action:
+                continue
+            if utilisateur and entree["user_username"] != utilisateur:
+                continue
+            if numero_national and entree["personne_numero_national"] != numero_national:
+                continue
+            if depuis or jusqua:
+                date = datetime.fromisoformat(entree["created_at"])
+                if (depuis and date < depuis) or (jusqua and date > jusqua):
+                    continue
+            yield entree
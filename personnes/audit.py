@@ -1,17 +1,137 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
 from .models import JournalAudit
 
+logger = logging.getLogger(__name__)
+
+
+class TamponAudit:
+    """
+    File d'attente en mémoire des entrées d'audit, vidée par un thread de fond
+    avec bulk_create dès que `taille_lot` entrées attendent ou toutes les `intervalle` secondes.
+
+    Le thread démarre à la première entrée (donc dans le worker, après un éventuel fork).
+    Les entrées restantes sont écrites à l'arrêt du processus (atexit) ; un hook
+    gunicorn `worker_exit` peut aussi appeler vider_tampon_audit().
+    """
+
+    def __init__(self):
+        self._file = queue.SimpleQueue()
+        self._reveil = threading.Event()
+        self._verrou_vidage = threading.Lock()
+        self._verrou_demarrage = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def taille_lot(self):
+        return getattr(settings, "REGISTRE_AUDIT_TAMPON_TAILLE", 200)
+
+    @property
+    def intervalle(self):
+        return getattr(settings, "REGISTRE_AUDIT_TAMPON_INTERVALLE", 2.0)
+
+    def ajouter(self, entree):
+        self._demarrer()
+        self._file.put(entree)
+        if self._file.qsize() >= self.taille_lot:
+            self._reveil.set()
+
+    def _demarrer(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._verrou_demarrage:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Processus enfant issu d'un fork : la file héritée appartient au parent
+                self._file = queue.SimpleQueue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._boucle, name="tampon-audit", daemon=True)
+            self._thread.start()
+
+    def _boucle(self):
+        while True:
+            self._reveil.wait(self.intervalle)
+            self._reveil.clear()
+            self.vider()
+
+    def vider(self):
+        """
+        Écrit toutes les entrées en attente. Retourne le nombre d'entrées écrites.
+        """
+        with self._verrou_vidage:
+            lot = []
+            while True:
+                try:
+                    lot.append(self._file.get_nowait())
+                except queue.Empty:
+                    break
+            if not lot:
+                return 0
+            try:
+                JournalAudit.objects.bulk_create(lot, batch_size=self.taille_lot)
+            except Exception:
+                # Ne jamais perdre une entrée en silence : elles sont tracées dans les logs
+                logger.exception(
+                    "Échec d'écriture de %d entrées d'audit : %s",
+                    len(lot),
+                    [(e.action, e.personne_id, e.acte_id, e.user_id, e.created_at.isoformat()) for e in lot],
+                )
+                return 0
+            finally:
+                if threading.current_thread() is self._thread:
+                    close_old_connections()
+            return len(lot)
+
+
+_tampon = TamponAudit()
+atexit.register(_tampon.vider)
+
+
+def vider_tampon_audit():
+    """
+    Force l'écriture des entrées d'audit en attente (arrêt de worker, tests).
+    """
+    return _tampon.vider()
+
+
+def _mode_tampon(strict):
+    if strict is not None:
+        return not strict
+    return getattr(settings, "REGISTRE_AUDIT_MODE", "strict") == "tampon"
+
+
 def _get_client_ip(request):
     xff = request.META.get("HTTP_X_FORWARDED_FOR")
     if xff:
         return xff.split(",")[0].strip()
     return request.META.get("REMOTE_ADDR")
 
-def log_audit(request, action, personne=None, acte=None, details=""):
+def _contexte_requete(request):
     user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
     ip = _get_client_ip(request) if request else None
     ua = request.META.get("HTTP_USER_AGENT", "") if request else ""
+    return user, ip, ua
+
+def log_audit(request, action, personne=None, acte=None, details="", strict=None):
+    """
+    Enregistre une entrée d'audit.
 
-    JournalAudit.objects.create(
+    - mode strict (par défaut) : INSERT immédiat, dans la transaction de l'appelant
+    - mode tampon (REGISTRE_AUDIT_MODE = "tampon") : l'entrée est mise en file après le commit
+      et écrite par lots en arrière-plan. `strict=True` force l'écriture immédiate
+      pour une action donnée.
+    """
+    user, ip, ua = _contexte_requete(request)
+    entree = JournalAudit(
         user=user,
         action=action,
         personne=personne,
@@ -20,3 +140,31 @@ def log_audit(request, action, personne=None, acte=None, details=""):
         user_agent=ua,
         details=details or "",
     )
+
+    if _mode_tampon(strict):
+        # Pas d'entrée pour une écriture annulée ; l'horodatage reste celui de l'action
+        transaction.on_commit(lambda: _tampon.ajouter(entree))
+    else:
+        entree.save()
+
+def log_audit_lot(request, action, personnes, actes=None, details="", user=None):
+    """
+    Une entrée d'audit par personne, écrites en un seul bulk_create (imports, lots).
+    `actes` est soit None, soit une liste alignée sur `personnes`.
+    """
+    user_requete, ip, ua = _contexte_requete(request)
+    user = user or user_requete
+    actes = actes or [None] * len(personnes)
+
+    JournalAudit.objects.bulk_create([
+        JournalAudit(
+            user=user,
+            action=action,
+            personne=personne,
+            acte=acte,
+            ip_address=ip,
+            user_agent=ua,
+            details=details or "",
+        )
+        for personne, acte in zip(personnes, actes)
+    ])
@@ -0,0 +1,331 @@
+"""
+Banc d'essai du registre : données synthétiques reproductibles et mesures de latence.
+
+Les fiches sont tirées d'un générateur pseudo-aléatoire à graine fixe, avec des
+distributions de noms congolais pondérées (quelques noms très fréquents, une longue
+traîne de noms rares), pour que les recherches et les blocs de doublons ressemblent
+à ceux du registre réel. Les scénarios passent par le client de test Django : chaque
+mesure couvre la pile complète (middlewares, vue, requêtes, gabarit).
+"""
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .lots import enregistrer_lot
+from .models import Personne
+
+# Noms de famille par fréquence décroissante ; le poids suit une loi de Zipf
+NOMS = [
+    "Kabongo", "Mbuyi", "Ilunga", "Tshibangu", "Kalala", "Mukendi", "Kasongo", "Ngoy",
+    "Mulamba", "Kabeya", "Tshimanga", "Mwamba", "Lukusa", "Kazadi", "Banza", "Nkulu",
+    "Mutombo", "Kalonji", "Ngalula", "Tshisekedi", "Kanku", "Mpoyi", "Ntumba", "Makengo",
+    "Lumbala", "Kitenge", "Mbala", "Nzuzi", "Lusamba", "Bokele", "Mayala", "Mafuta",
+    "Nsimba", "Luzolo", "Kiese", "Makiese", "Bolamba", "Likulia", "Bosenge", "Ekofo",
+    "Lokwa", "Mbemba", "Bangala", "Kambale", "Kahindo", "Muhindo", "Paluku", "Kasereka",
+    "Masika", "Mumbere", "Bahati", "Mapendo", "Amisi", "Lumumba", "Kapinga", "Mbombo",
+]
+POSTNOMS = [
+    "Kalala", "Mukendi", "Kabasele", "Tshilombo", "Mulumba", "Kanyinda", "Badibanga",
+    "Kabamba", "Musau", "Nyembo", "Lubaki", "Wa Kabongo", "Bin Amisi", "Mbuyamba", "Kayembe",
+    "Ngandu", "Tumba", "Matondo", "Nlandu", "Mavungu", "Kavira", "Kasoki", "Lokoka", "Esende",
+]
+PRENOMS_M = [
+    "Jean", "Joseph", "Pierre", "Patrick", "Emmanuel", "Jean-Pierre", "Christian", "Didier",
+    "Albert", "Papy", "Fiston", "Dieudonné", "Junior", "Blaise", "Trésor", "Glody",
+    "Héritier", "Christophe", "Félix", "Moïse", "Augustin", "Serge", "Gloire", "Jonathan",
+]
+PRENOMS_F = [
+    "Marie", "Grâce", "Esther", "Rachel", "Sarah", "Christine", "Joséphine", "Chantal",
+    "Jeanne", "Nathalie", "Mireille", "Béatrice", "Ruth", "Divine", "Merveille", "Exaucée",
+    "Gracia", "Naomie", "Bénédicte", "Déborah", "Solange", "Francine", "Annie", "Rebecca",
+]
+COMMUNES = ["Gombe", "Lingwala", "Kintambo", "Limete", "Matete", "Ngaliema", "Bandalungwa", "Lemba", "Masina"]
+
+TAILLES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+# Les dates de naissance couvrent 85 ans (préfixes AAMMJJ tous distincts), avec plus
+# de jeunes que d'âgés : même à 10 M de fiches, aucun préfixe n'approche 999 ordres.
+ETENDUE_AGES_JOURS = 85 * 365
+PART_ADULTES_MAJEURS = 0.5
+
+
+def lire_taille(valeur):
+    """
+    "10k", "1m", "10m" ou un entier.
+    """
+    valeur = str(valeur).lower()
+    if valeur in TAILLES:
+        return TAILLES[valeur]
+    return int(valeur.replace("_", ""))
+
+
+def _poids_zipf(n):
+    return [1 / rang for rang in range(1, n + 1)]
+
+
+class Generateur:
+    """
+    Tirages reproductibles de fiches citoyennes (même graine -> même suite de fiches).
+    """
+
+    def __init__(self, graine=42, reference=None):
+        self.aleatoire = random.Random(graine)
+        self.reference = reference or date(2025, 12, 31)
+        self._poids = {
+            "noms": _poids_zipf(len(NOMS)),
+            "postnoms": _poids_zipf(len(POSTNOMS)),
+            "prenoms": _poids_zipf(len(PRENOMS_M)),
+        }
+
+    def nom(self):
+        return self.aleatoire.choices(NOMS, self._poids["noms"])[0]
+
+    def prenom(self, sexe):
+        return self.aleatoire.choices(PRENOMS_M if sexe == "M" else PRENOMS_F, self._poids["prenoms"])[0]
+
+    def date_naissance(self, adulte=False):
+        # Densité décroissante avec l'âge ; les adultes recensés ont au moins 18 ans
+        minimum = 18 * 365 if adulte else 0
+        jours = int(self.aleatoire.triangular(minimum, ETENDUE_AGES_JOURS, minimum))
+        return self.reference - timedelta(days=jours)
+
+    def donnees(self, adulte=False, date_naissance=None):
+        """
+        Dictionnaire de champs PersonneForm (utilisable en POST ou pour créer un objet).
+        """
+        sexe = self.aleatoire.choice("MF")
+        nom = self.nom()
+        return {
+            "nom": nom,
+            "postnom": self.aleatoire.choices(POSTNOMS, self._poids["postnoms"])[0],
+            "prenom": self.prenom(sexe),
+            "sexe": sexe,
+            "date_naissance": date_naissance or self.date_naissance(adulte),
+            "nom_pere": nom,
+            "prenom_pere": self.prenom("M"),
+            "nom_mere": self.nom(),
+            "prenom_mere": self.prenom("F"),
+            "nationalite": "Congolaise",
+            "adresse_actuelle": f"{self.aleatoire.randint(1, 400)}, avenue {self.nom()}, "
+                                f"{self.aleatoire.choice(COMMUNES)}, Kinshasa",
+        }
+
+
+def naissances_par_jour(nombre, reference=date(2025, 12, 31)):
+    """
+    (date, effectif) du plus ancien au plus récent, pour `nombre` fiches au total.
+    La densité décroît linéairement avec l'âge (même profil que Generateur.date_naissance).
+    """
+    total_poids = ETENDUE_AGES_JOURS * (ETENDUE_AGES_JOURS + 1) / 2
+    cumul = 0.0
+    deja = 0
+    for age in range(ETENDUE_AGES_JOURS - 1, -1, -1):
+        cumul += nombre * (ETENDUE_AGES_JOURS - age) / total_poids
+        effectif = round(cumul) - deja
+        deja += effectif
+        if effectif:
+            yield reference - timedelta(days=age), effectif
+
+
+def peupler(nombre, graine=42, taille_lot=5000, progression=None):
+    """
+    Insère `nombre` personnes synthétiques par lots (enregistrer_lot), dans l'ordre des
+    dates de naissance : un lot ne touche que quelques préfixes AAMMJJ, donc quelques compteurs.
+    Les majeurs sont pour moitié recensés comme ADULTE (acte TARDIF une fois sur deux),
+    les autres fiches sont des naissances avec acte NORMAL ; une entrée d'audit par fiche.
+    Retourne la durée en secondes.
+    """
+    generateur = Generateur(graine)
+    majorite = generateur.reference - timedelta(days=18 * 365)
+    debut = time.perf_counter()
+    inserees = 0
+    lot = []
+
+    def inserer(lot):
+        groupes = {("NAISSANCE", "NORMAL"): [], ("ADULTE", "TARDIF"): [], ("ADULTE", None): []}
+        for personne in lot:
+            if personne.date_naissance <= majorite and generateur.aleatoire.random() < PART_ADULTES_MAJEURS:
+                groupes[("ADULTE", generateur.aleatoire.choice(["TARDIF", None]))].append(personne)
+            else:
+                groupes[("NAISSANCE", "NORMAL")].append(personne)
+        for (type_enregistrement, type_acte), personnes in groupes.items():
+            if personnes:
+                enregistrer_lot(
+                    personnes,
+                    type_enregistrement,
+                    type_acte=type_acte,
+                    action_audit=f"BANC_{type_enregistrement}",
+                    details_audit="Données synthétiques (banc d'essai)",
+                )
+
+    for date_naissance, effectif in naissances_par_jour(nombre, generateur.reference):
+        for _ in range(effectif):
+            lot.append(Personne(**generateur.donnees(date_naissance=date_naissance)))
+        if len(lot) >= taille_lot:
+            inserer(lot)
+            inserees += len(lot)
+            lot = []
+            if progression:
+                progression(inserees)
+    if lot:
+        inserer(lot)
+        inserees += len(lot)
+        if progression:
+            progression(inserees)
+    return time.perf_counter() - debut
+
+
+def centile(valeurs_triees, p):
+    """
+    Centile p (0-100) par rang le plus proche.
+    """
+    if not valeurs_triees:
+        return None
+    rang = max(1, round(p / 100 * len(valeurs_triees)))
+    return valeurs_triees[min(rang, len(valeurs_triees)) - 1]
+
+
+def resumer(durees, duree_totale=None):
+    """
+    Résumé JSON d'une série de durées (secondes) : latences en millisecondes et débit.
+    """
+    triees = sorted(durees)
+    resume = {
+        "n": len(triees),
+        "moyenne_ms": round(1000 * sum(triees) / len(triees), 3) if triees else None,
+        "p50_ms": round(1000 * centile(triees, 50), 3) if triees else None,
+        "p90_ms": round(1000 * centile(triees, 90), 3) if triees else None,
+        "p99_ms": round(1000 * centile(triees, 99), 3) if triees else None,
+        "max_ms": round(1000 * triees[-1], 3) if triees else None,
+    }
+    duree_totale = duree_totale if duree_totale is not None else sum(triees)
+    resume["debit_par_s"] = round(len(triees) / duree_totale, 2) if duree_totale else None
+    return resume
+
+
+# Formulaire d'enregistrement renvoyé avec un avertissement de doublon probable
+MARQUEUR_DOUBLON = b'name="confirmer_doublon"'
+
+
+class Scenario:
+    """
+    Série de requêtes HTTP chronométrées, jouée par un ou plusieurs clients en parallèle.
+    `requetes(generateur)` retourne la requête suivante : (méthode, url, données).
+    Une réponse hors `statuts_attendus`, ou sans `contenu_attendu` quand il est donné, est
+    une erreur ; un avertissement de doublon probable est compté à part (« doublons »).
+    """
+
+    def __init__(self, utilisateur, requetes, statuts_attendus=(200,), contenu_attendu=None):
+        self.utilisateur = utilisateur
+        self.requetes = requetes
+        self.statuts_attendus = statuts_attendus
+        self.contenu_attendu = contenu_attendu
+
+    def _jouer(self, nombre, graine, durees, erreurs, doublons):
+        client = Client()
+        client.force_login(self.utilisateur)
+        generateur = Generateur(graine)
+        for _ in range(nombre):
+            methode, url, donnees = self.requetes(generateur)
+            debut = time.perf_counter()
+            reponse = getattr(client, methode)(url, donnees)
+            contenu = b"".join(reponse.streaming_content) if reponse.streaming else reponse.content
+            durees.append(time.perf_counter() - debut)
+            if MARQUEUR_DOUBLON in contenu:
+                doublons.append(reponse.status_code)
+            elif reponse.status_code not in self.statuts_attendus or (
+                self.contenu_attendu is not None and self.contenu_attendu not in contenu
+            ):
+                erreurs.append(reponse.status_code)
+
+    def _jouer_dans_thread(self, *args):
+        try:
+            self._jouer(*args)
+        finally:
+            connection.close()
+
+    def executer(self, nombre, clients=1, graine=0):
+        """
+        `nombre` requêtes réparties entre `clients` threads ; retourne le résumé (resumer).
+        """
+        durees, erreurs, doublons = [], [], []
+        debut = time.perf_counter()
+        if clients == 1:
+            self._jouer(nombre, graine, durees, erreurs, doublons)
+        else:
+            threads = [
+                threading.Thread(
+                    target=self._jouer_dans_thread, args=(nombre // clients, graine + i, durees, erreurs, doublons)
+                )
+                for i in range(clients)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        resume = resumer(durees, time.perf_counter() - debut)
+        resume.update(clients=clients, erreurs=len(erreurs), doublons=len(doublons))
+        return resume
+
+
+def scenario_inscription(utilisateur, adulte):
+    """
+    Enregistrements par le formulaire : un adulte enregistré est redirigé vers sa fiche,
+    une naissance affiche sa page de confirmation (200, comme le formulaire renvoyé).
+    """
+    if adulte:
+        return Scenario(utilisateur, requetes_inscription("nouvel_adulte", True), statuts_attendus=(302,))
+    return Scenario(
+        utilisateur,
+        requetes_inscription("nouvelle_naissance", False),
+        contenu_attendu="Naissance enregistrée avec succès".encode(),
+    )
+
+
+def requetes_inscription(vue, adulte):
+    url = reverse(vue)
+
+    def requete(generateur):
+        donnees = generateur.donnees(adulte=adulte)
+        donnees["date_naissance"] = donnees["date_naissance"].isoformat()
+        return "post", url, donnees
+
+    return requete
+
+
+def requetes_recherche(numeros):
+    """
+    Mélange de recherches : nom complet, préfixe de nom, nom + prénom, numéro national.
+    """
+    url = reverse("recherche_citoyen")
+
+    def requete(generateur):
+        tirage = generateur.aleatoire.random()
+        nom = generateur.nom()
+        if tirage < 0.4:
+            criteres = {"nom": nom}
+        elif tirage < 0.6:
+            criteres = {"nom": nom[:3]}
+        elif tirage < 0.85:
+            criteres = {"nom": nom, "prenom": generateur.prenom(generateur.aleatoire.choice("MF"))}
+        else:
+            criteres = {"numero_national": generateur.aleatoire.choice(numeros)}
+        return "get", url, criteres
+
+    return requete
+
+
+def requetes_detail(identifiants):
+    def requete(generateur):
+        return "get", reverse("detail_citoyen", args=[generateur.aleatoire.choice(identifiants)]), {}
+
+    return requete
+
+
+def requetes_fixes(nom_url):
+    url = reverse(nom_url)
+    return lambda generateur: ("get", url, {})
@@ -0,0 +1,74 @@
+"""
+Cache du rendu des actes de naissance officiels.
+
+Un acte établi ne change presque jamais : son HTML est rendu une fois puis servi depuis
+le cache. La version d'un rendu est dérivée de l'acte et des dates de modification
+de l'acte et de la personne ; elle sert aussi d'ETag pour les requêtes conditionnelles.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+GABARIT = "acte_naissance.html"
+DUREE_CACHE = 7 * 24 * 3600
+
+
+def cle_cache(personne_id):
+    return f"acte_naissance:rendu:{personne_id}"
+
+
+def etag(acte_id, acte_modifie, personne_id, personne_modifiee):
+    """
+    ETag d'un acte à partir des seuls identifiants et dates de modification
+    (utilisable sur des lignes .values(), sans charger les objets).
+    """
+    empreinte = hashlib.sha256(
+        f"{acte_id}:{acte_modifie.isoformat()}:{personne_id}:{personne_modifiee.isoformat()}".encode()
+    ).hexdigest()[:32]
+    return f'"{empreinte}"'
+
+
+def version(personne, acte):
+    """
+    Retourne (etag, derniere_modification) de l'acte tel qu'il serait rendu.
+    """
+    return (
+        etag(acte.pk, acte.date_modification, personne.pk, personne.date_modification),
+        max(acte.date_modification, personne.date_modification),
+    )
+
+
+def rendre(personne, acte):
+    """
+    HTML de l'acte, depuis le cache si la version en cache est toujours la bonne.
+
+    La version est contrôlée à chaque lecture : un rendu périmé (invalidation manquée
+    dans un autre processus) n'est jamais servi.
+    """
+    etag_acte, _ = version(personne, acte)
+    en_cache = cache.get(cle_cache(personne.pk))
+    if en_cache and en_cache["etag"] == etag_acte:
+        return en_cache["html"]
+
+    html = render_to_string(GABARIT, {"personne": personne, "acte": acte})
+    cache.set(cle_cache(personne.pk), {"etag": etag_acte, "html": html}, DUREE_CACHE)
+    return html
+
+
+async def arendre(personne, acte):
+    """
+    Version asynchrone de rendre() : accès au cache asynchrone, rendu en mémoire.
+    """
+    etag_acte, _ = version(personne, acte)
+    en_cache = await cache.aget(cle_cache(personne.pk))
+    if en_cache and en_cache["etag"] == etag_acte:
+        return en_cache["html"]
+
+    html = render_to_string(GABARIT, {"personne": personne, "acte": acte})
+    await cache.aset(cle_cache(personne.pk), {"etag": etag_acte, "html": html}, DUREE_CACHE)
+    return html
+
+
+def invalider(personne_id):
+    cache.delete(cle_cache(personne_id))
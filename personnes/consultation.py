@@ -0,0 +1,162 @@
+"""
+Consultation des fiches citoyennes à travers un cache de lecture.
+
+Une fiche est chargée en une requête (Personne + ActeNaissance via select_related)
+puis conservée dans le cache "citoyens" (LocMemCache à éviction LRU par défaut).
+On la retrouve par clé primaire ou par numéro national. Les écritures invalident
+les entrées concernées (voir personnes.signals).
+
+Seules les fiches lues sur la base primaire sont mises en cache : une fiche lue sur une
+réplique en retard n'y entre pas, sans quoi une session épinglée sur la primaire après
+une écriture (personnes.routage) la relirait par le cache.
+
+Avec plusieurs workers et un cache local, l'invalidation ne touche que le processus
+qui a écrit : le TIMEOUT du cache borne alors la durée d'une fiche périmée.
+Un cache partagé (Memcached, Redis) supprime cette limite. L'acte officiel, lui, est
+toujours établi depuis une lecture en base (frais=True).
+"""
+import threading
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from .models import Personne
+
+ALIAS_CACHE = "citoyens"
+
+
+class _Compteurs:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def incrementer(self, succes):
+        with self._verrou:
+            if succes:
+                self.succes += 1
+            else:
+                self.echecs += 1
+
+    def instantane(self):
+        with self._verrou:
+            total = self.succes + self.echecs
+            return {
+                "succes": self.succes,
+                "echecs": self.echecs,
+                "taux_succes": self.succes / total if total else 0.0,
+            }
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.succes = self.echecs = 0
+
+
+compteurs = _Compteurs()
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def cle_pk(personne_id):
+    return f"personne:pk:{personne_id}"
+
+
+def cle_numero(numero_national):
+    return f"personne:nn:{numero_national}"
+
+
+def _a_cacher(personne):
+    return {cle_pk(personne.pk): personne, cle_numero(personne.numero_national): personne.pk}
+
+
+def _a_mettre_en_cache(personne):
+    return personne is not None and personne._state.db == DEFAULT_DB_ALIAS
+
+
+def _charger(**filtre):
+    personne = Personne.objects.select_related("acte_naissance").filter(**filtre).first()
+    if _a_mettre_en_cache(personne):
+        _cache().set_many(_a_cacher(personne))
+    return personne
+
+
+async def _acharger(**filtre):
+    personne = await Personne.objects.select_related("acte_naissance").filter(**filtre).afirst()
+    if _a_mettre_en_cache(personne):
+        await _cache().aset_many(_a_cacher(personne))
+    return personne
+
+
+def obtenir_personne(personne_id, frais=False):
+    """
+    Personne (avec son acte préchargé) par clé primaire, ou None.
+    `frais` : lue en base même si elle est en cache (qui est alors rafraîchi) ; pour les
+    documents officiels, qu'une fiche périmée dans le cache d'un autre processus ne doit
+    pas atteindre.
+    """
+    if frais:
+        return _charger(pk=personne_id)
+    personne = _cache().get(cle_pk(personne_id))
+    compteurs.incrementer(personne is not None)
+    if personne is None:
+        personne = _charger(pk=personne_id)
+    return personne
+
+
+async def aobtenir_personne(personne_id, frais=False):
+    """
+    Version asynchrone d'obtenir_personne().
+    """
+    if frais:
+        return await _acharger(pk=personne_id)
+    personne = await _cache().aget(cle_pk(personne_id))
+    compteurs.incrementer(personne is not None)
+    if personne is None:
+        personne = await _acharger(pk=personne_id)
+    return personne
+
+
+def obtenir_par_numero(numero_national):
+    """
+    Personne (avec son acte préchargé) par numéro national, ou None.
+    """
+    personne_id = _cache().get(cle_numero(numero_national))
+    if personne_id is not None:
+        personne = _cache().get(cle_pk(personne_id))
+        if personne is not None and personne.numero_national == numero_national:
+            compteurs.incrementer(True)
+            return personne
+    compteurs.incrementer(False)
+    return _charger(numero_national=numero_national)
+
+
+def obtenir_personne_ou_404(personne_id, frais=False):
+    personne = obtenir_personne(personne_id, frais)
+    if personne is None:
+        raise Http404("Aucun citoyen ne correspond à cet identifiant.")
+    return personne
+
+
+async def aobtenir_personne_ou_404(personne_id, frais=False):
+    personne = await aobtenir_personne(personne_id, frais)
+    if personne is None:
+        raise Http404("Aucun citoyen ne correspond à cet identifiant.")
+    return personne
+
+
+def acte_de(personne):
+    """
+    Acte de naissance préchargé de la personne, ou None.
+    """
+    # RelatedObjectDoesNotExist hérite d'AttributeError
+    return getattr(personne, "acte_naissance", None)
+
+
+def invalider(personne_id, numero_national=None):
+    cles = [cle_pk(personne_id)]
+    if numero_national:
+        cles.append(cle_numero(numero_national))
+    _cache().delete_many(cles)
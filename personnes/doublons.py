@@ -0,0 +1,253 @@
+"""
+Détection des doublons probables (même citoyen enregistré deux fois).
+
+Comparer toutes les paires est impossible à l'échelle du registre : les fiches sont
+regroupées par clés de blocage (date de naissance + nom phonétique, date de naissance +
+nom de la mère, nom + prénom + mère) et seules les fiches d'un même bloc sont comparées.
+Les paires candidates reçoivent un score de similarité pondéré entre 0 et 1.
+
+Deux usages :
+- `detecter` parcourt tout le registre en flux et compare les blocs dans un pool de
+  processus (manage.py detect_doublons) ;
+- `doublons_probables` contrôle une seule fiche au moment de la saisie, avec une requête
+  indexée bornée, pour rester dans le temps de réponse d'un formulaire.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+
+import django
+from django.conf import settings
+
+from .models import Personne
+from .recherche import cle_phonetique, normaliser
+
+CHAMPS_FICHE = (
+    "id",
+    "numero_national",
+    "type_enregistrement",
+    "nom",
+    "postnom",
+    "prenom",
+    "sexe",
+    "date_naissance",
+    "nom_normalise",
+    "postnom_normalise",
+    "prenom_normalise",
+    "nom_phonetique",
+    "nom_pere",
+    "nom_mere",
+    "prenom_mere",
+)
+
+# Poids des critères du score ; un critère vide des deux côtés est ignoré
+POIDS = {
+    "nom": 0.25,
+    "postnom": 0.10,
+    "prenom": 0.20,
+    "naissance": 0.20,
+    "mere": 0.15,
+    "pere": 0.10,
+}
+PENALITE_SEXE = 0.6
+SEUIL_RAPPORT = 0.75
+
+# Au-delà de TAILLE_MAX_BLOC fiches, un bloc est trié et comparé par fenêtre glissante
+TAILLE_MAX_BLOC = 200
+FENETRE = 20
+# Nombre maximal de fiches lues pour le contrôle à la saisie
+CANDIDATS_MAX = 50
+
+
+def _similarite(a, b):
+    if not a and not b:
+        return None
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _similarite_dates(a, b):
+    if a == b:
+        return 1.0
+    # Jour et mois inversés, ou une seule composante différente : erreur de saisie courante
+    if (a.day, a.month, a.year) == (b.month, b.day, b.year):
+        return 0.8
+    differences = (a.year != b.year) + (a.month != b.month) + (a.day != b.day)
+    return 0.6 if differences == 1 else 0.0
+
+
+def score(a, b):
+    """
+    Similarité de deux fiches (dictionnaires CHAMPS_FICHE), entre 0 et 1.
+    """
+    criteres = {
+        "nom": _similarite(a["nom_normalise"], b["nom_normalise"]),
+        "postnom": _similarite(a["postnom_normalise"], b["postnom_normalise"]),
+        "prenom": _similarite(a["prenom_normalise"], b["prenom_normalise"]),
+        "naissance": _similarite_dates(a["date_naissance"], b["date_naissance"]),
+        "mere": _similarite(normaliser(a["nom_mere"]), normaliser(b["nom_mere"])),
+        "pere": _similarite(normaliser(a["nom_pere"]), normaliser(b["nom_pere"])),
+    }
+    total = sum(POIDS[critere] for critere, valeur in criteres.items() if valeur is not None)
+    resultat = sum(POIDS[critere] * valeur for critere, valeur in criteres.items() if valeur is not None) / total
+    if a["sexe"] != b["sexe"]:
+        resultat *= PENALITE_SEXE
+    return round(resultat, 3)
+
+
+def _paires_bloc(bloc):
+    if len(bloc) <= TAILLE_MAX_BLOC:
+        yield from combinations(bloc, 2)
+        return
+    # Voisinage trié : seules les fiches proches dans l'ordre des prénoms sont comparées
+    bloc = sorted(bloc, key=lambda fiche: (fiche["prenom_normalise"], fiche["postnom_normalise"]))
+    for indice, fiche in enumerate(bloc):
+        for autre in bloc[indice + 1:indice + 1 + FENETRE]:
+            yield fiche, autre
+
+
+def comparer_blocs(blocs, seuil=SEUIL_RAPPORT):
+    """
+    Compare les fiches de chaque bloc. `blocs` : liste de (nom de clé, liste de fiches).
+    Retourne [(score, id_a, id_b, nom de clé)] pour les paires au-dessus du seuil.
+    Exécutée dans les processus du pool : n'accède pas à la base.
+    """
+    paires = []
+    for nom_cle, bloc in blocs:
+        for a, b in _paires_bloc(bloc):
+            valeur = score(a, b)
+            if valeur >= seuil:
+                id_a, id_b = sorted((a["id"], b["id"]))
+                paires.append((valeur, id_a, id_b, nom_cle))
+    return paires
+
+
+# Passes de blocage : colonne de parcours (ordre du flux), puis clés calculées dans chaque groupe.
+# Chaque passe lit le registre une fois, trié sur une colonne indexée, et ne garde en mémoire
+# que le groupe courant.
+PASSES = (
+    ("date_naissance", (
+        ("naissance+nom", lambda fiche: fiche["nom_phonetique"]),
+        ("naissance+mere", lambda fiche: cle_phonetique(fiche["nom_mere"])),
+    )),
+    ("nom_phonetique", (
+        ("nom+prenom+mere", lambda fiche: (cle_phonetique(fiche["prenom"]), cle_phonetique(fiche["nom_mere"]))),
+    )),
+)
+
+
+def blocs(queryset=None, taille_lot=2000):
+    """
+    Générateur de blocs (nom de clé, fiches) d'au moins deux fiches.
+    """
+    qs = Personne.objects.all() if queryset is None else queryset
+    for colonne, cles in PASSES:
+        fiches = qs.order_by(colonne, "id").values(*CHAMPS_FICHE).iterator(chunk_size=taille_lot)
+        for _, groupe in groupby(fiches, key=lambda fiche: fiche[colonne]):
+            groupe = list(groupe)
+            if len(groupe) < 2:
+                continue
+            for nom_cle, cle in cles:
+                sous_blocs = {}
+                for fiche in groupe:
+                    sous_blocs.setdefault(cle(fiche), []).append(fiche)
+                for bloc in sous_blocs.values():
+                    if len(bloc) > 1:
+                        yield nom_cle, bloc
+
+
+def _lots(iterable, taille):
+    lot = []
+    for element in iterable:
+        lot.append(element)
+        if len(lot) >= taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def detecter(queryset=None, seuil=SEUIL_RAPPORT, processus=None, blocs_par_tache=200, progression=None):
+    """
+    Paires candidates du registre, triées par score décroissant :
+    [(score, id_a, id_b, [noms des clés qui ont rapproché la paire])].
+
+    Avec `processus` > 1, les blocs sont comparés dans un pool de processus ; le nombre
+    de tâches en vol est borné pour ne pas charger tout le registre en mémoire.
+    """
+    paires = {}
+
+    def retenir(resultats):
+        for valeur, id_a, id_b, nom_cle in resultats:
+            paire = paires.setdefault((id_a, id_b), [valeur, set()])
+            paire[0] = max(paire[0], valeur)
+            paire[1].add(nom_cle)
+        if progression:
+            progression(len(paires))
+
+    lots = _lots(blocs(queryset), blocs_par_tache)
+    if processus == 1:
+        for lot in lots:
+            retenir(comparer_blocs(lot, seuil))
+    else:
+        processus = processus or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=processus, initializer=django.setup) as pool:
+            en_vol = set()
+            limite = 2 * processus
+            for lot in lots:
+                if len(en_vol) >= limite:
+                    terminees, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+                    for tache in terminees:
+                        retenir(tache.result())
+                en_vol.add(pool.submit(comparer_blocs, lot, seuil))
+            for tache in en_vol:
+                retenir(tache.result())
+
+    return sorted(
+        ((valeur, id_a, id_b, sorted(cles)) for (id_a, id_b), (valeur, cles) in paires.items()),
+        key=lambda paire: (-paire[0], paire[1], paire[2]),
+    )
+
+
+def fiche_de(personne):
+    """
+    Fiche de comparaison d'une personne non encore enregistrée.
+    """
+    personne.normaliser_noms()
+    return {champ: getattr(personne, champ) for champ in CHAMPS_FICHE}
+
+
+def doublons_probables(personne, seuil=None, limite=5):
+    """
+    Fiches existantes qui ressemblent probablement à `personne` (saisie en cours).
+
+    Trois blocs lus chacun sur son index composite (date de naissance + nom phonétique,
+    nom phonétique + prénom, date + prénom), par identifiant croissant et limités à
+    CANDIDATS_MAX lignes : au plus 3 × CANDIDATS_MAX fiches lues, quelle que soit la
+    taille du registre ou la fréquence du prénom.
+    Retourne [{"score": ..., **fiche}] par score décroissant.
+    """
+    seuil = settings.REGISTRE_DOUBLONS_SEUIL_ALERTE if seuil is None else seuil
+    fiche = fiche_de(personne)
+    blocs_saisie = (
+        {"date_naissance": fiche["date_naissance"], "nom_phonetique": fiche["nom_phonetique"]},
+        {"nom_phonetique": fiche["nom_phonetique"], "prenom_normalise": fiche["prenom_normalise"]},
+        {"date_naissance": fiche["date_naissance"], "prenom_normalise": fiche["prenom_normalise"]},
+    )
+    candidats = {}
+    for criteres in blocs_saisie:
+        queryset = Personne.objects.filter(**criteres)
+        if personne.pk:
+            queryset = queryset.exclude(pk=personne.pk)
+        for candidat in queryset.order_by("pk").values(*CHAMPS_FICHE)[:CANDIDATS_MAX]:
+            candidats.setdefault(candidat["id"], candidat)
+
+    resultats = []
+    for candidat in candidats.values():
+        valeur = score(fiche, candidat)
+        if valeur >= seuil:
+            resultats.append({"score": valeur, **candidat})
+    resultats.sort(key=lambda resultat: -resultat["score"])
+    return resultats[:limite]
@@ -0,0 +1,168 @@
+"""
+Export du registre complet ou filtré en CSV / JSONL, en mémoire constante.
+
+Les lignes (Personne jointe à son ActeNaissance) sont lues par curseur
+(`iterator(chunk_size=...)`, curseur serveur sur PostgreSQL) et écrites au fil de l'eau,
+éventuellement compressées en gzip. Utilisé par la vue export_registre et par
+`manage.py export_registre`.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Personne, ActeNaissance
+
+COLONNES = {
+    "numero_national": "numero_national",
+    "type_enregistrement": "type_enregistrement",
+    "nom": "nom",
+    "postnom": "postnom",
+    "prenom": "prenom",
+    "sexe": "sexe",
+    "date_naissance": "date_naissance",
+    "nom_pere": "nom_pere",
+    "prenom_pere": "prenom_pere",
+    "nom_mere": "nom_mere",
+    "prenom_mere": "prenom_mere",
+    "nationalite": "nationalite",
+    "adresse_actuelle": "adresse_actuelle",
+    "date_creation": "date_creation",
+    "date_modification": "date_modification",
+    "numero_acte": "acte_naissance__numero_acte",
+    "type_acte": "acte_naissance__type_acte",
+    "date_etablissement": "acte_naissance__date_etablissement",
+    "lieu_etablissement": "acte_naissance__lieu_etablissement",
+    "officier": "acte_naissance__officier",
+}
+FORMATS = ("csv", "jsonl")
+TAILLE_LOT = 2000
+
+
+def lire_date(valeur):
+    """
+    Horodatage ISO ou date AAAA-MM-JJ (minuit) ; None si vide. Lève ValueError si illisible.
+    """
+    if not valeur:
+        return None
+    horodatage = parse_datetime(valeur)
+    if horodatage is None:
+        jour = parse_date(valeur)
+        if jour is None:
+            raise ValueError(f"Date invalide : {valeur}")
+        horodatage = datetime.combine(jour, time.min)
+    if timezone.is_naive(horodatage):
+        horodatage = timezone.make_aware(horodatage)
+    return horodatage
+
+
+def filtres_depuis_parametres(parametres):
+    """
+    Filtres d'export lus depuis des paramètres textuels (GET ou ligne de commande).
+    Lève ValueError si une valeur est invalide.
+    """
+    type_enregistrement = parametres.get("type") or None
+    if type_enregistrement and type_enregistrement not in dict(Personne.TYPE_ENREGISTREMENT_CHOICES):
+        raise ValueError(f"Type d'enregistrement inconnu : {type_enregistrement}")
+
+    dates = {}
+    for cle in ("ne_depuis", "ne_jusqua"):
+        valeur = parametres.get(cle)
+        if valeur:
+            dates[cle] = parse_date(valeur)
+            if dates[cle] is None:
+                raise ValueError(f"Date invalide pour {cle} : {valeur}")
+
+    return {
+        "type_enregistrement": type_enregistrement,
+        "modifie_depuis": lire_date(parametres.get("modifie_depuis")),
+        **dates,
+    }
+
+
+def filtrer(type_enregistrement=None, ne_depuis=None, ne_jusqua=None, modifie_depuis=None, queryset=None):
+    """
+    Queryset des personnes à exporter.
+    `modifie_depuis` retient aussi les personnes dont seul l'acte a changé (export incrémental) ;
+    chaque branche du OU est lue sur son index de date_modification, sans jointure. Le tri
+    par id passe alors hors index : SQLite trie les seules fiches retenues au lieu de
+    parcourir toute la table dans l'ordre des id.
+    """
+    qs = Personne.objects.all() if queryset is None else queryset
+    if type_enregistrement:
+        qs = qs.filter(type_enregistrement=type_enregistrement)
+    if ne_depuis:
+        qs = qs.filter(date_naissance__gte=ne_depuis)
+    if ne_jusqua:
+        qs = qs.filter(date_naissance__lte=ne_jusqua)
+    if modifie_depuis:
+        qs = qs.filter(
+            Q(date_modification__gte=modifie_depuis)
+            | Q(pk__in=ActeNaissance.objects.filter(date_modification__gte=modifie_depuis).values("personne_id"))
+        ).order_by(F("id") + 0)
+    return qs
+
+
+def iterer_lignes(queryset, taille_lot=TAILLE_LOT):
+    """
+    Dictionnaires colonne -> valeur, lus par paquets de `taille_lot` (par id, sauf tri fixé
+    par filtrer()).
+    """
+    champs = list(COLONNES.values())
+    if not queryset.ordered:
+        queryset = queryset.order_by("id")
+    for valeurs in queryset.values(*champs).iterator(chunk_size=taille_lot):
+        yield {colonne: valeurs[champ] for colonne, champ in COLONNES.items()}
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ""
+    if hasattr(valeur, "isoformat"):
+        return valeur.isoformat()
+    return valeur
+
+
+class _Tampon:
+    """Pseudo-fichier pour csv.writer : write() rend la ligne au lieu de la stocker."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def produire(lignes, format_export):
+    """
+    Générateur de fragments texte au format demandé.
+    """
+    if format_export == "csv":
+        ecrivain = csv.writer(_Tampon())
+        yield ecrivain.writerow(list(COLONNES))
+        for ligne in lignes:
+            yield ecrivain.writerow([_texte(valeur) for valeur in ligne.values()])
+    elif format_export == "jsonl":
+        for ligne in lignes:
+            yield json.dumps({cle: _texte(valeur) for cle, valeur in ligne.items()}, ensure_ascii=False) + "\n"
+    else:
+        raise ValueError(f"Format inconnu : {format_export}")
+
+
+def compresser(fragments, taille_bloc=64 * 1024):
+    """
+    Compression gzip incrémentale d'un flux de fragments texte (octets produits par blocs).
+    """
+    compresseur = zlib.compressobj(wbits=31)  # 31 = en-tête gzip
+    en_attente = []
+    taille = 0
+    for fragment in fragments:
+        en_attente.append(fragment.encode("utf-8"))
+        taille += len(en_attente[-1])
+        if taille >= taille_bloc:
+            bloc = compresseur.compress(b"".join(en_attente))
+            en_attente, taille = [], 0
+            if bloc:
+                yield bloc
+    yield compresseur.compress(b"".join(en_attente)) + compresseur.flush()
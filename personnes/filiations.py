@@ -0,0 +1,208 @@
+"""
+Filiation : liens indexés entre une personne et les fiches de ses parents.
+
+Les parents ne sont saisis qu'en texte libre (nom_pere, prenom_pere, nom_mere, prenom_mere).
+manage.py lier_filiations relie une personne à la fiche d'un parent (Personne.pere,
+Personne.mere) quand une seule fiche correspond :
+- nom et prénom normalisés identiques (personnes.recherche.normaliser) ; le nom saisi peut
+  être « nom postnom », et le nom lui-même avoir plusieurs mots (N'Gandu, Mbuyi-Kalala).
+  Un parent dont le prénom n'est pas saisi n'est jamais relié ;
+- sexe attendu ;
+- parent né entre ECART_MAX_ANS[role] et ECART_MIN_ANS ans avant l'enfant.
+Plusieurs fiches possibles : rien n'est relié, le cas est signalé.
+
+Les candidats d'un lot d'enfants sont lus en une requête sur l'index personne_filiation_idx
+(nom, prénom, date de naissance). Une fois les liens posés, enfants() et fratrie() sont des
+lectures d'index sur les clés étrangères pere_id / mere_id.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Personne
+from .recherche import normaliser
+from . import consultation, flux
+
+ROLES = {
+    "pere": {"sexe": "M", "nom": "nom_pere", "prenom": "prenom_pere"},
+    "mere": {"sexe": "F", "nom": "nom_mere", "prenom": "prenom_mere"},
+}
+ECART_MIN_ANS = 12
+ECART_MAX_ANS = {"pere": 80, "mere": 55}
+TAILLE_LOT = 500
+
+CHAMPS_ENFANT = (
+    "id", "numero_national", "date_naissance", "pere_id", "mere_id",
+    "nom_pere", "prenom_pere", "nom_mere", "prenom_mere",
+)
+CHAMPS_CANDIDAT = ("id", "nom_normalise", "postnom_normalise", "prenom_normalise", "date_naissance")
+
+
+def cle_parent(nom, prenom):
+    """
+    (nom normalisé complet, prénom normalisé) d'un parent saisi, ou None s'il manque l'un des deux.
+    """
+    nom, prenom = normaliser(nom), normaliser(prenom)
+    if not nom or not prenom:
+        return None
+    return nom, prenom
+
+
+def _annees_avant(jour, annees):
+    try:
+        return jour.replace(year=jour.year - annees)
+    except ValueError:  # 29 février
+        return jour.replace(year=jour.year - annees, day=28)
+
+
+def fenetre_naissance(role, date_naissance_enfant):
+    """
+    Dates de naissance plausibles (min, max) d'un parent.
+    """
+    return (
+        _annees_avant(date_naissance_enfant, ECART_MAX_ANS[role]),
+        _annees_avant(date_naissance_enfant, ECART_MIN_ANS),
+    )
+
+
+def _noms_possibles(nom_saisi):
+    """
+    Noms de fiche possibles d'un nom saisi « nom postnom » : chaque début du nom par mots
+    entiers (« n gandu kalala » -> « n », « n gandu », « n gandu kalala »), le reste étant
+    le postnom.
+    """
+    mots = nom_saisi.split()
+    return [" ".join(mots[:fin]) for fin in range(1, len(mots) + 1)]
+
+
+def _nom_correspond(nom_saisi, candidat):
+    return nom_saisi in (
+        candidat["nom_normalise"],
+        f"{candidat['nom_normalise']} {candidat['postnom_normalise']}",
+    )
+
+
+def candidats(role, enfants):
+    """
+    Fiches parentes possibles de chaque enfant du lot pour `role` : {enfant_id: [parent_id]}.
+    Les enfants déjà reliés ou dont le parent est incomplet n'y figurent pas.
+    """
+    meta = ROLES[role]
+    recherches = {}
+    for enfant in enfants:
+        if enfant[f"{role}_id"] is not None:
+            continue
+        cle = cle_parent(enfant[meta["nom"]], enfant[meta["prenom"]])
+        if cle is not None:
+            recherches[enfant["id"]] = (cle, fenetre_naissance(role, enfant["date_naissance"]))
+    if not recherches:
+        return {}
+
+    # Une branche d'index par (nom possible, prénom), sur l'union des fenêtres de dates
+    fenetres = {}
+    for (nom_saisi, prenom), (debut_enfant, fin_enfant) in recherches.values():
+        for nom in _noms_possibles(nom_saisi):
+            debut, fin = debut_enfant, fin_enfant
+            cle_index = (nom, prenom)
+            if cle_index in fenetres:
+                debut, fin = min(debut, fenetres[cle_index][0]), max(fin, fenetres[cle_index][1])
+            fenetres[cle_index] = (debut, fin)
+    filtre = reduce(or_, (
+        Q(nom_normalise=nom, prenom_normalise=prenom, date_naissance__range=fenetre)
+        for (nom, prenom), fenetre in fenetres.items()
+    ))
+    par_cle = defaultdict(list)
+    for candidat in Personne.objects.filter(filtre, sexe=meta["sexe"]).values(*CHAMPS_CANDIDAT):
+        par_cle[(candidat["nom_normalise"], candidat["prenom_normalise"])].append(candidat)
+
+    resultat = {}
+    for enfant_id, ((nom, prenom), (debut, fin)) in recherches.items():
+        resultat[enfant_id] = [
+            candidat["id"]
+            for nom_possible in _noms_possibles(nom)
+            for candidat in par_cle[(nom_possible, prenom)]
+            if debut <= candidat["date_naissance"] <= fin
+            and _nom_correspond(nom, candidat)
+            and candidat["id"] != enfant_id
+        ]
+    return resultat
+
+
+def lier(queryset=None, taille_lot=TAILLE_LOT, simulation=False, signaler=None, progression=None):
+    """
+    Relie les personnes de `queryset` (toutes par défaut) aux fiches de leurs parents.
+    Lecture par paquets triés sur l'id ; un UPDATE groupé par paquet, date_modification comprise
+    (les liens apparaissent dans les exports incrémentaux). `signaler(enfant, role, ids)` reçoit
+    les cas ambigus. Retourne le bilan par issue.
+    """
+    queryset = Personne.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(Q(pere__isnull=True) | Q(mere__isnull=True))
+    bilan = Counter()
+    dernier = 0
+    while True:
+        enfants = list(queryset.filter(pk__gt=dernier).order_by("pk").values(*CHAMPS_ENFANT)[:taille_lot])
+        if not enfants:
+            return bilan
+        dernier = enfants[-1]["id"]
+        bilan["examinees"] += len(enfants)
+
+        liens = {enfant["id"]: {"pere_id": enfant["pere_id"], "mere_id": enfant["mere_id"]} for enfant in enfants}
+        modifies = set()
+        for role in ROLES:
+            trouves = candidats(role, enfants)
+            for enfant in enfants:
+                if enfant[f"{role}_id"] is not None:
+                    continue
+                ids = trouves.get(enfant["id"])
+                if ids is None:
+                    bilan[f"{role}_incomplet"] += 1
+                elif not ids:
+                    bilan[f"{role}_sans_fiche"] += 1
+                elif len(ids) > 1:
+                    bilan[f"{role}_ambigu"] += 1
+                    if signaler:
+                        signaler(enfant, role, ids)
+                else:
+                    bilan[f"{role}_relie"] += 1
+                    liens[enfant["id"]][f"{role}_id"] = ids[0]
+                    modifies.add(enfant["id"])
+
+        if modifies and not simulation:
+            maintenant = timezone.now()
+            with transaction.atomic():
+                Personne.objects.bulk_update(
+                    [Personne(pk=pk, date_modification=maintenant, **liens[pk]) for pk in modifies],
+                    ["pere", "mere", "date_modification"],
+                )
+                flux.noter([Personne(pk=pk) for pk in modifies])
+            # bulk_update ne passe pas par les signaux : flux (ci-dessus) et caches tenus explicitement
+            for enfant in enfants:
+                if enfant["id"] in modifies:
+                    consultation.invalider(enfant["id"], enfant["numero_national"])
+        if progression:
+            progression(bilan["examinees"])
+
+
+def enfants(personne):
+    """
+    Enfants reliés à la fiche (comme père ou comme mère).
+    """
+    return Personne.objects.filter(Q(pere=personne) | Q(mere=personne)).order_by("date_naissance", "id")
+
+
+def fratrie(personne):
+    """
+    Frères et sœurs : personnes ayant au moins un parent relié en commun.
+    """
+    filtre = Q()
+    if personne.pere_id:
+        filtre |= Q(pere_id=personne.pere_id)
+    if personne.mere_id:
+        filtre |= Q(mere_id=personne.mere_id)
+    if not filtre:
+        return Personne.objects.none()
+    return Personne.objects.filter(filtre).exclude(pk=personne.pk).order_by("date_naissance", "id")
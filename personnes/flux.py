@@ -0,0 +1,283 @@
+"""
+Flux de changements du registre, lu par les miroirs provinciaux.
+
+Chaque écriture ou suppression de Personne / ActeNaissance ajoute une ligne Changement,
+dans la même transaction (signaux, et explicitement pour les écritures groupées de
+personnes.lots et personnes.filiations). Son identifiant croissant est la séquence du flux :
+contrairement à date_modification seule, elle capte aussi les suppressions et la création
+d'un acte, et ne confond pas deux écritures de la même seconde.
+
+    GET /api/flux/?curseur=...&limite=1000
+
+- sans curseur, le flux commence par un instantané : les fiches par identifiant croissant
+  avec leur acte (seulement celles modifiées depuis ?modifie_depuis= pour un miroir déjà
+  chargé depuis un export), puis les changements postérieurs au début de l'instantané ;
+- chaque page donne l'état actuel des objets changés (un objet changé plusieurs fois
+  n'apparaît qu'une fois), les fiches des parents qu'ils référencent, les suppressions,
+  et le curseur opaque de la page suivante : chaque page s'applique seule ;
+- « fin » indique qu'il n'y a plus rien à lire pour l'instant.
+
+`manage.py pull_changes` lit les pages et les applique à la base locale (appliquer()).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Personne, ActeNaissance, Changement
+from .export import filtrer, lire_date
+from . import statistiques, analytique
+
+MODELES = {"PERSONNE": Personne, "ACTE": ActeNaissance}
+CHAMPS = {nom: tuple(champ.attname for champ in modele._meta.concrete_fields) for nom, modele in MODELES.items()}
+CHAMPS_ENTREE = ("id", "modele", "objet_id", "id_personne", "operation", "date")
+
+
+def entree(instance, operation="ECRITURE"):
+    """
+    Changement (non enregistré) pour une Personne ou un ActeNaissance.
+    """
+    if isinstance(instance, ActeNaissance):
+        return Changement(modele="ACTE", objet_id=instance.pk, id_personne=instance.personne_id, operation=operation)
+    return Changement(modele="PERSONNE", objet_id=instance.pk, id_personne=instance.pk, operation=operation)
+
+
+def noter(instances, operation="ECRITURE"):
+    """
+    Ajoute au flux l'écriture ou la suppression d'instances, en un seul INSERT
+    (transaction de l'appelant).
+    """
+    Changement.objects.bulk_create([entree(instance, operation) for instance in instances], batch_size=1000)
+
+
+def coder_curseur(etat):
+    return base64.urlsafe_b64encode(json.dumps(etat, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def lire_curseur(curseur):
+    """
+    État d'un curseur : {"s": séquence}, plus {"i": dernier id, "d": modifie_depuis}
+    pendant l'instantané. Lève ValueError si le curseur est illisible.
+    """
+    try:
+        etat = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+        if not isinstance(etat, dict) or not isinstance(etat.get("s"), int):
+            raise TypeError
+        if "i" in etat and not isinstance(etat["i"], int):
+            raise TypeError
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("curseur invalide : reprendre sans curseur.")
+    return etat
+
+
+def _borne_recul():
+    return timezone.now() - timedelta(seconds=settings.REGISTRE_FLUX_RECUL)
+
+
+def sequence_stable():
+    """
+    Dernière séquence dont tous les changements sont servis (plus anciens que le recul).
+    """
+    recente = (
+        Changement.objects.filter(date__gt=_borne_recul())
+        .order_by("pk").values_list("pk", flat=True).first()
+    )
+    if recente is not None:
+        return recente - 1
+    return Changement.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def _serialiser(valeurs):
+    return {
+        champ: valeur.isoformat() if isinstance(valeur, (date, datetime)) else valeur
+        for champ, valeur in valeurs.items()
+    }
+
+
+def _ecriture(modele, valeurs, sequence=None):
+    id_personne = valeurs["personne_id"] if modele == "ACTE" else valeurs["id"]
+    return {
+        "sequence": sequence,
+        "modele": modele,
+        "id": valeurs["id"],
+        "id_personne": id_personne,
+        "operation": "ECRITURE",
+        "donnees": _serialiser(valeurs),
+    }
+
+
+def _parents_manquants(personnes):
+    """
+    Fiches des parents (pere_id, mere_id) absentes de la page, ascendants compris : envoyées
+    avec elle pour que ses clés étrangères soient valides à l'application, y compris quand
+    le parent a un identifiant plus grand que l'enfant (instantané par identifiant croissant).
+    """
+    presents = {personne["id"] for personne in personnes}
+    parents = []
+    a_lire = personnes
+    while True:
+        ids = {personne[champ] for personne in a_lire for champ in ("pere_id", "mere_id")} - presents - {None}
+        if not ids:
+            return parents
+        a_lire = list(Personne.objects.filter(pk__in=ids).values(*CHAMPS["PERSONNE"]))
+        presents |= ids
+        parents.extend(a_lire)
+
+
+def _page_instantane(etat, limite):
+    queryset = filtrer(modifie_depuis=lire_date(etat.get("d")))
+    personnes = list(queryset.filter(pk__gt=etat["i"]).order_by("pk").values(*CHAMPS["PERSONNE"])[:limite])
+    actes = {
+        acte["personne_id"]: acte
+        for acte in ActeNaissance.objects.filter(personne_id__in=[p["id"] for p in personnes]).values(*CHAMPS["ACTE"])
+    }
+    changements = [_ecriture("PERSONNE", parent) for parent in _parents_manquants(personnes)]
+    for personne in personnes:
+        changements.append(_ecriture("PERSONNE", personne))
+        if personne["id"] in actes:
+            changements.append(_ecriture("ACTE", actes[personne["id"]]))
+
+    if len(personnes) < limite:
+        suivant = {"s": etat["s"]}  # instantané terminé : suite par la séquence
+    else:
+        suivant = dict(etat, i=personnes[-1]["id"])
+    return {"phase": "instantane", "curseur": coder_curseur(suivant), "fin": False, "changements": changements}
+
+
+def _page_changements(etat, limite):
+    lues = list(Changement.objects.filter(pk__gt=etat["s"]).order_by("pk").values(*CHAMPS_ENTREE)[:limite])
+    # Arrêt au premier changement trop récent : une séquence inférieure peut encore arriver
+    borne = _borne_recul()
+    entrees = list(takewhile(lambda ligne: ligne["date"] <= borne, lues))
+
+    dernieres = {}
+    for entree_flux in entrees:
+        dernieres.pop((entree_flux["modele"], entree_flux["objet_id"]), None)
+        dernieres[(entree_flux["modele"], entree_flux["objet_id"])] = entree_flux
+    etats = {}
+    for modele, modele_django in MODELES.items():
+        ids = [e["objet_id"] for e in dernieres.values() if e["modele"] == modele and e["operation"] == "ECRITURE"]
+        etats[modele] = {
+            valeurs["id"]: valeurs
+            for valeurs in modele_django.objects.filter(pk__in=ids).values(*CHAMPS[modele])
+        } if ids else {}
+
+    changements = [_ecriture("PERSONNE", parent) for parent in _parents_manquants(list(etats["PERSONNE"].values()))]
+    for entree_flux in dernieres.values():
+        if entree_flux["operation"] == "SUPPRESSION":
+            changements.append({
+                "sequence": entree_flux["id"],
+                "modele": entree_flux["modele"],
+                "id": entree_flux["objet_id"],
+                "id_personne": entree_flux["id_personne"],
+                "operation": "SUPPRESSION",
+            })
+            continue
+        valeurs = etats[entree_flux["modele"]].get(entree_flux["objet_id"])
+        # Absent : supprimé depuis, sa suppression suit plus loin dans le flux
+        if valeurs is not None:
+            changements.append(_ecriture(entree_flux["modele"], valeurs, entree_flux["id"]))
+
+    suivant = {"s": entrees[-1]["id"] if entrees else etat["s"]}
+    return {
+        "phase": "changements",
+        "curseur": coder_curseur(suivant),
+        "fin": len(entrees) < limite,
+        "changements": changements,
+    }
+
+
+def page(curseur=None, limite=None, modifie_depuis=None):
+    """
+    Page du flux après `curseur` (None : début de l'instantané). Lève ValueError si un
+    paramètre est invalide.
+    """
+    limite = limite or settings.REGISTRE_FLUX_TAILLE_PAGE
+    if not 1 <= limite <= settings.REGISTRE_FLUX_TAILLE_PAGE_MAX:
+        raise ValueError(f"limite : entre 1 et {settings.REGISTRE_FLUX_TAILLE_PAGE_MAX}.")
+    if curseur:
+        etat = lire_curseur(curseur)
+    else:
+        depuis = lire_date(modifie_depuis)
+        # Séquence lue avant l'instantané : les écritures pendant sa lecture seront rejouées
+        sequence = sequence_stable()
+        if depuis:
+            # Les suppressions depuis cette date ne sont que dans le flux : rejouées aussi
+            premiere = Changement.objects.filter(date__gte=depuis).order_by("pk").values_list("pk", flat=True).first()
+            if premiere is not None:
+                sequence = min(sequence, premiere - 1)
+        etat = {"s": sequence, "i": 0, "d": depuis.isoformat() if depuis else None}
+    if "i" in etat:
+        return _page_instantane(etat, limite)
+    return _page_changements(etat, limite)
+
+
+def _instance(modele, donnees):
+    modele_django = MODELES[modele]
+    return modele_django(**{
+        champ.attname: champ.to_python(donnees.get(champ.attname))
+        for champ in modele_django._meta.concrete_fields
+    })
+
+
+def _etat_local(ids):
+    """
+    {id: valeurs(analytique.CHAMPS_SOURCE)} des fiches locales, acte compris.
+    """
+    lignes = Personne.objects.filter(pk__in=ids).values("pk", *analytique.CHAMPS_SOURCE)
+    return {valeurs.pop("pk"): valeurs for valeurs in lignes}
+
+
+def _ajuster_agregats(avant, apres):
+    deltas_stats = []
+    retraits, ajouts = [], []
+    for etat, signe, contributions in ((avant, -1, retraits), (apres, 1, ajouts)):
+        for valeurs in etat.values():
+            deltas_stats.append(statistiques.deltas_personne(valeurs["type_enregistrement"], signe))
+            if valeurs["acte_naissance__type_acte"]:
+                deltas_stats.append(statistiques.deltas_acte(valeurs["acte_naissance__type_acte"], signe))
+            contributions.append(analytique.contribution_valeurs(valeurs))
+    statistiques.ajuster(statistiques.fusionner(*deltas_stats))
+    analytique.ajuster(analytique.deltas(ajouts=ajouts, retraits=retraits))
+
+
+def appliquer(changements):
+    """
+    Applique une page du flux à la base locale, dans une transaction, et retourne le bilan.
+
+    Les suppressions passent par l'ORM (signaux : agrégats et caches). Les écritures
+    passent par save_base(raw=True), qui conserve identifiants et horodatages de la source ;
+    statistiques et agrégats sont alors ajustés ici d'après l'état des fiches avant et après.
+    """
+    ecritures = {modele: [] for modele in MODELES}
+    suppressions = {modele: set() for modele in MODELES}
+    for changement in changements:
+        if changement.get("modele") not in MODELES:
+            raise ValueError(f"Modèle inconnu dans le flux : {changement.get('modele')}")
+        if changement.get("operation") == "SUPPRESSION":
+            suppressions[changement["modele"]].add(changement["id"])
+        else:
+            ecritures[changement["modele"]].append(_instance(changement["modele"], changement["donnees"]))
+
+    with transaction.atomic():
+        # Actes d'abord : un acte remplacé libère son numéro et sa fiche avant l'écriture du nouveau
+        for modele in ("ACTE", "PERSONNE"):
+            if suppressions[modele]:
+                MODELES[modele].objects.filter(pk__in=suppressions[modele]).delete()
+
+        ids = {personne.pk for personne in ecritures["PERSONNE"]} | {acte.personne_id for acte in ecritures["ACTE"]}
+        avant = _etat_local(ids)
+        # Fiches avant actes ; les parents référencés sont dans la page (clés contrôlées en fin de transaction)
+        for instance in ecritures["PERSONNE"] + ecritures["ACTE"]:
+            instance.save_base(raw=True)
+        _ajuster_agregats(avant, _etat_local(ids))
+
+    return {
+        "ecritures": sum(len(instances) for instances in ecritures.values()),
+        "suppressions": sum(len(ids) for ids in suppressions.values()),
+    }
@@ -0,0 +1,261 @@
+"""
+Impression par lot des actes de naissance (manage.py imprimer_actes).
+
+Après une campagne de recensement, un bureau imprime des milliers d'actes TARDIF d'un
+coup. Les actes sont choisis par lieu d'établissement, type d'acte et période
+d'établissement, puis assemblés en un seul document HTML paginé, écrit en flux :
+- un manifeste (une ligne par acte, avec sa page) ;
+- une page A4 par acte, rendue depuis le gabarit partagé avec acte_naissance_view
+  (acte_naissance_page.html), avec un pied de page « page n / N ».
+
+Les pages sont rendues par paquets dans un pool de processus. Chaque page rendue est
+gardée sur disque (REGISTRE_IMPRESSION_DOSSIER_PAGES) avec la version de l'acte
+(cache_actes.etag) : réimprimer un lot, d'une exécution à l'autre de la commande, ne
+re-rend que les actes modifiés depuis, sans passer par la vue.
+"""
+import math
+import os
+import time
+from pathlib import Path
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import escape
+
+from . import cache_actes
+from .models import ActeNaissance
+
+GABARIT_LOT = "impression_lot.html"
+GABARIT_PAGE = "acte_naissance_page.html"
+FIN_DOCUMENT = "</body>\n</html>\n"
+TAILLE_PAQUET = 100
+LIGNES_PAR_PAGE_MANIFESTE = 30
+
+CHAMPS_MANIFESTE = (
+    "id",
+    "numero_acte",
+    "date_etablissement",
+    "date_modification",
+    "personne_id",
+    "personne__numero_national",
+    "personne__nom",
+    "personne__postnom",
+    "personne__prenom",
+    "personne__date_modification",
+)
+
+
+def chemin_page(acte_id):
+    return Path(settings.REGISTRE_IMPRESSION_DOSSIER_PAGES) / f"{acte_id}.html"
+
+
+def selectionner(lieu=None, type_acte=None, etabli_depuis=None, etabli_jusqua=None, queryset=None):
+    """
+    Actes à imprimer, dans l'ordre d'impression (numéro d'acte).
+    """
+    queryset = ActeNaissance.objects.all() if queryset is None else queryset
+    if type_acte:
+        queryset = queryset.filter(type_acte=type_acte)
+    if lieu:
+        queryset = queryset.filter(lieu_etablissement=lieu)
+    if etabli_depuis:
+        queryset = queryset.filter(date_etablissement__gte=etabli_depuis)
+    if etabli_jusqua:
+        queryset = queryset.filter(date_etablissement__lte=etabli_jusqua)
+    return queryset.order_by("numero_acte")
+
+
+def libelles_criteres(lieu=None, type_acte=None, etabli_depuis=None, etabli_jusqua=None):
+    """
+    Critères de sélection lisibles [(libellé, valeur)], repris en tête du manifeste.
+    """
+    libelles = (
+        ("Lieu d'établissement", lieu),
+        ("Type d'acte", dict(ActeNaissance.TYPE_ACTE_CHOICES).get(type_acte, type_acte)),
+        ("Établis depuis le", etabli_depuis and etabli_depuis.strftime("%d/%m/%Y")),
+        ("Établis jusqu'au", etabli_jusqua and etabli_jusqua.strftime("%d/%m/%Y")),
+    )
+    return [(libelle, valeur) for libelle, valeur in libelles if valeur]
+
+
+def nombre_pages_manifeste(nombre_actes):
+    return max(1, math.ceil(nombre_actes / LIGNES_PAR_PAGE_MANIFESTE))
+
+
+def manifeste(queryset):
+    """
+    Lignes du manifeste, une par acte, dans l'ordre d'impression : rang, page, numéros,
+    nom complet, date d'établissement et version (etag) de l'acte.
+    Lu avec .values() : aucun objet chargé.
+    """
+    lignes = []
+    for rang, valeurs in enumerate(queryset.values(*CHAMPS_MANIFESTE).iterator(chunk_size=2000), start=1):
+        lignes.append({
+            "rang": rang,
+            "acte_id": valeurs["id"],
+            "numero_acte": valeurs["numero_acte"],
+            "numero_national": valeurs["personne__numero_national"],
+            "nom_complet": " ".join(
+                filter(None, (valeurs["personne__nom"], valeurs["personne__postnom"], valeurs["personne__prenom"]))
+            ),
+            "date_etablissement": valeurs["date_etablissement"],
+            "etag": cache_actes.etag(
+                valeurs["id"], valeurs["date_modification"],
+                valeurs["personne_id"], valeurs["personne__date_modification"],
+            ),
+        })
+    decalage = nombre_pages_manifeste(len(lignes))
+    for ligne in lignes:
+        ligne["page"] = decalage + ligne["rang"]
+    return lignes
+
+
+def rendre_paquet(ids):
+    """
+    Rend la page A4 des actes `ids` : {acte_id: (etag, html)}.
+    Exécutable dans un pool de processus (une requête SQL par paquet).
+    """
+    rendus = {}
+    for acte in ActeNaissance.objects.select_related("personne").filter(pk__in=ids):
+        etag_acte, _ = cache_actes.version(acte.personne, acte)
+        rendus[acte.pk] = (etag_acte, render_to_string(GABARIT_PAGE, {"personne": acte.personne, "acte": acte}))
+    return rendus
+
+
+def _depuis_cache(paquet):
+    """
+    Pages du paquet déjà rendues dans leur version courante : {acte_id: html}.
+    Fichier d'une page : son etag sur la première ligne, puis le HTML.
+    """
+    trouvees = {}
+    for ligne in paquet:
+        try:
+            contenu = chemin_page(ligne["acte_id"]).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            continue
+        etag_page, _, html = contenu.partition("\n")
+        if etag_page == ligne["etag"]:
+            trouvees[ligne["acte_id"]] = html
+    return trouvees
+
+
+def _mettre_en_cache(rendus):
+    """
+    Écrit les pages rendues, chacune remplacée d'un bloc (une impression concurrente
+    ne lit jamais une page à moitié écrite).
+    """
+    dossier = Path(settings.REGISTRE_IMPRESSION_DOSSIER_PAGES)
+    dossier.mkdir(parents=True, exist_ok=True)
+    for acte_id, (etag_acte, html) in rendus.items():
+        chemin = chemin_page(acte_id)
+        temporaire = chemin.with_name(f"{chemin.name}.{os.getpid()}.tmp")
+        temporaire.write_text(f"{etag_acte}\n{html}", encoding="utf-8")
+        os.replace(temporaire, chemin)
+
+
+def _page_manquante(ligne):
+    return (
+        '<div class="page-a4"><p class="text-danger">'
+        f"Acte {escape(ligne['numero_acte'])} introuvable : supprimé après la sélection du lot."
+        "</p></div>"
+    )
+
+
+def _assembler(paquet, trouvees, rendus):
+    """
+    (ligne, html, origine) pour chaque acte du paquet ; les pages rendues sont mises en cache.
+    """
+    if rendus:
+        _mettre_en_cache(rendus)
+    for ligne in paquet:
+        if ligne["acte_id"] in trouvees:
+            yield ligne, trouvees[ligne["acte_id"]], "cache"
+        elif ligne["acte_id"] in rendus:
+            # Version réellement imprimée (l'acte a pu être modifié depuis la sélection)
+            ligne["etag"], html = rendus[ligne["acte_id"]]
+            yield ligne, html, "rendu"
+        else:
+            yield ligne, _page_manquante(ligne), "manquant"
+
+
+def pages(lignes, processus=None, taille_paquet=TAILLE_PAQUET):
+    """
+    (ligne, html, origine) pour chaque ligne du manifeste, dans l'ordre ; origine vaut
+    "cache", "rendu" ou "manquant". Avec `processus` > 1, les rendus tournent dans un pool ;
+    les paquets en vol sont bornés.
+    """
+    paquets = (lignes[debut:debut + taille_paquet] for debut in range(0, len(lignes), taille_paquet))
+
+    if processus == 1:
+        for paquet in paquets:
+            trouvees = _depuis_cache(paquet)
+            manquantes = [ligne["acte_id"] for ligne in paquet if ligne["acte_id"] not in trouvees]
+            yield from _assembler(paquet, trouvees, rendre_paquet(manquantes) if manquantes else {})
+        return
+
+    processus = processus or os.cpu_count() or 1
+    connections.close_all()  # pas de connexion SQLite partagée avec les processus enfants
+    with ProcessPoolExecutor(max_workers=processus, initializer=django.setup) as pool:
+        en_vol = deque()
+
+        def terminer():
+            paquet, trouvees, tache = en_vol.popleft()
+            return _assembler(paquet, trouvees, tache.result() if tache else {})
+
+        for paquet in paquets:
+            trouvees = _depuis_cache(paquet)
+            manquantes = [ligne["acte_id"] for ligne in paquet if ligne["acte_id"] not in trouvees]
+            en_vol.append((paquet, trouvees, pool.submit(rendre_paquet, manquantes) if manquantes else None))
+            if len(en_vol) >= 2 * processus:
+                yield from terminer()
+        while en_vol:
+            yield from terminer()
+
+
+def imprimer(lignes, sortie, criteres=(), processus=None, taille_paquet=TAILLE_PAQUET, progression=None):
+    """
+    Écrit le document du lot dans `sortie` (objet avec write(str)) : manifeste puis une
+    page par acte. `progression(faits, total)` est appelée après chaque paquet.
+    Retourne le bilan du lot.
+    """
+    debut = time.monotonic()
+    total = len(lignes)
+    nb_pages = nombre_pages_manifeste(total) + total
+    sortie.write(render_to_string(GABARIT_LOT, {
+        "pages_manifeste": [
+            lignes[indice:indice + LIGNES_PAR_PAGE_MANIFESTE]
+            for indice in range(0, total, LIGNES_PAR_PAGE_MANIFESTE)
+        ] or [[]],
+        "total": total,
+        "nb_pages": nb_pages,
+        "criteres": criteres,
+        "date": timezone.now(),
+    }))
+
+    origines = Counter()
+    if progression:
+        progression(0, total)
+    for ligne, html, origine in pages(lignes, processus=processus, taille_paquet=taille_paquet):
+        sortie.write(
+            f'<section class="feuille" id="acte-{escape(ligne["numero_acte"])}">\n{html}\n'
+            f'<div class="pied-lot">Acte {escape(ligne["numero_acte"])} – page {ligne["page"]} / {nb_pages}</div>\n'
+            "</section>\n"
+        )
+        origines[origine] += 1
+        if progression and (ligne["rang"] % taille_paquet == 0 or ligne["rang"] == total):
+            progression(ligne["rang"], total)
+    sortie.write(FIN_DOCUMENT)
+
+    return {
+        "actes": total,
+        "pages": nb_pages,
+        "depuis_cache": origines["cache"],
+        "rendus": origines["rendu"],
+        "manquants": origines["manquant"],
+        "secondes": round(time.monotonic() - debut, 2),
+    }
@@ -0,0 +1,242 @@
+"""
+Vérification des invariants du registre (manage.py verifier_registre).
+
+Les tables Personne et ActeNaissance sont lues par paquets, triées sur leur index unique
+(numero_national, numero_acte), et chaque paquet est contrôlé par une fonction pure
+exécutable dans un pool de processus :
+- numéro national : format, préfixe AAMMJJ = date de naissance, clé mod 97 ;
+- naissance (type NAISSANCE) sans acte ;
+- numéro d'acte : format AN-AAAA-NNNNN, année = année d'établissement.
+
+Les ordres attribués sont résumés en intervalles par préfixe de date (ou par année
+pour les actes) : la fusion des intervalles de paquets successifs révèle les numéros
+en double et, une fois un préfixe entièrement lu, les numéros sautés.
+"""
+import os
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .models import ActeNaissance, CompteurActe, CompteurNumeroNational, Personne
+from .numerotation import cle_controle, parser_numero_acte, prefixe_date
+
+# Phases de la vérification, dans l'ordre : clé des plages et types d'anomalies de numérotation
+PHASES = {
+    "personnes": {"cle": "prefixe", "doublon": "ORDRE_EN_DOUBLE", "trou": "ORDRES_MANQUANTS"},
+    "actes": {"cle": "annee", "doublon": "NUMERO_ACTE_EN_DOUBLE", "trou": "NUMEROS_ACTE_MANQUANTS"},
+}
+
+
+def _plages(valeurs):
+    """
+    Valeurs entières triées -> ([(debut, fin)], doublons) ; plages contiguës fusionnées.
+    """
+    plages, doublons = [], []
+    for valeur in valeurs:
+        if plages and valeur == plages[-1][1]:
+            doublons.append(valeur)
+        elif plages and valeur == plages[-1][1] + 1:
+            plages[-1][1] = valeur
+        else:
+            plages.append([valeur, valeur])
+    return plages, doublons
+
+
+def verifier_personnes(lignes):
+    """
+    Contrôle un paquet de personnes : [(id, numero_national, date_naissance, type_enregistrement, acte_id)].
+    Retourne {"nombre", "anomalies": [...], "plages": {prefixe: [[debut, fin]]}}.
+    """
+    anomalies = []
+    ordres = {}
+    for personne_id, numero, date_naissance, type_enregistrement, acte_id in lignes:
+        if type_enregistrement == "NAISSANCE" and acte_id is None:
+            anomalies.append({"type": "NAISSANCE_SANS_ACTE", "personne_id": personne_id, "numero_national": numero})
+
+        if len(numero) != 11 or not numero.isdigit():
+            anomalies.append({"type": "NUMERO_MAL_FORME", "personne_id": personne_id, "numero_national": numero})
+            continue
+        prefixe, ordre = numero[:6], int(numero[6:9])
+        if prefixe != prefixe_date(date_naissance):
+            anomalies.append({
+                "type": "PREFIXE_DATE",
+                "personne_id": personne_id,
+                "numero_national": numero,
+                "date_naissance": date_naissance.isoformat(),
+            })
+        if cle_controle(numero[:9]) != numero[9:]:
+            anomalies.append({
+                "type": "CLE_CONTROLE",
+                "personne_id": personne_id,
+                "numero_national": numero,
+                "cle_attendue": cle_controle(numero[:9]),
+            })
+        ordres.setdefault(prefixe, []).append(ordre)
+
+    plages = {}
+    for prefixe, valeurs in ordres.items():
+        plages[prefixe], doublons = _plages(sorted(valeurs))
+        for ordre in doublons:
+            anomalies.append({"type": "ORDRE_EN_DOUBLE", "prefixe": prefixe, "valeur": ordre})
+    return {"nombre": len(lignes), "anomalies": anomalies, "plages": plages}
+
+
+def verifier_actes(lignes):
+    """
+    Contrôle un paquet d'actes : [(id, numero_acte, date_etablissement, personne_id)].
+    Retourne {"nombre", "anomalies": [...], "plages": {annee: [[debut, fin]]}}.
+    """
+    anomalies = []
+    numeros = {}
+    for acte_id, numero_acte, date_etablissement, personne_id in lignes:
+        analyse = parser_numero_acte(numero_acte)
+        if analyse is None:
+            anomalies.append({"type": "NUMERO_ACTE_MAL_FORME", "acte_id": acte_id, "numero_acte": numero_acte})
+            continue
+        annee, numero = analyse
+        if annee != date_etablissement.year:
+            anomalies.append({
+                "type": "ANNEE_ACTE",
+                "acte_id": acte_id,
+                "numero_acte": numero_acte,
+                "date_etablissement": date_etablissement.isoformat(),
+            })
+        numeros.setdefault(str(annee), []).append(numero)
+
+    plages = {}
+    for annee, valeurs in numeros.items():
+        plages[annee], doublons = _plages(sorted(valeurs))
+        for numero in doublons:
+            anomalies.append({"type": "NUMERO_ACTE_EN_DOUBLE", "annee": annee, "valeur": numero})
+    return {"nombre": len(lignes), "anomalies": anomalies, "plages": plages}
+
+
+def fusionner_plage(plages, debut, fin):
+    """
+    Insère [debut, fin] dans une liste triée de plages disjointes (modifiée sur place).
+    Retourne les valeurs qui y figuraient déjà (doublons entre paquets).
+    """
+    i = bisect_right(plages, [debut, float("inf")])
+    j = i - 1 if i and plages[i - 1][1] >= debut - 1 else i
+    deja = []
+    nouveau_debut, nouvelle_fin = debut, fin
+    k = j
+    while k < len(plages) and plages[k][0] <= fin + 1:
+        a, b = plages[k]
+        deja.extend(range(max(a, debut), min(b, fin) + 1))
+        nouveau_debut, nouvelle_fin = min(nouveau_debut, a), max(nouvelle_fin, b)
+        k += 1
+    plages[j:k] = [[nouveau_debut, nouvelle_fin]]
+    return deja
+
+
+def trous(plages):
+    """
+    Valeurs absentes entre 1 et la plus grande valeur présente, en plages [debut, fin].
+    """
+    manquants = []
+    attendu = 1
+    for debut, fin in plages:
+        if debut > attendu:
+            manquants.append([attendu, debut - 1])
+        attendu = fin + 1
+    return manquants
+
+
+VERIFICATIONS = {"personnes": verifier_personnes, "actes": verifier_actes}
+
+
+def _requete(phase):
+    if phase == "personnes":
+        return "numero_national", Personne.objects.values_list(
+            "id", "numero_national", "date_naissance", "type_enregistrement", "acte_naissance__id"
+        )
+    return "numero_acte", ActeNaissance.objects.values_list("id", "numero_acte", "date_etablissement", "personne_id")
+
+
+def paquets(phase, apres=None, taille=5000):
+    """
+    Paquets (dernière clé lue, lignes) triés sur l'index unique, lus par pagination sur la clé.
+    """
+    champ, requete = _requete(phase)
+    while True:
+        qs = requete.order_by(champ)
+        if apres is not None:
+            qs = qs.filter(**{f"{champ}__gt": apres})
+        lignes = list(qs[:taille])
+        if not lignes:
+            return
+        apres = lignes[-1][1]
+        yield apres, lignes
+
+
+def resultats(phase, apres=None, taille=5000, processus=None):
+    """
+    (dernière clé lue, résultat du contrôle) pour chaque paquet, dans l'ordre de lecture.
+    Avec `processus` > 1, les contrôles tournent dans un pool ; les paquets en vol sont bornés.
+    """
+    verifier = VERIFICATIONS[phase]
+    if processus == 1:
+        for cle, lignes in paquets(phase, apres, taille):
+            yield cle, verifier(lignes)
+        return
+
+    processus = processus or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processus, initializer=django.setup) as pool:
+        en_vol = deque()
+        for cle, lignes in paquets(phase, apres, taille):
+            en_vol.append((cle, pool.submit(verifier, lignes)))
+            if len(en_vol) >= 2 * processus:
+                cle_lue, tache = en_vol.popleft()
+                yield cle_lue, tache.result()
+        while en_vol:
+            cle_lue, tache = en_vol.popleft()
+            yield cle_lue, tache.result()
+
+
+def compteurs(phase):
+    """
+    Valeur des compteurs de numérotation, par clé de plage (préfixe ou année en texte).
+    """
+    if phase == "personnes":
+        return dict(CompteurNumeroNational.objects.values_list("prefixe", "dernier_ordre"))
+    return {str(annee): dernier for annee, dernier in CompteurActe.objects.values_list("annee", "dernier_numero")}
+
+
+def integrer(phase, plages_en_cours, resultat):
+    """
+    Fusionne les plages d'un paquet dans `plages_en_cours` ({cle: [[debut, fin]]}, modifié sur place).
+    Retourne les anomalies du paquet, doublons entre paquets compris.
+    """
+    meta = PHASES[phase]
+    anomalies = list(resultat["anomalies"])
+    for cle, plages in resultat["plages"].items():
+        existantes = plages_en_cours.setdefault(cle, [])
+        for debut, fin in plages:
+            for valeur in fusionner_plage(existantes, debut, fin):
+                anomalies.append({"type": meta["doublon"], meta["cle"]: cle, "valeur": valeur})
+    return anomalies
+
+
+def cloturer(phase, cle, plages, compteurs_phase):
+    """
+    Anomalies d'une clé entièrement lue : numéros sautés, compteur en retard sur les numéros
+    attribués (le prochain numéro alloué entrerait en collision).
+    """
+    meta = PHASES[phase]
+    anomalies = []
+    manquants = trous(plages)
+    if manquants:
+        anomalies.append({
+            "type": meta["trou"],
+            meta["cle"]: cle,
+            "plages": manquants,
+            "nombre": sum(fin - debut + 1 for debut, fin in manquants),
+        })
+    dernier = compteurs_phase.get(cle, 0)
+    if plages and plages[-1][1] > dernier:
+        anomalies.append({"type": "COMPTEUR_EN_RETARD", "phase": phase, meta["cle"]: cle,
+                          "compteur": dernier, "maximum_attribue": plages[-1][1]})
+    return anomalies
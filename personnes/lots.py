@@ -0,0 +1,110 @@
+"""
+Enregistrement de personnes par lots (imports de recensement, synchronisations).
+
+Les numéros nationaux et les numéros d'acte sont réservés par blocs,
+les insertions passent par bulk_create.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Personne, ActeNaissance, CompteurNumeroNational
+from .numerotation import formater_numero_national, prefixe_date
+from .audit import log_audit_lot
+from . import statistiques, analytique, flux
+
+LIEU_PAR_DEFAUT = "Commune de Démonstration"
+OFFICIER_PAR_DEFAUT = "Officier de l'état civil (démo)"
+
+
+def attribuer_numeros_nationaux(personnes):
+    """
+    Attribue les numéros nationaux manquants : un bloc d'ordres par préfixe de date
+    au lieu d'une allocation par personne.
+    """
+    par_prefixe = defaultdict(list)
+    for personne in personnes:
+        if not personne.numero_national:
+            par_prefixe[prefixe_date(personne.date_naissance)].append(personne)
+
+    for prefixe, groupe in par_prefixe.items():
+        premier = CompteurNumeroNational.allouer(prefixe, len(groupe))
+        for ordre, personne in enumerate(groupe, start=premier):
+            personne.numero_national = formater_numero_national(prefixe, ordre)
+
+
+def enregistrer_lot(
+    personnes,
+    type_enregistrement,
+    type_acte=None,
+    lieu_etablissement=LIEU_PAR_DEFAUT,
+    officier=OFFICIER_PAR_DEFAUT,
+    request=None,
+    user=None,
+    action_audit=None,
+    details_audit="",
+):
+    """
+    Insère un lot de Personne non sauvegardées dans une seule transaction.
+
+    - type_acte : si renseigné (NORMAL ou TARDIF), un acte est établi pour chaque personne
+    - action_audit : si renseignée, une entrée JournalAudit par personne (en un seul INSERT)
+
+    Retourne (personnes, actes). Lève NumeroNationalEpuise si un préfixe de date
+    déborde : le lot entier est alors annulé.
+    """
+    sans_numero = [personne for personne in personnes if not personne.numero_national]
+    try:
+        with transaction.atomic():
+            for personne in personnes:
+                personne.type_enregistrement = type_enregistrement
+                personne.normaliser_noms()
+            attribuer_numeros_nationaux(personnes)
+            Personne.objects.bulk_create(personnes)
+
+            actes = []
+            if type_acte:
+                numeros = ActeNaissance.reserver_numeros_acte(len(personnes))
+                actes = [
+                    ActeNaissance(
+                        personne=personne,
+                        type_acte=type_acte,
+                        numero_acte=numero,
+                        lieu_etablissement=lieu_etablissement,
+                        officier=officier,
+                    )
+                    for personne, numero in zip(personnes, numeros)
+                ]
+                ActeNaissance.objects.bulk_create(actes)
+
+            # bulk_create n'émet pas de signaux : agrégats ajustés explicitement
+            statistiques.ajuster(statistiques.fusionner(
+                statistiques.deltas_personne(type_enregistrement, len(personnes)),
+                statistiques.deltas_acte(type_acte, len(actes)) if actes else {},
+            ))
+            if actes:
+                contributions = (analytique.contribution_personne(acte.personne, acte) for acte in actes)
+            else:
+                contributions = (analytique.contribution_personne(personne) for personne in personnes)
+            analytique.ajuster(analytique.deltas(ajouts=contributions))
+            flux.noter([*personnes, *actes])
+
+            if action_audit:
+                log_audit_lot(
+                    request,
+                    action=action_audit,
+                    personnes=personnes,
+                    actes=actes or None,
+                    details=details_audit,
+                    user=user,
+                )
+    except Exception:
+        # Transaction annulée : les numéros et clés attribués en mémoire ne valent plus rien
+        for personne in personnes:
+            personne.pk = None
+            personne._state.adding = True
+        for personne in sans_numero:
+            personne.numero_national = ""
+        raise
+
+    return personnes, actes
@@ -0,0 +1,48 @@
+"""
+Archive les entrées anciennes du journal d'audit et les retire de la table.
+
+Exemples :
+    python manage.py archive_audit --jours 365
+    python manage.py archive_audit --avant 2025-01-01 --dossier /srv/archives/audit
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from personnes.archives_audit import archiver
+
+
+class Command(BaseCommand):
+    help = "Déplace les entrées de JournalAudit antérieures à une date dans une archive JSONL compressée."
+
+    def add_arguments(self, parser):
+        seuil = parser.add_mutually_exclusive_group(required=True)
+        seuil.add_argument("--avant", help="Date limite AAAA-MM-JJ (exclue)")
+        seuil.add_argument("--jours", type=int, help="Archiver ce qui a plus de N jours")
+        parser.add_argument("--dossier", default=str(settings.REGISTRE_ARCHIVES_AUDIT_DOSSIER))
+        parser.add_argument("--taille-lot", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["avant"]:
+            try:
+                jour = datetime.strptime(options["avant"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--avant attend une date AAAA-MM-JJ")
+            avant = timezone.make_aware(datetime.combine(jour, time.min))
+        else:
+            avant = timezone.now() - timedelta(days=options["jours"])
+
+        manifeste = archiver(
+            avant,
+            options["dossier"],
+            taille_lot=options["taille_lot"],
+            progression=lambda n: self.stdout.write(f"{n} entrées archivées..."),
+        )
+        if manifeste is None:
+            self.stdout.write("Aucune entrée à archiver.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{manifeste['nombre']} entrées archivées dans {manifeste['fichier']} (sha256 {manifeste['sha256'][:12]}…)."
+        ))
@@ -0,0 +1,131 @@
+"""
+Banc d'essai : peuple une base dédiée de données synthétiques puis mesure les parcours
+principaux (inscriptions, recherche, fiche, statistiques). Résultats en JSON.
+
+Exemples :
+    REGISTRE_DB_CHEMIN=/tmp/banc_1m.sqlite3 python manage.py migrate
+    REGISTRE_DB_CHEMIN=/tmp/banc_1m.sqlite3 python manage.py banc_essai --taille 1m --sortie banc_1m.json
+    # Mesures seules sur une base déjà peuplée (comparaison entre deux commits)
+    REGISTRE_DB_CHEMIN=/tmp/banc_1m.sqlite3 python manage.py banc_essai --reutiliser --sortie apres.json
+"""
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from personnes import banc_essai
+from personnes.models import ActeNaissance, JournalAudit, Personne
+
+
+def _commit_courant():
+    try:
+        resultat = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return resultat.stdout.strip()
+
+
+class Command(BaseCommand):
+    help = "Peuple une base de données synthétiques (10k, 1m, 10m) et mesure latences et débits en JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille", default="10k", help="10k, 1m, 10m ou un nombre de fiches")
+        parser.add_argument("--graine", type=int, default=42)
+        parser.add_argument("--reutiliser", action="store_true", help="Mesurer la base existante sans la peupler")
+        parser.add_argument("--requetes", type=int, default=200, help="Requêtes par scénario")
+        parser.add_argument("--clients", type=int, default=4, help="Clients parallèles des scénarios concurrents")
+        parser.add_argument("--taille-lot", type=int, default=5000)
+        parser.add_argument("--sortie", help="Fichier JSON (défaut : sortie standard)")
+
+    def handle(self, *args, **options):
+        taille = banc_essai.lire_taille(options["taille"])
+        existantes = Personne.objects.count()
+
+        peuplement = None
+        if existantes and not options["reutiliser"]:
+            raise CommandError(
+                f"La base {connection.settings_dict['NAME']} contient déjà {existantes} fiches. "
+                "Utiliser --reutiliser, ou une base dédiée via REGISTRE_DB_CHEMIN."
+            )
+        if not existantes:
+            duree = banc_essai.peupler(
+                taille,
+                graine=options["graine"],
+                taille_lot=options["taille_lot"],
+                progression=lambda n: self.stderr.write(f"\r{n}/{taille} fiches...", ending=""),
+            )
+            self.stderr.write("")
+            peuplement = {"fiches": taille, "secondes": round(duree, 2), "fiches_par_s": round(taille / duree, 1)}
+
+        scenarios = self._mesurer(options)
+        resultat = {
+            "date": timezone.now().isoformat(),
+            "commit": _commit_courant(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "base": str(connection.settings_dict["NAME"]),
+            "graine": options["graine"],
+            "volumes": {
+                "personnes": Personne.objects.count(),
+                "actes": ActeNaissance.objects.count(),
+                "journal_audit": JournalAudit.objects.count(),
+            },
+            "peuplement": peuplement,
+            "scenarios": scenarios,
+        }
+
+        texte = json.dumps(resultat, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as sortie:
+                sortie.write(texte + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Résultats écrits dans {options['sortie']}."))
+        else:
+            self.stdout.write(texte)
+
+    def _echantillon(self, graine, nombre=1000):
+        """
+        Fiches existantes tirées au hasard par identifiant (sans ORDER BY RANDOM()).
+        """
+        bornes = Personne.objects.aggregate(bas=Min("id"), haut=Max("id"))
+        tirage = random.Random(graine)
+        ids = {tirage.randint(bornes["bas"], bornes["haut"]) for _ in range(nombre)}
+        return list(Personne.objects.filter(id__in=ids).values_list("id", "numero_national"))
+
+    def _mesurer(self, options):
+        utilisateur, _ = get_user_model().objects.get_or_create(username="banc_essai")
+        echantillon = self._echantillon(options["graine"])
+        identifiants = [identifiant for identifiant, _ in echantillon]
+        numeros = [numero for _, numero in echantillon]
+        n, clients = options["requetes"], options["clients"]
+
+        def scenario(requetes):
+            return banc_essai.Scenario(utilisateur, requetes)
+
+        # Lectures d'abord, sur la base telle que peuplée ; écritures ensuite
+        mesures = {
+            "recherche_citoyen": (scenario(banc_essai.requetes_recherche(numeros)), 1),
+            "detail_citoyen": (scenario(banc_essai.requetes_detail(identifiants)), 1),
+            "stats_view": (scenario(banc_essai.requetes_fixes("stats")), 1),
+            "nouvelle_naissance": (banc_essai.scenario_inscription(utilisateur, False), 1),
+            "nouvelle_naissance_concurrente": (banc_essai.scenario_inscription(utilisateur, False), clients),
+            "nouvel_adulte": (banc_essai.scenario_inscription(utilisateur, True), 1),
+            "nouvel_adulte_concurrent": (banc_essai.scenario_inscription(utilisateur, True), clients),
+        }
+
+        resultats = {}
+        for indice, (nom, (mesure, nb_clients)) in enumerate(mesures.items()):
+            self.stderr.write(f"{nom} ({nb_clients} client(s))...")
+            resultats[nom] = mesure.executer(n, clients=nb_clients, graine=options["graine"] + 1000 * indice)
+        return resultats
@@ -0,0 +1,62 @@
+"""
+Recherche des doublons probables dans tout le registre.
+
+Exemples :
+    python manage.py detect_doublons --sortie doublons.csv
+    python manage.py detect_doublons --seuil 0.9 --processus 8 --type ADULTE
+"""
+import csv
+
+from django.core.management.base import BaseCommand
+
+from personnes import doublons
+from personnes.models import Personne
+
+COLONNES_FICHE = ("numero_national", "type_enregistrement", "nom", "postnom", "prenom", "sexe", "date_naissance", "nom_mere")
+
+
+class Command(BaseCommand):
+    help = "Détecte les doublons probables par clés de blocage et écrit un rapport CSV classé par score."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sortie", default="doublons.csv", help="Rapport CSV (défaut : doublons.csv)")
+        parser.add_argument("--seuil", type=float, default=doublons.SEUIL_RAPPORT)
+        parser.add_argument("--processus", type=int, help="Taille du pool (défaut : nombre de CPU ; 1 = sans pool)")
+        parser.add_argument("--type", choices=["NAISSANCE", "ADULTE"], help="Restreindre à un type d'enregistrement")
+
+    def handle(self, *args, **options):
+        queryset = Personne.objects.all()
+        if options["type"]:
+            queryset = queryset.filter(type_enregistrement=options["type"])
+
+        paires = doublons.detecter(
+            queryset,
+            seuil=options["seuil"],
+            processus=options["processus"],
+            progression=lambda n: self.stderr.write(f"\r{n} paires candidates...", ending=""),
+        )
+        self.stderr.write("")
+
+        with open(options["sortie"], "w", newline="", encoding="utf-8") as sortie:
+            ecrivain = csv.writer(sortie)
+            ecrivain.writerow(
+                ["rang", "score", "cles"]
+                + [f"{colonne}_a" for colonne in COLONNES_FICHE]
+                + [f"{colonne}_b" for colonne in COLONNES_FICHE]
+            )
+            # Fiches relues par paquets, dans l'ordre du rapport
+            for debut in range(0, len(paires), 1000):
+                paquet = paires[debut:debut + 1000]
+                ids = {identifiant for _, id_a, id_b, _ in paquet for identifiant in (id_a, id_b)}
+                fiches = {
+                    fiche["id"]: fiche
+                    for fiche in Personne.objects.filter(id__in=ids).values("id", *COLONNES_FICHE)
+                }
+                for rang, (valeur, id_a, id_b, cles) in enumerate(paquet, start=debut + 1):
+                    ecrivain.writerow(
+                        [rang, f"{valeur:.3f}", "|".join(cles)]
+                        + [fiches[id_a][colonne] for colonne in COLONNES_FICHE]
+                        + [fiches[id_b][colonne] for colonne in COLONNES_FICHE]
+                    )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(paires)} paires candidates écrites dans {options['sortie']}."))
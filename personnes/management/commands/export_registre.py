@@ -0,0 +1,60 @@
+"""
+Export du registre en CSV ou JSONL, en mémoire constante.
+
+Exemples :
+    python manage.py export_registre --format jsonl --gzip --sortie registre.jsonl.gz
+    python manage.py export_registre --modifie-depuis 2025-12-01T00:00:00 --sortie increment.csv
+"""
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from personnes import export
+from personnes.models import Personne
+
+
+class Command(BaseCommand):
+    help = "Exporte Personne + ActeNaissance en CSV ou JSONL (filtres, export incrémental, gzip)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="csv")
+        parser.add_argument("--sortie", help="Fichier de sortie (défaut : sortie standard)")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--type", choices=["NAISSANCE", "ADULTE"])
+        parser.add_argument("--ne-depuis", help="Date de naissance minimale AAAA-MM-JJ")
+        parser.add_argument("--ne-jusqua", help="Date de naissance maximale AAAA-MM-JJ")
+        parser.add_argument("--modifie-depuis", help="Export incrémental : modifiés depuis (date ou horodatage ISO)")
+        parser.add_argument("--taille-lot", type=int, default=export.TAILLE_LOT)
+        parser.add_argument("--base", default=DEFAULT_DB_ALIAS, help="Alias de base à lire (ex. une réplique)")
+
+    def handle(self, *args, **options):
+        try:
+            filtres = export.filtres_depuis_parametres(options)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["base"] not in connections:
+            raise CommandError(f"Base inconnue : {options['base']}")
+        queryset = Personne.objects.using(options["base"])
+        lignes = export.iterer_lignes(export.filtrer(**filtres, queryset=queryset), taille_lot=options["taille_lot"])
+        fragments = export.produire(self._compter(lignes), options["format"])
+        self.nombre = 0
+
+        if options["sortie"]:
+            ouvrir = gzip.open if options["gzip"] else open
+            with ouvrir(options["sortie"], "wt", encoding="utf-8", newline="") as sortie:
+                sortie.writelines(fragments)
+            self.stderr.write(self.style.SUCCESS(f"{self.nombre} personnes exportées dans {options['sortie']}."))
+        elif options["gzip"]:
+            for bloc in export.compresser(fragments):
+                sys.stdout.buffer.write(bloc)
+        else:
+            for fragment in fragments:
+                self.stdout.write(fragment, ending="")
+
+    def _compter(self, lignes):
+        for ligne in lignes:
+            self.nombre += 1
+            yield ligne
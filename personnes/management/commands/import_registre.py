@@ -0,0 +1,199 @@
+"""
+Import en masse de données de recensement (CSV ou JSONL).
+
+Exemple :
+    python manage.py import_registre recensement.csv --type ADULTE --taille-lot 2000
+    python manage.py import_registre recensement.csv --type ADULTE --reprendre
+"""
+import csv
+import json
+import os
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from personnes.forms import PersonneForm
+from personnes.lots import enregistrer_lot
+from personnes.models import Personne
+from personnes.numerotation import NumeroNationalEpuise
+
+CHAMPS = PersonneForm.Meta.fields
+NATIONALITE_PAR_DEFAUT = Personne._meta.get_field("nationalite").default
+
+
+def lire_lignes(chemin, format_source):
+    """
+    Générateur (numéro de ligne, dictionnaire ou exception) en mémoire constante.
+    """
+    with open(chemin, newline="", encoding="utf-8-sig") as fichier:
+        if format_source == "csv":
+            lecteur = csv.DictReader(fichier)
+            for numero, ligne in enumerate(lecteur, start=1):
+                yield numero, ligne
+        else:
+            for numero, brut in enumerate(fichier, start=1):
+                if not brut.strip():
+                    continue
+                try:
+                    ligne = json.loads(brut)
+                    if not isinstance(ligne, dict):
+                        raise ValueError("objet JSON attendu")
+                except ValueError as exc:
+                    yield numero, exc
+                else:
+                    yield numero, ligne
+
+
+class Command(BaseCommand):
+    help = "Importe des personnes depuis un fichier CSV ou JSONL (validation PersonneForm, insertion par lots)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Fichier CSV (avec en-tête) ou JSONL")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Déduit de l'extension si absent")
+        parser.add_argument("--type", choices=["ADULTE", "NAISSANCE"], default="ADULTE", dest="type_enregistrement")
+        parser.add_argument(
+            "--acte-tardif",
+            action="store_true",
+            help="Établir un acte TARDIF pour chaque adulte importé (les naissances reçoivent toujours un acte NORMAL)",
+        )
+        parser.add_argument("--lieu", default="Commune de Démonstration", help="Lieu d'établissement des actes")
+        parser.add_argument("--officier", default="Officier de l'état civil (démo)")
+        parser.add_argument("--taille-lot", type=int, default=1000)
+        parser.add_argument("--utilisateur", help="Nom d'utilisateur inscrit dans le journal d'audit")
+        parser.add_argument("--checkpoint", help="Fichier de reprise (défaut : <source>.checkpoint.json)")
+        parser.add_argument("--reprendre", action="store_true", help="Reprendre après la dernière ligne validée")
+        parser.add_argument("--rapport-erreurs", help="Fichier CSV des lignes rejetées (défaut : <source>.erreurs.csv)")
+
+    def handle(self, *args, **options):
+        source = Path(options["source"])
+        if not source.exists():
+            raise CommandError(f"Fichier introuvable : {source}")
+        if options["taille_lot"] < 1:
+            raise CommandError("--taille-lot doit être positif")
+
+        format_source = options["format"] or ("jsonl" if source.suffix.lower() in (".jsonl", ".ndjson") else "csv")
+        chemin_checkpoint = Path(options["checkpoint"] or f"{source}.checkpoint.json")
+        chemin_erreurs = Path(options["rapport_erreurs"] or f"{source}.erreurs.csv")
+
+        self.user = None
+        if options["utilisateur"]:
+            try:
+                self.user = get_user_model().objects.get(username=options["utilisateur"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['utilisateur']}")
+
+        type_enregistrement = options["type_enregistrement"]
+        if type_enregistrement == "NAISSANCE":
+            self.type_acte = "NORMAL"
+        else:
+            self.type_acte = "TARDIF" if options["acte_tardif"] else None
+        self.options = options
+        self.type_enregistrement = type_enregistrement
+        self.details_audit = f"Import de recensement : {source.name}"
+
+        etat = {"source": str(source.resolve()), "lignes_traitees": 0, "inserees": 0, "rejetees": 0}
+        if options["reprendre"] and chemin_checkpoint.exists():
+            precedent = json.loads(chemin_checkpoint.read_text())
+            if precedent.get("source") != etat["source"]:
+                raise CommandError(f"Le checkpoint {chemin_checkpoint} concerne un autre fichier.")
+            etat = precedent
+            self.stdout.write(f"Reprise après la ligne {etat['lignes_traitees']}.")
+
+        mode_erreurs = "a" if options["reprendre"] and chemin_erreurs.exists() else "w"
+        with open(chemin_erreurs, mode_erreurs, newline="", encoding="utf-8") as fichier_erreurs:
+            self.rapport = csv.writer(fichier_erreurs)
+            if mode_erreurs == "w":
+                self.rapport.writerow(["ligne", "erreurs", "donnees"])
+            self._importer(source, format_source, etat, chemin_checkpoint)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Import terminé : {etat['inserees']} personnes insérées, {etat['rejetees']} lignes rejetées "
+            f"(rapport : {chemin_erreurs})."
+        ))
+
+    def _importer(self, source, format_source, etat, chemin_checkpoint):
+        deja_traitees = etat["lignes_traitees"]
+        lot = []
+        debut = time.monotonic()
+        traitees_session = 0
+
+        for numero, ligne in lire_lignes(source, format_source):
+            if numero <= deja_traitees:
+                continue
+
+            personne = self._valider(numero, ligne, etat)
+            if personne is not None:
+                lot.append((numero, ligne, personne))
+            etat["lignes_traitees"] = numero
+            traitees_session += 1
+
+            if len(lot) >= self.options["taille_lot"]:
+                self._inserer(lot, etat)
+                lot = []
+                self._sauver_checkpoint(chemin_checkpoint, etat)
+                self._afficher_progression(etat, traitees_session, debut)
+
+        if lot:
+            self._inserer(lot, etat)
+        self._sauver_checkpoint(chemin_checkpoint, etat)
+        self._afficher_progression(etat, traitees_session, debut)
+
+    def _valider(self, numero, ligne, etat):
+        if isinstance(ligne, Exception):
+            self._rejeter(numero, {"__all__": [f"JSON invalide : {ligne}"]}, {}, etat)
+            return None
+
+        donnees = {champ: str(ligne.get(champ) or "").strip() for champ in CHAMPS}
+        if not donnees["nationalite"]:
+            donnees["nationalite"] = NATIONALITE_PAR_DEFAUT
+        form = PersonneForm(data=donnees)
+        if not form.is_valid():
+            self._rejeter(numero, form.errors.get_json_data(), ligne, etat)
+            return None
+        return form.save(commit=False)
+
+    def _inserer(self, lot, etat):
+        try:
+            self._enregistrer([personne for _, _, personne in lot])
+        except NumeroNationalEpuise:
+            # Un préfixe de date déborde : on isole les lignes fautives une par une
+            for numero, ligne, personne in lot:
+                try:
+                    self._enregistrer([personne])
+                except NumeroNationalEpuise as exc:
+                    self._rejeter(numero, {"date_naissance": [str(exc)]}, ligne, etat)
+                else:
+                    etat["inserees"] += 1
+        else:
+            etat["inserees"] += len(lot)
+
+    def _enregistrer(self, personnes):
+        enregistrer_lot(
+            personnes,
+            self.type_enregistrement,
+            type_acte=self.type_acte,
+            lieu_etablissement=self.options["lieu"],
+            officier=self.options["officier"],
+            user=self.user,
+            action_audit=f"IMPORT_{self.type_enregistrement}",
+            details_audit=self.details_audit,
+        )
+
+    def _rejeter(self, numero, erreurs, ligne, etat):
+        etat["rejetees"] += 1
+        self.rapport.writerow([numero, json.dumps(erreurs, ensure_ascii=False), json.dumps(ligne, ensure_ascii=False)])
+
+    @staticmethod
+    def _sauver_checkpoint(chemin, etat):
+        temporaire = chemin.with_name(chemin.name + ".tmp")
+        temporaire.write_text(json.dumps(etat))
+        os.replace(temporaire, chemin)
+
+    def _afficher_progression(self, etat, traitees_session, debut):
+        duree = max(time.monotonic() - debut, 1e-6)
+        self.stdout.write(
+            f"{etat['lignes_traitees']} lignes traitées – {etat['inserees']} insérées, "
+            f"{etat['rejetees']} rejetées – {traitees_session / duree:.0f} lignes/s"
+        )
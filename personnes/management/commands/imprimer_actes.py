@@ -0,0 +1,134 @@
+"""
+Impression par lot des actes de naissance : un document HTML paginé (manifeste puis
+une page A4 par acte) et son manifeste JSON.
+
+Exemples :
+    python manage.py imprimer_actes --type TARDIF --lieu "Commune de Kampemba" \
+        --etabli-depuis 2026-01-01 --etabli-jusqua 2026-03-31 --sortie kampemba_t1.html
+    # Suivi depuis un autre terminal pendant l'impression
+    cat kampemba_t1.html.progression.json
+
+Le manifeste (<sortie>.manifeste.json) reprend les critères, le bilan, l'empreinte
+SHA-256 du document et, pour chaque acte, sa page et la version imprimée (etag).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from personnes import impression
+from personnes.models import ActeNaissance
+
+
+class _SortieEmpreinte:
+    """
+    Fichier texte UTF-8 dont l'empreinte SHA-256 est calculée au fil de l'écriture.
+    """
+
+    def __init__(self, fichier):
+        self.fichier = fichier
+        self.empreinte = hashlib.sha256()
+
+    def write(self, texte):
+        donnees = texte.encode("utf-8")
+        self.empreinte.update(donnees)
+        self.fichier.write(donnees)
+
+
+class Command(BaseCommand):
+    help = "Imprime un lot d'actes de naissance (lieu, type, période) en un document paginé avec manifeste."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lieu", help="Lieu d'établissement (valeur exacte)")
+        parser.add_argument("--type", choices=[code for code, _ in ActeNaissance.TYPE_ACTE_CHOICES])
+        parser.add_argument("--etabli-depuis", help="Date d'établissement minimale AAAA-MM-JJ")
+        parser.add_argument("--etabli-jusqua", help="Date d'établissement maximale AAAA-MM-JJ")
+        parser.add_argument("--sortie", help="Document HTML (défaut : actes_<horodatage>.html)")
+        parser.add_argument("--processus", type=int, help="Taille du pool (défaut : nombre de CPU ; 1 = sans pool)")
+        parser.add_argument("--taille-paquet", type=int, default=impression.TAILLE_PAQUET)
+        parser.add_argument(
+            "--progression", help="Fichier JSON de suivi, réécrit après chaque paquet (défaut : <sortie>.progression.json)"
+        )
+
+    def handle(self, *args, **options):
+        if options["taille_paquet"] < 1:
+            raise CommandError("--taille-paquet doit être positif")
+        filtres = {
+            "lieu": options["lieu"],
+            "type_acte": options["type"],
+            "etabli_depuis": self._date(options["etabli_depuis"]),
+            "etabli_jusqua": self._date(options["etabli_jusqua"]),
+        }
+        chemin = Path(options["sortie"] or f"actes_{timezone.now():%Y%m%d_%H%M%S}.html")
+        self.chemin_progression = Path(options["progression"] or f"{chemin}.progression.json")
+        self.debut = timezone.now()
+
+        lignes = impression.manifeste(impression.selectionner(**filtres))
+        if not lignes:
+            raise CommandError("Aucun acte ne correspond à ces critères.")
+        self.stderr.write(f"{len(lignes)} actes sélectionnés.")
+
+        criteres = impression.libelles_criteres(**filtres)
+        with open(chemin, "wb") as fichier:
+            sortie = _SortieEmpreinte(fichier)
+            bilan = impression.imprimer(
+                lignes,
+                sortie,
+                criteres=criteres,
+                processus=options["processus"],
+                taille_paquet=options["taille_paquet"],
+                progression=self._progression,
+            )
+        self._ecrire_progression("termine", len(lignes), len(lignes))
+
+        manifeste = {
+            "document": chemin.name,
+            "sha256": sortie.empreinte.hexdigest(),
+            "date": self.debut.isoformat(),
+            "criteres": dict(criteres),
+            "bilan": bilan,
+            "actes": [
+                {**ligne, "date_etablissement": ligne["date_etablissement"].isoformat()} for ligne in lignes
+            ],
+        }
+        chemin_manifeste = Path(f"{chemin}.manifeste.json")
+        chemin_manifeste.write_text(json.dumps(manifeste, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        self.stderr.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"{bilan['actes']} actes, {bilan['pages']} pages ({bilan['depuis_cache']} depuis le cache, "
+            f"{bilan['rendus']} rendus) en {bilan['secondes']} s : {chemin} (manifeste : {chemin_manifeste})."
+        ))
+        if bilan["manquants"]:
+            self.stdout.write(self.style.WARNING(f"{bilan['manquants']} actes supprimés depuis la sélection."))
+
+    @staticmethod
+    def _date(valeur):
+        if not valeur:
+            return None
+        try:
+            jour = parse_date(valeur)
+        except ValueError:  # bien formée mais inexistante (2026-02-30)
+            jour = None
+        if jour is None:
+            raise CommandError(f"Date invalide : {valeur}")
+        return jour
+
+    def _progression(self, faits, total):
+        self.stderr.write(f"\r{faits}/{total} actes...", ending="")
+        self._ecrire_progression("en_cours", faits, total)
+
+    def _ecrire_progression(self, etat, faits, total):
+        temporaire = self.chemin_progression.with_name(self.chemin_progression.name + ".tmp")
+        temporaire.write_text(json.dumps({
+            "etat": etat,
+            "faits": faits,
+            "total": total,
+            "debut": self.debut.isoformat(),
+            "maj": timezone.now().isoformat(),
+        }))
+        os.replace(temporaire, self.chemin_progression)
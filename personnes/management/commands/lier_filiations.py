@@ -0,0 +1,70 @@
+"""
+Relie les personnes aux fiches de leurs parents (Personne.pere / Personne.mere).
+
+Exemples :
+    python manage.py lier_filiations --simulation
+    python manage.py lier_filiations --ambigus filiations_ambigues.csv
+
+Seules les correspondances uniques sont reliées (voir personnes.filiations) ; les cas
+à plusieurs fiches possibles sont écrits dans le fichier --ambigus pour vérification.
+Les personnes déjà reliées ne sont pas réexaminées : la commande peut être relancée.
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from personnes import filiations
+from personnes.models import Personne
+
+
+class Command(BaseCommand):
+    help = "Relie chaque personne aux fiches de ses parents (nom et prénom normalisés, écart d'âge plausible)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=filiations.TAILLE_LOT)
+        parser.add_argument("--simulation", action="store_true", help="Compter sans rien enregistrer")
+        parser.add_argument("--ambigus", help="Fichier CSV des correspondances multiples")
+        parser.add_argument("--type", choices=["NAISSANCE", "ADULTE"], help="Restreindre à un type d'enregistrement")
+
+    def handle(self, *args, **options):
+        if options["taille_lot"] < 1:
+            raise CommandError("--taille-lot doit être positif")
+        queryset = Personne.objects.all()
+        if options["type"]:
+            queryset = queryset.filter(type_enregistrement=options["type"])
+
+        fichier = open(options["ambigus"], "w", newline="", encoding="utf-8") if options["ambigus"] else None
+        try:
+            signaler = None
+            if fichier:
+                ecrivain = csv.writer(fichier)
+                ecrivain.writerow(["numero_national", "role", "nombre", "candidats"])
+                numeros = Personne.objects.values_list("numero_national", flat=True)
+
+                def signaler(enfant, role, ids):
+                    ecrivain.writerow(
+                        [enfant["numero_national"], role, len(ids), "|".join(numeros.filter(pk__in=ids).order_by("pk"))]
+                    )
+
+            bilan = filiations.lier(
+                queryset,
+                taille_lot=options["taille_lot"],
+                simulation=options["simulation"],
+                signaler=signaler,
+                progression=lambda n: self.stderr.write(f"\r{n} personnes examinées...", ending=""),
+            )
+        finally:
+            if fichier:
+                fichier.close()
+        self.stderr.write("")
+
+        prefixe = "Simulation : " if options["simulation"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixe}{bilan['examinees']} personnes examinées ; "
+            f"pères reliés : {bilan['pere_relie']}, mères reliées : {bilan['mere_relie']}."
+        ))
+        for role in filiations.ROLES:
+            self.stdout.write(
+                f"  {role} : {bilan[f'{role}_ambigu']} ambigus, {bilan[f'{role}_sans_fiche']} sans fiche, "
+                f"{bilan[f'{role}_incomplet']} saisies incomplètes"
+            )
@@ -0,0 +1,53 @@
+"""
+Recherche dans les archives du journal d'audit sans les réimporter.
+
+Exemple :
+    python manage.py lire_archive_audit --action CREATION_ADULTE --utilisateur officier1 --depuis 2024-01-01
+"""
+import json
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from personnes.archives_audit import ArchiveCorrompue, rechercher
+
+
+def _date(valeur, heure):
+    if not valeur:
+        return None
+    try:
+        jour = datetime.strptime(valeur, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Date invalide : {valeur} (AAAA-MM-JJ attendu)")
+    return timezone.make_aware(datetime.combine(jour, heure))
+
+
+class Command(BaseCommand):
+    help = "Affiche en JSONL les entrées archivées du journal d'audit qui correspondent aux critères."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dossier", default=str(settings.REGISTRE_ARCHIVES_AUDIT_DOSSIER))
+        parser.add_argument("--action")
+        parser.add_argument("--utilisateur")
+        parser.add_argument("--numero-national")
+        parser.add_argument("--depuis", help="AAAA-MM-JJ (inclus)")
+        parser.add_argument("--jusqua", help="AAAA-MM-JJ (inclus)")
+        parser.add_argument("--sans-verification", action="store_true", help="Ne pas contrôler les empreintes SHA-256")
+
+    def handle(self, *args, **options):
+        entrees = rechercher(
+            options["dossier"],
+            action=options["action"],
+            utilisateur=options["utilisateur"],
+            numero_national=options["numero_national"],
+            depuis=_date(options["depuis"], time.min),
+            jusqua=_date(options["jusqua"], time.max),
+            verifier=not options["sans_verification"],
+        )
+        try:
+            for entree in entrees:
+                self.stdout.write(json.dumps(entree, ensure_ascii=False))
+        except ArchiveCorrompue as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,108 @@
+"""
+Réplique le registre central sur la base locale (miroir provincial) depuis le flux de changements.
+
+Exemples :
+    python manage.py pull_changes https://registre.example/api/flux/ --utilisateur miroir-kasai
+    python manage.py pull_changes https://registre.example/api/flux/ --utilisateur miroir-kasai \\
+        --modifie-depuis 2026-10-01   # miroir déjà chargé depuis un export du registre
+
+Mot de passe : --mot-de-passe ou variable d'environnement REGISTRE_MIROIR_MOT_DE_PASSE.
+Chaque page est appliquée dans une transaction, puis son curseur est écrit dans --etat :
+une interruption reprend à la page suivante (une page rejouée ne change rien).
+La commande s'arrête quand le miroir est à jour ; la lancer périodiquement (cron, tâche de fond).
+"""
+import base64
+import json
+import os
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from personnes import flux
+
+
+class Command(BaseCommand):
+    help = "Applique à la base locale les changements du registre central (GET /api/flux/), page par page."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="URL du flux, ex. https://registre.example/api/flux/")
+        parser.add_argument("--utilisateur", required=True, help="Compte avec la permission personnes.view_personne")
+        parser.add_argument("--mot-de-passe", default=os.environ.get("REGISTRE_MIROIR_MOT_DE_PASSE", ""))
+        parser.add_argument("--etat", default="pull_changes.json", help="Fichier du curseur de reprise")
+        parser.add_argument("--limite", type=int, help="Changements par page (défaut : celui de la source)")
+        parser.add_argument("--modifie-depuis", help="Premier appel : fiches modifiées depuis cette date seulement")
+        parser.add_argument("--delai", type=float, default=60.0, help="Délai d'attente HTTP en secondes")
+
+    def handle(self, *args, **options):
+        chemin_etat = Path(options["etat"])
+        etat = {"source": options["source"], "curseur": None}
+        if chemin_etat.exists():
+            etat = json.loads(chemin_etat.read_text())
+            if etat["source"] != options["source"]:
+                raise CommandError(f"{chemin_etat} suit la source {etat['source']} : choisir un autre --etat.")
+        elif options["modifie_depuis"]:
+            etat["modifie_depuis"] = options["modifie_depuis"]
+
+        identifiants = f"{options['utilisateur']}:{options['mot_de_passe']}".encode()
+        entetes = {
+            "Authorization": "Basic " + base64.b64encode(identifiants).decode(),
+            "Accept": "application/json",
+        }
+        totaux = {"pages": 0, "ecritures": 0, "suppressions": 0}
+        while True:
+            parametres = {"limite": options["limite"] or ""}
+            if etat["curseur"]:
+                parametres["curseur"] = etat["curseur"]
+            else:
+                parametres["modifie_depuis"] = etat.get("modifie_depuis") or ""
+            page = self._lire_page(options["source"], parametres, entetes, options["delai"])
+            try:
+                bilan = flux.appliquer(page["changements"])
+            except (KeyError, TypeError, ValueError) as exc:
+                raise CommandError(f"Page du flux illisible : {exc!r}")
+            except DatabaseError as exc:
+                # Page annulée en entier, curseur inchangé : le prochain passage la rejoue
+                raise CommandError(f"Page du flux non appliquée : {exc}")
+
+            etat["curseur"] = page["curseur"]
+            self._sauver_etat(chemin_etat, etat)
+            totaux["pages"] += 1
+            totaux["ecritures"] += bilan["ecritures"]
+            totaux["suppressions"] += bilan["suppressions"]
+            self.stdout.write(
+                f"Page {totaux['pages']} ({page['phase']}) : "
+                f"{bilan['ecritures']} écritures, {bilan['suppressions']} suppressions"
+            )
+            if page["fin"]:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Miroir à jour : {totaux['ecritures']} écritures et {totaux['suppressions']} suppressions "
+            f"en {totaux['pages']} pages."
+        ))
+
+    def _lire_page(self, source, parametres, entetes, delai):
+        parametres = {cle: valeur for cle, valeur in parametres.items() if valeur}
+        requete = Request(f"{source}?{urlencode(parametres)}" if parametres else source, headers=entetes)
+        try:
+            with urlopen(requete, timeout=delai) as reponse:
+                return json.load(reponse)
+        except HTTPError as exc:
+            try:
+                message = json.load(exc).get("erreur")
+            except ValueError:
+                message = exc.reason
+            raise CommandError(f"La source a répondu {exc.code} : {message}")
+        except URLError as exc:
+            raise CommandError(f"Source injoignable : {exc.reason}")
+        except ValueError:
+            raise CommandError("La source n'a pas renvoyé de JSON.")
+
+    def _sauver_etat(self, chemin, etat):
+        temporaire = chemin.with_name(chemin.name + ".tmp")
+        temporaire.write_text(json.dumps(etat))
+        os.replace(temporaire, chemin)
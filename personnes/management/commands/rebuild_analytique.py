@@ -0,0 +1,39 @@
+"""
+Recalcule les agrégats démographiques (AgregatNaissances) depuis les tables sources.
+
+À lancer après une modification en masse hors ORM (update(), SQL direct) ou pour contrôle,
+de préférence hors charge : la reconstruction tient une transaction d'écriture.
+    python manage.py rebuild_analytique
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from personnes import analytique
+from personnes.models import AgregatNaissances
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats AgregatNaissances depuis Personne et ActeNaissance."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=5000, help="Fiches lues par aller-retour SQL.")
+
+    def totaux(self):
+        return AgregatNaissances.objects.aggregate(**{mesure: Sum(mesure) for mesure in analytique.MESURES})
+
+    def handle(self, *args, **options):
+        debut = time.monotonic()
+        avant = self.totaux()
+        lignes = analytique.recalculer(taille_lot=options["taille_lot"])
+        apres = self.totaux()
+
+        for mesure in analytique.MESURES:
+            valeur = apres[mesure] or 0
+            ancienne = avant[mesure] or 0
+            ecart = "" if ancienne == valeur else f" (était {ancienne})"
+            self.stdout.write(f"{mesure} : {valeur}{ecart}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{lignes} agrégats reconstruits en {time.monotonic() - debut:.1f} s."
+        ))
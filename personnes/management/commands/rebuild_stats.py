@@ -0,0 +1,25 @@
+"""
+Recalcule les agrégats de la page de statistiques depuis les tables sources.
+
+À lancer après une modification en masse hors ORM (update(), SQL direct) ou pour contrôle :
+    python manage.py rebuild_stats
+"""
+from django.core.management.base import BaseCommand
+
+from personnes import statistiques
+from personnes.models import StatistiquesRegistre
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la ligne d'agrégats StatistiquesRegistre depuis Personne et ActeNaissance."
+
+    def handle(self, *args, **options):
+        avant = StatistiquesRegistre.objects.filter(pk=statistiques.PK_STATISTIQUES).values().first()
+        stats = statistiques.recalculer()
+
+        for champ in statistiques.CHAMPS_TOTAUX:
+            valeur = getattr(stats, champ)
+            ancienne = avant[champ] if avant else None
+            ecart = "" if ancienne in (None, valeur) else f" (était {ancienne})"
+            self.stdout.write(f"{champ} : {valeur}{ecart}")
+        self.stdout.write(self.style.SUCCESS("Statistiques reconstruites."))
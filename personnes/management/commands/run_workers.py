@@ -0,0 +1,32 @@
+"""
+Exécute les tâches de fond en file (personnes.taches), sans broker externe.
+
+    python manage.py run_workers --processus 4
+    python manage.py run_workers --une-fois      # vide la file puis s'arrête (cron)
+
+SIGTERM ou Ctrl-C : chaque worker termine sa tâche en cours puis s'arrête.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from personnes import taches
+
+
+class Command(BaseCommand):
+    help = "Lance les workers des tâches de fond (file tenue en base)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processus", type=int, help="Nombre de workers (défaut : nombre de CPU ; 1 = sans pool)")
+        parser.add_argument("--intervalle", type=float, default=2.0, help="Secondes entre deux lectures d'une file vide")
+        parser.add_argument("--une-fois", action="store_true", help="S'arrêter dès que la file est vide")
+
+    def handle(self, *args, **options):
+        processus = options["processus"] or os.cpu_count() or 1
+        if processus < 1:
+            raise CommandError("--processus doit être positif")
+        self.stdout.write(f"{processus} worker(s) démarré(s).")
+        executees = taches.lancer_workers(processus, intervalle=options["intervalle"], une_fois=options["une_fois"])
+        if executees is not None:
+            self.stdout.write(f"{executees} tâche(s) exécutée(s).")
+        self.stdout.write(self.style.SUCCESS("Workers arrêtés."))
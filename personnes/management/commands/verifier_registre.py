@@ -0,0 +1,114 @@
+"""
+Vérifie les invariants de numérotation du registre et écrit un rapport JSONL.
+
+Exemples :
+    python manage.py verifier_registre --rapport /srv/rapports/registre.jsonl --processus 8
+    python manage.py verifier_registre --rapport /srv/rapports/registre.jsonl --reprendre
+
+Chaque ligne du rapport est un objet JSON {"type": ..., ...} ; la dernière est le résumé
+{"type": "RESUME", ...}. Le checkpoint (curseur de lecture et plages en cours) est
+réécrit après chaque paquet : --reprendre repart du dernier paquet intégré.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from personnes import integrite
+
+
+class Command(BaseCommand):
+    help = "Contrôle numéros nationaux, numéros d'acte et naissances sans acte ; rapport JSONL reprenable."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rapport", default="verification_registre.jsonl")
+        parser.add_argument("--checkpoint", help="Fichier de reprise (défaut : <rapport>.checkpoint.json)")
+        parser.add_argument("--reprendre", action="store_true", help="Reprendre après le dernier paquet vérifié")
+        parser.add_argument("--taille-lot", type=int, default=5000)
+        parser.add_argument("--processus", type=int, help="Taille du pool (défaut : nombre de CPU ; 1 = sans pool)")
+
+    def handle(self, *args, **options):
+        if options["taille_lot"] < 1:
+            raise CommandError("--taille-lot doit être positif")
+        chemin_rapport = Path(options["rapport"])
+        chemin_checkpoint = Path(options["checkpoint"] or f"{chemin_rapport}.checkpoint.json")
+
+        etat = {
+            "phase": next(iter(integrite.PHASES)),
+            "curseur": None,
+            "plages": {},
+            "lus": {phase: 0 for phase in integrite.PHASES},
+            "anomalies": {},
+            "debut": timezone.now().isoformat(),
+        }
+        reprise = options["reprendre"] and chemin_checkpoint.exists()
+        if reprise:
+            etat = json.loads(chemin_checkpoint.read_text())
+            if etat["phase"] is None:
+                raise CommandError(f"La vérification de {chemin_checkpoint} est déjà terminée.")
+            self.stdout.write(f"Reprise de la phase {etat['phase']} après {etat['curseur']}.")
+
+        self.chemin_checkpoint = chemin_checkpoint
+        with open(chemin_rapport, "a" if reprise else "w", encoding="utf-8") as rapport:
+            self.rapport = rapport
+            phases = list(integrite.PHASES)
+            for phase in phases[phases.index(etat["phase"]):]:
+                self._verifier(phase, etat, options)
+            etat["phase"] = None
+            self._ecrire([{"type": "RESUME", "lus": etat["lus"], "anomalies": etat["anomalies"],
+                           "debut": etat["debut"], "fin": timezone.now().isoformat()}], etat)
+            self._sauver_checkpoint(etat)
+
+        total = sum(etat["anomalies"].values())
+        style = self.style.SUCCESS if not total else self.style.WARNING
+        self.stdout.write(style(
+            f"{etat['lus']['personnes']} personnes et {etat['lus']['actes']} actes vérifiés : "
+            f"{total} anomalies (rapport : {chemin_rapport})."
+        ))
+
+    def _verifier(self, phase, etat, options):
+        compteurs = integrite.compteurs(phase)
+        debut = time.monotonic()
+        for curseur, resultat in integrite.resultats(
+            phase, apres=etat["curseur"], taille=options["taille_lot"], processus=options["processus"]
+        ):
+            anomalies = integrite.integrer(phase, etat["plages"], resultat)
+            # Les clés inférieures à la plus grande du paquet ne reviendront plus : flux trié
+            derniere = max(resultat["plages"], default=None)
+            for cle in sorted(etat["plages"]):
+                if derniere is not None and cle < derniere:
+                    anomalies += integrite.cloturer(phase, cle, etat["plages"].pop(cle), compteurs)
+            etat["curseur"] = curseur
+            etat["lus"][phase] += resultat["nombre"]
+            self._ecrire(anomalies, etat)
+            self._sauver_checkpoint(etat)
+            self.stdout.write(
+                f"{phase} : {etat['lus'][phase]} lus – "
+                f"{etat['lus'][phase] / max(time.monotonic() - debut, 1e-6):.0f} lignes/s"
+            )
+
+        anomalies = []
+        for cle in sorted(etat["plages"]):
+            anomalies += integrite.cloturer(phase, cle, etat["plages"][cle], compteurs)
+        phases = list(integrite.PHASES)
+        suivante = phases.index(phase) + 1
+        etat.update(phase=phases[suivante] if suivante < len(phases) else None, curseur=None, plages={})
+        self._ecrire(anomalies, etat)
+        self._sauver_checkpoint(etat)
+
+    def _ecrire(self, anomalies, etat):
+        for anomalie in anomalies:
+            self.rapport.write(json.dumps(anomalie, ensure_ascii=False) + "\n")
+            if anomalie["type"] != "RESUME":
+                etat["anomalies"][anomalie["type"]] = etat["anomalies"].get(anomalie["type"], 0) + 1
+        # Le rapport est sur disque avant le checkpoint qui le référence
+        self.rapport.flush()
+        os.fsync(self.rapport.fileno())
+
+    def _sauver_checkpoint(self, etat):
+        temporaire = self.chemin_checkpoint.with_name(self.chemin_checkpoint.name + ".tmp")
+        temporaire.write_text(json.dumps(etat))
+        os.replace(temporaire, self.chemin_checkpoint)
@@ -0,0 +1,223 @@
+"""
+Métriques de performance par vue, exposées au format texte Prometheus.
+
+Pour chaque requête, MetriquesMiddleware (personnes.middleware) ouvre une mesure portée
+par une ContextVar ; les requêtes SQL (execute_wrapper installé sur chaque connexion)
+et les rendus de gabarits (backend GabaritsMesures) y ajoutent leur durée. La mesure
+terminée alimente des histogrammes en mémoire, par nom d'URL.
+
+Les histogrammes sont propres au processus : avec plusieurs workers, chaque worker
+expose ses propres compteurs (Prometheus agrège les cibles).
+"""
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+BORNES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BORNES_NOMBRE = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BORNES_TAILLE = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+REQUETES_LENTES_CONSERVEES = 5
+
+HISTOGRAMMES = {
+    "registre_requete_duree_secondes": ("Durée totale de la requête", BORNES_DUREE),
+    "registre_requete_sql_nombre": ("Nombre de requêtes SQL par requête HTTP", BORNES_NOMBRE),
+    "registre_requete_sql_duree_secondes": ("Temps passé en base par requête HTTP", BORNES_DUREE),
+    "registre_requete_gabarit_duree_secondes": ("Temps de rendu des gabarits par requête HTTP", BORNES_DUREE),
+    "registre_reponse_taille_octets": ("Taille du corps de la réponse", BORNES_TAILLE),
+}
+
+_mesure_courante = ContextVar("mesure_courante", default=None)
+
+
+class Mesure:
+    """
+    Compteurs d'une requête HTTP en cours.
+    """
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.nb_sql = 0
+        self.duree_sql = 0.0
+        self.duree_gabarits = 0.0
+        self.plus_lentes = []  # tas (durée, n°, sql) des requêtes SQL les plus longues
+
+    def ajouter_sql(self, duree, sql):
+        self.nb_sql += 1
+        self.duree_sql += duree
+        entree = (duree, self.nb_sql, sql)
+        if len(self.plus_lentes) < REQUETES_LENTES_CONSERVEES:
+            heapq.heappush(self.plus_lentes, entree)
+        elif duree > self.plus_lentes[0][0]:
+            heapq.heapreplace(self.plus_lentes, entree)
+
+    def requetes_les_plus_lentes(self):
+        return [(duree, sql) for duree, _, sql in sorted(self.plus_lentes, reverse=True)]
+
+
+def demarrer():
+    """
+    Ouvre une mesure pour le contexte courant ; retourne le jeton à passer à terminer().
+    """
+    mesure = Mesure()
+    return mesure, _mesure_courante.set(mesure)
+
+
+def terminer(jeton):
+    _mesure_courante.reset(jeton)
+
+
+def instrumenter_sql(execute, sql, params, many, context):
+    """
+    execute_wrapper : chronomètre la requête si une mesure est ouverte dans le contexte.
+    """
+    mesure = _mesure_courante.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.ajouter_sql(time.perf_counter() - debut, sql)
+
+
+def installer_sur_connexion(connexion):
+    if instrumenter_sql not in connexion.execute_wrappers:
+        connexion.execute_wrappers.append(instrumenter_sql)
+
+
+class _Histogramme:
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.effectifs = [0] * (len(bornes) + 1)  # dernier = +Inf
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur):
+        for indice, borne in enumerate(self.bornes):
+            if valeur <= borne:
+                break
+        else:
+            indice = len(self.bornes)
+        self.effectifs[indice] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+
+class _Registre:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._histogrammes = {}
+        self._reponses = {}
+
+    def observer(self, metrique, vue, valeur):
+        with self._verrou:
+            cle = (metrique, vue)
+            if cle not in self._histogrammes:
+                self._histogrammes[cle] = _Histogramme(HISTOGRAMMES[metrique][1])
+            self._histogrammes[cle].observer(valeur)
+
+    def compter_reponse(self, vue, statut):
+        with self._verrou:
+            cle = (vue, str(statut))
+            self._reponses[cle] = self._reponses.get(cle, 0) + 1
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._histogrammes.clear()
+            self._reponses.clear()
+
+    def exposition(self):
+        """
+        Texte au format d'exposition Prometheus (version 0.0.4).
+        """
+        with self._verrou:
+            lignes = []
+            for metrique, (aide, _) in HISTOGRAMMES.items():
+                lignes += [f"# HELP {metrique} {aide}", f"# TYPE {metrique} histogram"]
+                for (nom, vue), histogramme in sorted(self._histogrammes.items()):
+                    if nom != metrique:
+                        continue
+                    cumul = 0
+                    for borne, effectif in zip(histogramme.bornes + ("+Inf",), histogramme.effectifs):
+                        cumul += effectif
+                        lignes.append(f'{metrique}_bucket{{vue="{vue}",le="{borne}"}} {cumul}')
+                    lignes.append(f'{metrique}_sum{{vue="{vue}"}} {histogramme.somme}')
+                    lignes.append(f'{metrique}_count{{vue="{vue}"}} {histogramme.nombre}')
+            lignes += ["# HELP registre_reponses_total Réponses par vue et code HTTP",
+                       "# TYPE registre_reponses_total counter"]
+            for (vue, statut), nombre in sorted(self._reponses.items()):
+                lignes.append(f'registre_reponses_total{{vue="{vue}",statut="{statut}"}} {nombre}')
+            return "\n".join(lignes) + "\n"
+
+
+registre = _Registre()
+
+
+def enregistrer(vue, mesure, statut, taille, seuil_lent=None):
+    """
+    Verse une mesure terminée dans les histogrammes ; journalise la requête si elle est lente.
+    `taille` vaut None pour une réponse en flux (observée plus tard par observer_taille).
+    """
+    duree = time.perf_counter() - mesure.debut
+    registre.observer("registre_requete_duree_secondes", vue, duree)
+    registre.observer("registre_requete_sql_nombre", vue, mesure.nb_sql)
+    registre.observer("registre_requete_sql_duree_secondes", vue, mesure.duree_sql)
+    registre.observer("registre_requete_gabarit_duree_secondes", vue, mesure.duree_gabarits)
+    if taille is not None:
+        registre.observer("registre_reponse_taille_octets", vue, taille)
+    registre.compter_reponse(vue, statut)
+
+    if seuil_lent is not None and duree >= seuil_lent:
+        logger.warning(
+            "Requête lente : %s %.3f s, %d requêtes SQL (%.3f s), gabarits %.3f s. Requêtes les plus longues :\n%s",
+            vue,
+            duree,
+            mesure.nb_sql,
+            mesure.duree_sql,
+            mesure.duree_gabarits,
+            "\n".join(f"  {1000 * d:.1f} ms  {sql[:300]}" for d, sql in mesure.requetes_les_plus_lentes()),
+        )
+
+
+def observer_taille(vue, taille):
+    registre.observer("registre_reponse_taille_octets", vue, taille)
+
+
+class _GabaritMesure:
+    """
+    Enveloppe d'un gabarit du backend Django : chronomètre render().
+    """
+
+    def __init__(self, gabarit):
+        self.gabarit = gabarit
+
+    def __getattr__(self, nom):
+        return getattr(self.gabarit, nom)
+
+    def render(self, context=None, request=None):
+        mesure = _mesure_courante.get()
+        if mesure is None:
+            return self.gabarit.render(context, request)
+        debut = time.perf_counter()
+        try:
+            return self.gabarit.render(context, request)
+        finally:
+            mesure.duree_gabarits += time.perf_counter() - debut
+
+
+class GabaritsMesures(DjangoTemplates):
+    """
+    Backend DjangoTemplates dont les rendus sont comptés dans la mesure de la requête.
+    """
+
+    def from_string(self, template_code):
+        return _GabaritMesure(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _GabaritMesure(super().get_template(template_name))
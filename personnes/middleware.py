@@ -0,0 +1,116 @@
+"""
+Middlewares du registre.
+Tous deux acceptent les piles synchrones (WSGI) et asynchrones (ASGI) : sous ASGI,
+les vues asynchrones de consultation ne repassent pas par un thread à cause d'eux.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import metriques, routage
+
+VUE_INCONNUE = "inconnue"
+
+
+class MetriquesMiddleware:
+    """
+    Mesure chaque requête (durée, requêtes SQL, temps en base, rendu des gabarits,
+    taille de la réponse) et l'agrège par nom d'URL (voir personnes.metriques).
+    À placer en tête de MIDDLEWARE pour couvrir toute la pile.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Connexions déjà ouvertes ; les suivantes sont instrumentées par le signal connection_created
+        for connexion in connections.all(initialized_only=True):
+            metriques.installer_sur_connexion(connexion)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mesure, jeton = metriques.demarrer()
+        try:
+            response = self.get_response(request)
+        finally:
+            metriques.terminer(jeton)
+        return self._enregistrer(request, mesure, response)
+
+    async def __acall__(self, request):
+        mesure, jeton = metriques.demarrer()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metriques.terminer(jeton)
+        return self._enregistrer(request, mesure, response)
+
+    def _enregistrer(self, request, mesure, response):
+        correspondance = getattr(request, "resolver_match", None)
+        vue = (correspondance.url_name if correspondance else None) or VUE_INCONNUE
+        seuil = getattr(settings, "REGISTRE_METRIQUES_SEUIL_LENT", None)
+
+        if response.streaming:
+            metriques.enregistrer(vue, mesure, response.status_code, None, seuil)
+            compter = self._acompter_flux if response.is_async else self._compter_flux
+            response.streaming_content = compter(vue, response.streaming_content)
+        else:
+            metriques.enregistrer(vue, mesure, response.status_code, len(response.content), seuil)
+        return response
+
+    @staticmethod
+    def _compter_flux(vue, contenu):
+        taille = 0
+        for bloc in contenu:
+            taille += len(bloc)
+            yield bloc
+        metriques.observer_taille(vue, taille)
+
+    @staticmethod
+    async def _acompter_flux(vue, contenu):
+        taille = 0
+        async for bloc in contenu:
+            taille += len(bloc)
+            yield bloc
+        metriques.observer_taille(vue, taille)
+
+
+class RoutageMiddleware:
+    """
+    Pose l'état de routage lecture/écriture de la requête (voir personnes.routage) :
+    primaire imposée après une écriture récente de la session, épinglage après écriture.
+    À placer après SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        jeton = routage.debut_requete(request.session.get(routage.CLE_SESSION))
+        try:
+            response = self.get_response(request)
+        finally:
+            echeance = routage.fin_requete(jeton)
+            if echeance is not None:
+                request.session[routage.CLE_SESSION] = echeance
+        return response
+
+    async def __acall__(self, request):
+        jeton = routage.debut_requete(await request.session.aget(routage.CLE_SESSION))
+        try:
+            response = await self.get_response(request)
+        finally:
+            echeance = routage.fin_requete(jeton)
+            if echeance is not None:
+                await request.session.aset(routage.CLE_SESSION, echeance)
+        return response
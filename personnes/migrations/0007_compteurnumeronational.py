@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0006_alter_actenaissance_id_alter_journalaudit_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurNumeroNational',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefixe', models.CharField(max_length=6, unique=True)),
+                ('dernier_ordre', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Compteur de numéros nationaux',
+                'verbose_name_plural': 'Compteurs de numéros nationaux',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0007_compteurnumeronational'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurActe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('annee', models.PositiveSmallIntegerField(unique=True)),
+                ('dernier_numero', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Compteur d'actes de naissance",
+                'verbose_name_plural': "Compteurs d'actes de naissance",
+            },
+        ),
+    ]
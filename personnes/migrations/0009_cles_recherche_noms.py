@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+from personnes.recherche import cle_phonetique, normaliser
+
+
+def calculer_cles_recherche(apps, schema_editor):
+    Personne = apps.get_model("personnes", "Personne")
+    lot = []
+    for personne in Personne.objects.only("nom", "postnom", "prenom").iterator(chunk_size=2000):
+        personne.nom_normalise = normaliser(personne.nom)
+        personne.postnom_normalise = normaliser(personne.postnom)
+        personne.prenom_normalise = normaliser(personne.prenom)
+        personne.nom_phonetique = cle_phonetique(personne.nom)
+        lot.append(personne)
+        if len(lot) >= 2000:
+            Personne.objects.bulk_update(lot, ["nom_normalise", "postnom_normalise", "prenom_normalise", "nom_phonetique"])
+            lot = []
+    if lot:
+        Personne.objects.bulk_update(lot, ["nom_normalise", "postnom_normalise", "prenom_normalise", "nom_phonetique"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0008_compteuracte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personne',
+            name='nom_normalise',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='personne',
+            name='nom_phonetique',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='personne',
+            name='postnom_normalise',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='personne',
+            name='prenom_normalise',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(calculer_cles_recherche, migrations.RunPython.noop),
+    ]
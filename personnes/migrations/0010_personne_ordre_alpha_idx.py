@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0009_cles_recherche_noms'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['nom', 'postnom', 'prenom', 'id'], name='personne_ordre_alpha_idx'),
+        ),
+    ]
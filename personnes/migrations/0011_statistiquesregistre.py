@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 13:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0010_personne_ordre_alpha_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiquesRegistre',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_citoyens', models.BigIntegerField(default=0)),
+                ('total_naissances', models.BigIntegerField(default=0)),
+                ('total_adultes', models.BigIntegerField(default=0)),
+                ('total_actes', models.BigIntegerField(default=0)),
+                ('actes_normaux', models.BigIntegerField(default=0)),
+                ('actes_tardifs', models.BigIntegerField(default=0)),
+                ('date_mise_a_jour', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Statistiques du registre',
+                'verbose_name_plural': 'Statistiques du registre',
+            },
+        ),
+    ]
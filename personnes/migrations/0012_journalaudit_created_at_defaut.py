@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 13:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0011_statistiquesregistre'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalaudit',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
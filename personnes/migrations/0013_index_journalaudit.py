@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 13:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0012_journalaudit_created_at_defaut'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalaudit',
+            index=models.Index(fields=['-created_at'], name='audit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalaudit',
+            index=models.Index(fields=['action', '-created_at'], name='audit_action_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalaudit',
+            index=models.Index(fields=['user', '-created_at'], name='audit_user_created_idx'),
+        ),
+    ]
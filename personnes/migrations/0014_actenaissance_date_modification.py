@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0013_index_journalaudit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actenaissance',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0014_actenaissance_date_modification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['date_naissance', 'nom_phonetique'], name='personne_blocage_idx'),
+        ),
+    ]
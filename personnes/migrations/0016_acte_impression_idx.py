@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0015_personne_blocage_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actenaissance',
+            index=models.Index(fields=['type_acte', 'lieu_etablissement', 'date_etablissement'], name='acte_impression_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0016_acte_impression_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='actenaissance',
+            name='acte_impression_idx',
+        ),
+        migrations.AddIndex(
+            model_name='actenaissance',
+            index=models.Index(fields=['type_acte', 'date_etablissement'], name='acte_type_etablissement_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actenaissance',
+            index=models.Index(fields=['date_etablissement'], name='acte_etablissement_idx'),
+        ),
+    ]
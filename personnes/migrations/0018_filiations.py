@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 14:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0017_index_admin_actes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personne',
+            name='mere',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='enfants_de_la_mere', to='personnes.personne'),
+        ),
+        migrations.AddField(
+            model_name='personne',
+            name='pere',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='enfants_du_pere', to='personnes.personne'),
+        ),
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['nom_normalise', 'prenom_normalise', 'date_naissance'], name='personne_filiation_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0 on 2026-10-18 14:20
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+# Copie figée de personnes.analytique au moment de cette migration
+TRANCHES_DELAI = (
+    (30, "delai_moins_30j"),
+    (365, "delai_moins_1an"),
+    (5 * 365, "delai_moins_5ans"),
+    (None, "delai_5ans_et_plus"),
+)
+
+
+def remplir_agregats(apps, schema_editor):
+    Personne = apps.get_model("personnes", "Personne")
+    AgregatNaissances = apps.get_model("personnes", "AgregatNaissances")
+    sources = Personne.objects.values_list(
+        "date_naissance",
+        "sexe",
+        "type_enregistrement",
+        "acte_naissance__type_acte",
+        "acte_naissance__lieu_etablissement",
+        "acte_naissance__date_etablissement",
+    ).iterator(chunk_size=5000)
+    totaux = defaultdict(Counter)
+    for date_naissance, sexe, type_enregistrement, type_acte, lieu, date_etablissement in sources:
+        if not type_acte:
+            totaux[(date_naissance, sexe, type_enregistrement, "", "")]["naissances"] += 1
+            continue
+        delai = (date_etablissement - date_naissance).days
+        mesures = totaux[(date_naissance, sexe, type_enregistrement, type_acte, lieu)]
+        mesures["naissances"] += 1
+        mesures["actes"] += 1
+        mesures["somme_delais_jours"] += delai
+        mesures[next(champ for limite, champ in TRANCHES_DELAI if limite is None or delai < limite)] += 1
+    AgregatNaissances.objects.bulk_create(
+        [
+            AgregatNaissances(
+                jour=jour, sexe=sexe, type_enregistrement=type_enregistrement,
+                type_acte=type_acte, lieu_etablissement=lieu, **mesures,
+            )
+            for (jour, sexe, type_enregistrement, type_acte, lieu), mesures in totaux.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0018_filiations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgregatNaissances',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('sexe', models.CharField(max_length=1)),
+                ('type_enregistrement', models.CharField(max_length=10)),
+                ('type_acte', models.CharField(blank=True, max_length=10)),
+                ('lieu_etablissement', models.CharField(blank=True, max_length=150)),
+                ('naissances', models.BigIntegerField(default=0)),
+                ('actes', models.BigIntegerField(default=0)),
+                ('somme_delais_jours', models.BigIntegerField(default=0)),
+                ('delai_moins_30j', models.BigIntegerField(default=0)),
+                ('delai_moins_1an', models.BigIntegerField(default=0)),
+                ('delai_moins_5ans', models.BigIntegerField(default=0)),
+                ('delai_5ans_et_plus', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Agrégat de naissances',
+                'verbose_name_plural': 'Agrégats de naissances',
+                'constraints': [models.UniqueConstraint(fields=('jour', 'sexe', 'type_enregistrement', 'type_acte', 'lieu_etablissement'), name='agregat_naissances_cle')],
+            },
+        ),
+        migrations.RunPython(remplir_agregats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 14:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0019_agregats_naissances'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnregistrementSynchronise',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bureau', models.CharField(max_length=50)),
+                ('id_client', models.CharField(max_length=100)),
+                ('lot', models.CharField(blank=True, max_length=100)),
+                ('date_synchronisation', models.DateTimeField(default=django.utils.timezone.now)),
+                ('personne', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='synchronisations', to='personnes.personne')),
+            ],
+            options={
+                'verbose_name': 'Enregistrement synchronisé',
+                'verbose_name_plural': 'Enregistrements synchronisés',
+                'constraints': [models.UniqueConstraint(fields=('bureau', 'id_client'), name='synchro_bureau_id_client')],
+            },
+        ),
+    ]
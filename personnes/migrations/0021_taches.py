@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-18 14:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0020_enregistrements_synchronises'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('commande', models.CharField(max_length=50)),
+                ('arguments', models.JSONField(blank=True, default=list)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINEE', 'Terminée'), ('ECHOUEE', 'Échouée')], default='EN_ATTENTE', max_length=10)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('tentatives_max', models.PositiveIntegerField(default=3)),
+                ('executer_apres', models.DateTimeField(default=django.utils.timezone.now)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('progression_faits', models.BigIntegerField(blank=True, null=True)),
+                ('progression_total', models.BigIntegerField(blank=True, null=True)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('journal', models.TextField(blank=True)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('date_signe_vie', models.DateTimeField(blank=True, null=True)),
+                ('demandee_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tâche de fond',
+                'verbose_name_plural': 'Tâches de fond',
+                'indexes': [models.Index(fields=['statut', 'executer_apres'], name='tache_file_idx')],
+            },
+        ),
+    ]
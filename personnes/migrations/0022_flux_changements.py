@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 14:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0021_taches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Changement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('modele', models.CharField(choices=[('PERSONNE', 'Personne'), ('ACTE', 'Acte de naissance')], max_length=10)),
+                ('objet_id', models.BigIntegerField()),
+                ('id_personne', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('ECRITURE', 'Création ou modification'), ('SUPPRESSION', 'Suppression')], max_length=12)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Changement du registre',
+                'verbose_name_plural': 'Changements du registre',
+                'indexes': [models.Index(fields=['date'], name='changement_date_idx')],
+            },
+        ),
+    ]
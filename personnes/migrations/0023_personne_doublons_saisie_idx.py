@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0022_flux_changements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['nom_phonetique', 'prenom_normalise'], name='personne_phon_prenom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['date_naissance', 'prenom_normalise'], name='personne_date_prenom_idx'),
+        ),
+    ]
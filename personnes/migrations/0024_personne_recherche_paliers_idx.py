@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0023_personne_doublons_saisie_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['nom_normalise', 'nom', 'postnom', 'prenom', 'id'], name='personne_recherche_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['nom_phonetique', 'nom_normalise', 'nom', 'postnom', 'prenom', 'id'], name='personne_recherche_phon_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnes', '0024_personne_recherche_paliers_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actenaissance',
+            index=models.Index(fields=['date_modification'], name='acte_modification_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personne',
+            index=models.Index(fields=['date_modification'], name='personne_modification_idx'),
+        ),
+    ]
@@ -1,7 +1,39 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Max
+from django.db.models.functions import Cast, Substr
 from django.conf import settings
 from django.utils import timezone
 
+from .numerotation import (
+    ORDRE_MAX,
+    NumeroNationalEpuise,
+    bornes_annee_acte,
+    bornes_prefixe,
+    formater_numero_acte,
+    formater_numero_national,
+    prefixe_date,
+)
+from .recherche import cle_phonetique, normaliser
+
+
+def _incrementer_compteur(modele, cle, champ, nombre, amorce):
+    """
+    Incrémente atomiquement le compteur `modele` identifié par `cle` et retourne sa nouvelle valeur.
+
+    L'UPDATE verrouille la ligne jusqu'à la fin de la transaction de l'appelant :
+    deux workers ne peuvent pas lire la même valeur. Si la ligne n'existe pas encore,
+    elle est créée avec `amorce()` comme point de départ.
+    """
+    compteur = modele.objects.filter(**cle)
+    if not compteur.update(**{champ: F(champ) + nombre}):
+        try:
+            with transaction.atomic():
+                modele.objects.create(**cle, **{champ: amorce() + nombre})
+        except IntegrityError:
+            # Un autre worker vient de créer le compteur
+            compteur.update(**{champ: F(champ) + nombre})
+    return compteur.values_list(champ, flat=True).get()
+
 
 class Personne(models.Model):
     SEXE_CHOICES = [
@@ -27,6 +59,12 @@ class Personne(models.Model):
     postnom = models.CharField(max_length=100, blank=True)
     prenom = models.CharField(max_length=100)
 
+    # Clés de recherche (voir personnes.recherche), recalculées à chaque save()
+    nom_normalise = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
+    postnom_normalise = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
+    prenom_normalise = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
+    nom_phonetique = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
+
     sexe = models.CharField(max_length=1, choices=SEXE_CHOICES)
     date_naissance = models.DateField()
 
@@ -35,20 +73,75 @@ class Personne(models.Model):
     nom_mere = models.CharField(max_length=100)
     prenom_mere = models.CharField(max_length=100, blank=True)
 
+    # Fiches des parents quand elles existent, reliées par manage.py lier_filiations
+    # (voir personnes.filiations) ; clés étrangères indexées : enfants et fratrie par index
+    pere = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="enfants_du_pere"
+    )
+    mere = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="enfants_de_la_mere"
+    )
+
     nationalite = models.CharField(max_length=100, default='Congolaise')
     adresse_actuelle = models.CharField(max_length=255, blank=True)
 
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Ordre d'affichage des résultats de recherche (pagination par curseur)
+            models.Index(fields=["nom", "postnom", "prenom", "id"], name="personne_ordre_alpha_idx"),
+            # Paliers de la recherche par nom : filtre et ordre lus sur l'index (voir paliers_recherche)
+            models.Index(
+                fields=["nom_normalise", "nom", "postnom", "prenom", "id"], name="personne_recherche_nom_idx"
+            ),
+            models.Index(
+                fields=["nom_phonetique", "nom_normalise", "nom", "postnom", "prenom", "id"],
+                name="personne_recherche_phon_idx",
+            ),
+            # Blocage de la détection de doublons (voir personnes.doublons)
+            models.Index(fields=["date_naissance", "nom_phonetique"], name="personne_blocage_idx"),
+            # Contrôle des doublons à la saisie : un index par bloc (voir doublons_probables)
+            models.Index(fields=["nom_phonetique", "prenom_normalise"], name="personne_phon_prenom_idx"),
+            models.Index(fields=["date_naissance", "prenom_normalise"], name="personne_date_prenom_idx"),
+            # Recherche des fiches parentes (voir personnes.filiations)
+            models.Index(
+                fields=["nom_normalise", "prenom_normalise", "date_naissance"], name="personne_filiation_idx"
+            ),
+            # Export incrémental ?modifie_depuis= (voir personnes.export.filtrer)
+            models.Index(fields=["date_modification"], name="personne_modification_idx"),
+        ]
+
     def __str__(self):
         return f"{self.nom} {self.postnom} {self.prenom} ({self.numero_national})"
 
+    CHAMPS_NOMS = ("nom", "postnom", "prenom")
+    CHAMPS_CLES_RECHERCHE = ("nom_normalise", "postnom_normalise", "prenom_normalise", "nom_phonetique")
+
     def save(self, *args, **kwargs):
         # Générer automatiquement le numéro national
         if not self.numero_national and self.date_naissance:
             self.numero_national = self.generer_numero_national()
-        super().save(*args, **kwargs)
+
+        # Tenir les clés de recherche à jour
+        self.normaliser_noms()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.CHAMPS_NOMS):
+            kwargs["update_fields"] = set(update_fields) | set(self.CHAMPS_CLES_RECHERCHE)
+
+        # Une seule transaction pour la ligne et les agrégats mis à jour par les signaux
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def normaliser_noms(self):
+        """
+        Calcule les clés de recherche. À appeler explicitement avant un bulk_create.
+        """
+        self.nom_normalise = normaliser(self.nom)
+        self.postnom_normalise = normaliser(self.postnom)
+        self.prenom_normalise = normaliser(self.prenom)
+        self.nom_phonetique = cle_phonetique(self.nom)
 
     def generer_numero_national(self):
         """
@@ -56,31 +149,64 @@ class Personne(models.Model):
         - AA = 2 derniers chiffres de l'année
         - MM = mois
         - JJ = jour
-        - OOO = ordre (compteur des personnes déjà enregistrées pour cette date + 1)
+        - OOO = ordre attribué par le compteur du préfixe AAMMJJ (voir CompteurNumeroNational)
         - CC = clé de contrôle mod 97
+
+        Lève NumeroNationalEpuise si les 999 ordres du préfixe sont déjà attribués.
         """
+        prefixe = prefixe_date(self.date_naissance)  # Exemple : 251209
+        ordre = CompteurNumeroNational.allouer(prefixe)
+        return formater_numero_national(prefixe, ordre)
 
-        # 1) Partie date AAMMJJ
-        aa = str(self.date_naissance.year)[-2:]
-        mm = f"{self.date_naissance.month:02d}"
-        jj = f"{self.date_naissance.day:02d}"
-        date_part = f"{aa}{mm}{jj}"  # Exemple : 251209
 
-        # 2) Calcul de OOO (ordre de la naissance ce jour-là)
-        count_same_date = self.__class__.objects.filter(date_naissance=self.date_naissance).count()
-        ordre = count_same_date + 1
-        ooo = f"{ordre:03d}"  # Exemple : 001, 045, 452
+class CompteurNumeroNational(models.Model):
+    """
+    Dernier ordre OOO attribué pour chaque préfixe de date AAMMJJ.
 
-        # 3) Calcul de la clé de contrôle CC
-        base_number = int(f"{date_part}{ooo}")  # 9 chiffres
-        reste = base_number % 97
-        cc_val = 97 - reste
-        if cc_val == 97:
-            cc_val = 0
-        cc = f"{cc_val:02d}"
+    Le compteur est indexé sur le préfixe (et non sur la date complète) :
+    1925-12-09 et 2025-12-09 partagent le préfixe 251209 et donc la même série.
+    """
+    prefixe = models.CharField(max_length=6, unique=True)
+    dernier_ordre = models.PositiveIntegerField(default=0)
 
-        # Final : AAMMJJOOOCC
-        return f"{date_part}{ooo}{cc}"
+    class Meta:
+        verbose_name = "Compteur de numéros nationaux"
+        verbose_name_plural = "Compteurs de numéros nationaux"
+
+    def __str__(self):
+        return f"{self.prefixe} : {self.dernier_ordre}"
+
+    @classmethod
+    def allouer(cls, prefixe, nombre=1):
+        """
+        Réserve `nombre` ordres consécutifs pour le préfixe et retourne le premier.
+
+        En cas de dépassement de ORDRE_MAX, rien n'est consommé et
+        NumeroNationalEpuise est levée.
+        """
+        with transaction.atomic():
+            dernier = _incrementer_compteur(
+                cls,
+                {"prefixe": prefixe},
+                "dernier_ordre",
+                nombre,
+                amorce=lambda: cls._dernier_ordre_existant(prefixe),
+            )
+            if dernier > ORDRE_MAX:
+                raise NumeroNationalEpuise(prefixe)
+
+        return dernier - nombre + 1
+
+    @staticmethod
+    def _dernier_ordre_existant(prefixe):
+        """
+        Amorçage d'un nouveau compteur à partir des numéros déjà présents
+        (données antérieures au compteur). Requête par intervalle sur l'index unique.
+        """
+        dernier = Personne.objects.filter(
+            numero_national__range=bornes_prefixe(prefixe)
+        ).aggregate(m=Max("numero_national"))["m"]
+        return int(dernier[6:9]) if dernier else 0
 
 
 class ActeNaissance(models.Model):
@@ -100,6 +226,18 @@ class ActeNaissance(models.Model):
     date_etablissement = models.DateField(auto_now_add=True)
     lieu_etablissement = models.CharField(max_length=150, default="Commune de Démonstration")
     officier = models.CharField(max_length=150, default="Officier de l'état civil (démo)")
+    date_modification = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Sélection des lots d'impression (voir personnes.impression) et liste de l'admin
+            # filtrée par type, triée par date d'établissement puis id (fin implicite de l'index)
+            models.Index(fields=["type_acte", "date_etablissement"], name="acte_type_etablissement_idx"),
+            # Tri et date_hierarchy de l'admin
+            models.Index(fields=["date_etablissement"], name="acte_etablissement_idx"),
+            # Export incrémental : personnes dont seul l'acte a changé (voir personnes.export.filtrer)
+            models.Index(fields=["date_modification"], name="acte_modification_idx"),
+        ]
 
     def __str__(self):
         return f"Acte {self.numero_acte} – {self.personne.nom} {self.personne.postnom} {self.personne.prenom}"
@@ -108,20 +246,73 @@ class ActeNaissance(models.Model):
         # Générer le numéro d'acte si absent
         if not self.numero_acte:
             self.numero_acte = self.generer_numero_acte()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def generer_numero_acte(self):
         """
         Numéro d'acte du type : AN-2025-00001
-        (AN = acte de naissance, année, compteur annuel)
+        (AN = acte de naissance, année, compteur annuel tenu par CompteurActe)
         """
         annee = timezone.now().year
-        count_year = ActeNaissance.objects.filter(date_etablissement__year=annee).count() + 1
-        return f"AN-{annee}-{count_year:05d}"
+        return formater_numero_acte(annee, CompteurActe.allouer(annee))
+
+    @classmethod
+    def reserver_numeros_acte(cls, nombre, annee=None):
+        """
+        Réserve un bloc de `nombre` numéros d'acte consécutifs (opérations par lot).
+        """
+        annee = annee or timezone.now().year
+        premier = CompteurActe.allouer(annee, nombre)
+        return [formater_numero_acte(annee, n) for n in range(premier, premier + nombre)]
+
+
+class CompteurActe(models.Model):
+    """
+    Dernier numéro d'acte attribué pour chaque année d'établissement.
+    """
+    annee = models.PositiveSmallIntegerField(unique=True)
+    dernier_numero = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur d'actes de naissance"
+        verbose_name_plural = "Compteurs d'actes de naissance"
+
+    def __str__(self):
+        return f"{self.annee} : {self.dernier_numero}"
+
+    @classmethod
+    def allouer(cls, annee, nombre=1):
+        """
+        Réserve `nombre` numéros consécutifs pour l'année et retourne le premier.
+        """
+        with transaction.atomic():
+            dernier = _incrementer_compteur(
+                cls,
+                {"annee": annee},
+                "dernier_numero",
+                nombre,
+                amorce=lambda: cls._dernier_numero_existant(annee),
+            )
+        return dernier - nombre + 1
+
+    @staticmethod
+    def _dernier_numero_existant(annee):
+        """
+        Amorçage à partir des actes déjà numérotés pour cette année : maximum du suffixe
+        numérique (en texte, AN-2025-99999 serait classé après AN-2025-100000).
+        """
+        bas, haut = bornes_annee_acte(annee)
+        dernier = ActeNaissance.objects.filter(
+            numero_acte__gte=bas, numero_acte__lt=haut
+        ).aggregate(m=Max(Cast(Substr("numero_acte", len(bas) + 1), models.IntegerField())))["m"]
+        return dernier or 0
 
 
 class JournalAudit(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Valeur par défaut plutôt que auto_now_add : les entrées écrites en différé
+    # (tampon d'audit) gardent l'heure de l'action et non celle de l'écriture.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
     action = models.CharField(max_length=50)
     personne = models.ForeignKey('Personne', null=True, blank=True, on_delete=models.SET_NULL)
@@ -132,6 +323,14 @@ class JournalAudit(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Tri par défaut de l'admin, filtre par date et seuil d'archivage
+            models.Index(fields=["-created_at"], name="audit_created_idx"),
+            # Filtre "action" de l'admin, trié par date
+            models.Index(fields=["action", "-created_at"], name="audit_action_created_idx"),
+            # Historique d'un utilisateur (recherche user__username)
+            models.Index(fields=["user", "-created_at"], name="audit_user_created_idx"),
+        ]
         verbose_name = "Journal d'Audit"
         verbose_name_plural = "Journaux d'Audit"
 
@@ -140,3 +339,172 @@ class JournalAudit(models.Model):
         personne_info = self.personne.id if self.personne else "N/A"
         acte_info = self.acte.id if self.acte else "N/A"
         return f"[{self.created_at.strftime('%Y-%m-%d %H:%M')}] {user_info} - {self.action} (Personne: {personne_info}, Acte: {acte_info})"
+
+
+class StatistiquesRegistre(models.Model):
+    """
+    Totaux du registre, tenus à jour dans la transaction de chaque écriture
+    (voir personnes.statistiques). Une seule ligne, pk = 1.
+    """
+    total_citoyens = models.BigIntegerField(default=0)
+    total_naissances = models.BigIntegerField(default=0)
+    total_adultes = models.BigIntegerField(default=0)
+    total_actes = models.BigIntegerField(default=0)
+    actes_normaux = models.BigIntegerField(default=0)
+    actes_tardifs = models.BigIntegerField(default=0)
+    date_mise_a_jour = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Statistiques du registre"
+        verbose_name_plural = "Statistiques du registre"
+
+    def __str__(self):
+        return f"Statistiques au {self.date_mise_a_jour:%Y-%m-%d %H:%M}"
+
+
+class AgregatNaissances(models.Model):
+    """
+    Agrégats démographiques par jour de naissance et dimensions, tenus à jour dans la
+    transaction de chaque écriture (voir personnes.analytique). type_acte et
+    lieu_etablissement sont vides pour les personnes sans acte de naissance.
+    """
+    jour = models.DateField()
+    sexe = models.CharField(max_length=1)
+    type_enregistrement = models.CharField(max_length=10)
+    type_acte = models.CharField(max_length=10, blank=True)
+    lieu_etablissement = models.CharField(max_length=150, blank=True)
+
+    naissances = models.BigIntegerField(default=0)
+    actes = models.BigIntegerField(default=0)
+    # Délai entre la naissance et l'établissement de l'acte : somme et répartition par tranche
+    somme_delais_jours = models.BigIntegerField(default=0)
+    delai_moins_30j = models.BigIntegerField(default=0)
+    delai_moins_1an = models.BigIntegerField(default=0)
+    delai_moins_5ans = models.BigIntegerField(default=0)
+    delai_5ans_et_plus = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Agrégat de naissances"
+        verbose_name_plural = "Agrégats de naissances"
+        constraints = [
+            # Clé de l'agrégat ; son index sert aussi les lectures par période (jour en tête)
+            models.UniqueConstraint(
+                fields=["jour", "sexe", "type_enregistrement", "type_acte", "lieu_etablissement"],
+                name="agregat_naissances_cle",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.jour} {self.sexe} {self.type_enregistrement} {self.type_acte or '-'} : {self.naissances}"
+
+
+class EnregistrementSynchronise(models.Model):
+    """
+    Fiche créée par la synchronisation d'un bureau hors ligne, sous l'identifiant local
+    attribué par le bureau (voir personnes.synchronisation) : un lot renvoyé après une
+    coupure retrouve ses fiches au lieu d'en créer de nouvelles.
+    """
+    bureau = models.CharField(max_length=50)
+    id_client = models.CharField(max_length=100)
+    lot = models.CharField(max_length=100, blank=True)
+    personne = models.ForeignKey(Personne, on_delete=models.CASCADE, related_name="synchronisations")
+    date_synchronisation = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Enregistrement synchronisé"
+        verbose_name_plural = "Enregistrements synchronisés"
+        constraints = [
+            models.UniqueConstraint(fields=["bureau", "id_client"], name="synchro_bureau_id_client"),
+        ]
+
+    def __str__(self):
+        return f"{self.bureau}/{self.id_client} -> {self.personne_id}"
+
+
+class Tache(models.Model):
+    """
+    Travail de fond (import, export, reconstruction, impression par lot) exécuté hors
+    requête par manage.py run_workers. File tenue en base, sans broker (voir personnes.taches).
+    """
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINEE', 'Terminée'),
+        ('ECHOUEE', 'Échouée'),
+    ]
+
+    commande = models.CharField(max_length=50)
+    arguments = models.JSONField(default=list, blank=True)
+    options = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='EN_ATTENTE')
+
+    tentatives = models.PositiveIntegerField(default=0)
+    tentatives_max = models.PositiveIntegerField(default=3)
+    # Pas avant cette date : création, ou nouvel essai différé après un échec
+    executer_apres = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+
+    progression_faits = models.BigIntegerField(null=True, blank=True)
+    progression_total = models.BigIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    journal = models.TextField(blank=True)
+    erreur = models.TextField(blank=True)
+
+    demandee_par = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    date_creation = models.DateTimeField(default=timezone.now)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    # Dernier signe de vie du worker (progression) : au-delà du délai d'abandon, la tâche est relancée
+    date_signe_vie = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tâche de fond"
+        verbose_name_plural = "Tâches de fond"
+        indexes = [
+            # Réclamation par les workers : prochaines tâches prêtes, et tâches en cours abandonnées
+            models.Index(fields=["statut", "executer_apres"], name="tache_file_idx"),
+        ]
+
+    def __str__(self):
+        return f"Tâche {self.pk} – {self.commande} ({self.statut})"
+
+    @property
+    def pourcentage(self):
+        if not self.progression_total or self.progression_faits is None:
+            return None
+        return min(100, round(100 * self.progression_faits / self.progression_total))
+
+
+class Changement(models.Model):
+    """
+    Entrée du flux de changements lu par les miroirs provinciaux (voir personnes.flux) :
+    une écriture ou une suppression de Personne / ActeNaissance. L'identifiant, croissant,
+    est la séquence du flux.
+    """
+    MODELE_CHOICES = [
+        ('PERSONNE', 'Personne'),
+        ('ACTE', 'Acte de naissance'),
+    ]
+    OPERATION_CHOICES = [
+        ('ECRITURE', 'Création ou modification'),
+        ('SUPPRESSION', 'Suppression'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    modele = models.CharField(max_length=10, choices=MODELE_CHOICES)
+    objet_id = models.BigIntegerField()
+    # Fiche concernée (l'acte lui-même pour ACTE) : retrouvée même après la suppression de l'acte
+    id_personne = models.BigIntegerField()
+    operation = models.CharField(max_length=12, choices=OPERATION_CHOICES)
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Changement du registre"
+        verbose_name_plural = "Changements du registre"
+        indexes = [
+            # Recul du flux : première séquence encore trop récente pour être servie
+            models.Index(fields=["date"], name="changement_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.pk} {self.operation} {self.modele} {self.objet_id}"
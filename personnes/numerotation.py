@@ -0,0 +1,121 @@
+"""
+Règles de formatage des numéros du registre.
+
+Numéro national : AAMMJJOOOCC
+- AAMMJJ = date de naissance
+- OOO = ordre d'enregistrement pour ce préfixe de date (001 à 999)
+- CC = clé de contrôle mod 97
+
+Numéro d'acte : AN-AAAA-NNNNN
+- AAAA = année d'établissement
+- NNNNN = compteur annuel, sur 5 chiffres au minimum (s'élargit au-delà de 99999)
+"""
+from datetime import date
+
+ORDRE_MAX = 999
+
+
+class NumeroNationalEpuise(Exception):
+    """
+    Levée quand les 999 ordres disponibles pour un préfixe de date sont déjà attribués.
+    """
+
+    def __init__(self, prefixe):
+        self.prefixe = prefixe
+        super().__init__(
+            f"Capacité épuisée : plus aucun numéro national disponible pour le préfixe {prefixe} "
+            f"(maximum {ORDRE_MAX} enregistrements par date de naissance)."
+        )
+
+
+def prefixe_date(date_naissance):
+    """
+    Partie AAMMJJ du numéro national (ex : 251209).
+    """
+    return f"{date_naissance.year % 100:02d}{date_naissance.month:02d}{date_naissance.day:02d}"
+
+
+def cle_controle(base):
+    """
+    Clé de contrôle CC (mod 97) d'une base de 9 chiffres.
+    """
+    cc_val = 97 - (int(base) % 97)
+    if cc_val == 97:
+        cc_val = 0
+    return f"{cc_val:02d}"
+
+
+def formater_numero_national(prefixe, ordre):
+    """
+    Assemble le numéro complet AAMMJJOOOCC à partir du préfixe et de l'ordre.
+    """
+    if not 1 <= ordre <= ORDRE_MAX:
+        raise NumeroNationalEpuise(prefixe)
+    base = f"{prefixe}{ordre:03d}"
+    return f"{base}{cle_controle(base)}"
+
+
+def bornes_prefixe(prefixe):
+    """
+    Bornes (incluses) des numéros nationaux d'un préfixe de date.
+    Permet un filtre par intervalle qui exploite l'index unique de numero_national.
+    """
+    return f"{prefixe}00000", f"{prefixe}99999"
+
+
+def formater_numero_acte(annee, numero):
+    """
+    Numéro d'acte du type AN-2025-00001.
+    Au-delà de 99999 le compteur s'élargit (AN-2025-100000) : 14 caractères,
+    toujours dans la longueur de numero_acte.
+    """
+    return f"AN-{annee}-{numero:05d}"
+
+
+def parser_numero_acte(numero_acte):
+    """
+    Retourne (annee, numero) pour un numéro AN-AAAA-NNNNN, ou None s'il est mal formé.
+    """
+    morceaux = numero_acte.split("-")
+    if len(morceaux) != 3 or morceaux[0] != "AN" or not (morceaux[1].isdigit() and morceaux[2].isdigit()):
+        return None
+    return int(morceaux[1]), int(morceaux[2])
+
+
+def bornes_annee_acte(annee):
+    """
+    Bornes des numéros d'acte d'une année (AN-2025- inclus, AN-2025. exclu).
+    """
+    return f"AN-{annee}-", f"AN-{annee}."
+
+
+def _date_plausible(prefixe):
+    """
+    AAMMJJ correspond-il à une date réelle au XXe ou au XXIe siècle ?
+    """
+    aa, mm, jj = int(prefixe[:2]), int(prefixe[2:4]), int(prefixe[4:6])
+    for siecle in (1900, 2000):
+        try:
+            date(siecle + aa, mm, jj)
+        except ValueError:
+            continue
+        return True
+    return False
+
+
+def nettoyer_numero_national(saisie):
+    """
+    Retire espaces et tiret de présentation (251209001-14 -> 25120900114).
+    """
+    return str(saisie).replace(" ", "").replace("-", "")
+
+
+def numero_national_valide(numero):
+    """
+    Contrôle hors base d'un numéro national : format, date AAMMJJ, ordre 001-999 et clé mod 97.
+    """
+    if len(numero) != 11 or not numero.isdigit():
+        return False
+    if not _date_plausible(numero[:6]) or not 1 <= int(numero[6:9]) <= ORDRE_MAX:
+        return False
+    return cle_controle(numero[:9]) == numero[9:]
@@ -0,0 +1,197 @@
+"""
+Pagination par curseur (keyset) pour les listes potentiellement très longues.
+
+Au lieu d'un OFFSET qui relit toutes les lignes précédentes, chaque page reprend
+strictement après la dernière ligne affichée : (a, b, c) > (x, y, z).
+Le coût d'une page reste constant quel que soit le nombre de résultats.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.db.models import F, Field, Func, Value
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+
+
+@dataclass
+class PageCurseur:
+    elements: list
+    curseur_suivant: str | None
+
+    @property
+    def a_suivante(self):
+        return self.curseur_suivant is not None
+
+
+def encoder_curseur(valeurs):
+    brut = json.dumps(valeurs, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip("=")
+
+
+def decoder_curseur(curseur, nb_champs):
+    """
+    Retourne la liste des valeurs du curseur, ou None s'il est absent ou invalide.
+    """
+    if not curseur:
+        return None
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4))
+        valeurs = json.loads(brut)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != nb_champs:
+        return None
+    return valeurs
+
+
+class _Ligne(Func):
+    """
+    Valeur de ligne SQL : (a, b, c).
+    """
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+def filtre_apres(champs, valeurs):
+    """
+    Comparaison (champs) > (valeurs) en valeurs de ligne SQL : avec un index sur les champs
+    dans cet ordre, la lecture commence au curseur au lieu de relire et d'écarter les lignes
+    précédentes (ce que fait la forme a > x OR (a = x AND b > y)... quand a se répète).
+    Seul l'ordre croissant est pris en charge.
+    """
+    return GreaterThan(_Ligne(*(F(champ) for champ in champs)), _Ligne(*(Value(valeur) for valeur in valeurs)))
+
+
+def _champs_tri(queryset):
+    champs = list(queryset.query.order_by)
+    if not champs or any(champ.startswith("-") for champ in champs):
+        raise ValueError("paginer_par_curseur exige un tri croissant explicite")
+    return champs
+
+
+def _apres_curseur(queryset, curseur):
+    champs = _champs_tri(queryset)
+    valeurs = decoder_curseur(curseur, len(champs))
+    if valeurs is not None:
+        queryset = queryset.filter(filtre_apres(champs, valeurs))
+    return queryset, champs
+
+
+def _page(elements, champs, taille):
+    curseur_suivant = None
+    if len(elements) > taille:
+        elements = elements[:taille]
+        curseur_suivant = encoder_curseur([getattr(elements[-1], champ) for champ in champs])
+    return PageCurseur(elements, curseur_suivant)
+
+
+def paginer_par_curseur(queryset, curseur=None, taille=50):
+    """
+    Retourne la page qui suit `curseur` dans l'ordre du queryset.
+    Le queryset doit être trié (order_by) sur des champs croissants qui finissent
+    par une clé unique, par exemple ("nom", "postnom", "prenom", "id").
+    """
+    queryset, champs = _apres_curseur(queryset, curseur)
+    return _page(list(queryset[:taille + 1]), champs, taille)
+
+
+async def apaginer_par_curseur(queryset, curseur=None, taille=50):
+    """
+    Version asynchrone de paginer_par_curseur (itération asynchrone de l'ORM).
+    """
+    queryset, champs = _apres_curseur(queryset, curseur)
+    return _page([element async for element in queryset[:taille + 1]], champs, taille)
+
+
+def _reprise_paliers(paliers, curseur):
+    """
+    [(indice, queryset, champs)] des paliers à lire : celui du curseur (repris après sa
+    dernière ligne) et les suivants. Curseur absent ou invalide : depuis le premier palier.
+    Un palier sans curseur commence à son départ ; avec un curseur, seul le curseur borne
+    la lecture (il est toujours au-delà du départ), pour que l'index la commence là.
+    """
+    champs = [_champs_tri(queryset) for queryset, _ in paliers]
+    depart, apres = 0, None
+    if curseur:
+        try:
+            brut = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+        except (binascii.Error, ValueError):
+            brut = None
+        if (
+            isinstance(brut, list) and brut and type(brut[0]) is int
+            and 0 <= brut[0] < len(paliers) and len(brut) == 1 + len(champs[brut[0]])
+        ):
+            depart, apres = brut[0], brut[1:]
+
+    reprise = []
+    for indice in range(depart, len(paliers)):
+        queryset, debut = paliers[indice]
+        if indice == depart and apres is not None:
+            queryset = queryset.filter(filtre_apres(champs[indice], apres))
+        elif debut:
+            queryset = queryset.filter(
+                GreaterThanOrEqual(
+                    _Ligne(*(F(champ) for champ in champs[indice][:len(debut)])),
+                    _Ligne(*(Value(valeur) for valeur in debut)),
+                )
+            )
+        reprise.append((indice, queryset, champs[indice]))
+    return reprise
+
+
+def _page_paliers(lus, taille):
+    """
+    lus : [(indice, champs, element)] dans l'ordre ; le curseur porte l'indice du palier.
+    """
+    curseur_suivant = None
+    if len(lus) > taille:
+        lus = lus[:taille]
+        indice, champs, dernier = lus[-1]
+        curseur_suivant = encoder_curseur([indice] + [getattr(dernier, champ) for champ in champs])
+    return PageCurseur([element for _, _, element in lus], curseur_suivant)
+
+
+def paginer_par_paliers(paliers, curseur=None, taille=50):
+    """
+    Pagination par curseur sur une suite de paliers affichés l'un après l'autre :
+    [(queryset, depart)], chaque queryset trié comme pour paginer_par_curseur et lu sur son
+    propre index ; `depart` (ou None) donne les valeurs de tête du tri où le palier commence
+    (borne basse incluse). Une page qui finit un palier se complète avec le suivant.
+    """
+    lus = []
+    for indice, queryset, champs in _reprise_paliers(paliers, curseur):
+        lus.extend((indice, champs, element) for element in queryset[:taille + 1 - len(lus)])
+        if len(lus) > taille:
+            break
+    return _page_paliers(lus, taille)
+
+
+async def apaginer_par_paliers(paliers, curseur=None, taille=50):
+    """
+    Version asynchrone de paginer_par_paliers.
+    """
+    lus = []
+    for indice, queryset, champs in _reprise_paliers(paliers, curseur):
+        lus.extend([(indice, champs, element) async for element in queryset[:taille + 1 - len(lus)]])
+        if len(lus) > taille:
+            break
+    return _page_paliers(lus, taille)
+
+
+def _requete_comptage(queryset, plafond):
+    return queryset.order_by().values("pk")[:plafond + 1]
+
+
+def compter_avec_plafond(queryset, plafond=1000):
+    """
+    Nombre de résultats, arrêté à `plafond` : retourne (nombre, plafond_atteint).
+    Le comptage s'arrête après plafond + 1 lignes au lieu de tout parcourir.
+    """
+    nombre = _requete_comptage(queryset, plafond).count()
+    return min(nombre, plafond), nombre > plafond
+
+
+async def acompter_avec_plafond(queryset, plafond=1000):
+    nombre = await _requete_comptage(queryset, plafond).acount()
+    return min(nombre, plafond), nombre > plafond
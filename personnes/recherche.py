@@ -0,0 +1,117 @@
+"""
+Recherche de citoyens par clés de noms normalisées.
+
+Les noms sont enregistrés une seconde fois sous forme normalisée (minuscules, sans accents)
+et phonétique. Les recherches se font par intervalle de préfixe sur ces colonnes indexées,
+jamais par icontains.
+"""
+import re
+import unicodedata
+
+from django.db.models import Q
+
+# Réécritures phonétiques appliquées dans l'ordre, sur un nom déjà normalisé et sans espaces.
+# Elles rapprochent les graphies courantes des noms congolais : Tshisekedi / Chisekedi,
+# Mbuyi / Mbouyi, Ngoy / Ngoie, Kalonji / Calondji, Mwamba / Mouamba...
+REGLES_PHONETIQUES = [
+    (re.compile(r"tsh|sch|sh|ch"), "s"),
+    (re.compile(r"dj"), "j"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"qu|q|c"), "k"),
+    (re.compile(r"ou|w"), "u"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"e$"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def normaliser(texte):
+    """
+    Forme de recherche d'un nom : minuscules, accents retirés, ponctuation réduite à un espace.
+    Ex : "  N'Gaïe-Mbuyi " -> "n gaie mbuyi"
+    """
+    texte = unicodedata.normalize("NFKD", texte or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).casefold()
+    return re.sub(r"[^a-z0-9]+", " ", texte).strip()
+
+
+def cle_phonetique(texte):
+    """
+    Clé phonétique approximative d'un nom (voir REGLES_PHONETIQUES).
+    """
+    cle = normaliser(texte).replace(" ", "")
+    for motif, remplacement in REGLES_PHONETIQUES:
+        cle = motif.sub(remplacement, cle)
+    return cle
+
+
+def filtre_prefixe(champ, prefixe):
+    """
+    Filtre "commence par" exprimé en intervalle [prefixe, successeur[ :
+    contrairement à LIKE 'x%', il exploite l'index B-tree de la colonne sur tous les moteurs.
+    """
+    return Q(**{f"{champ}__gte": prefixe, f"{champ}__lt": successeur(prefixe)})
+
+
+def successeur(prefixe):
+    """
+    Plus petite chaîne supérieure à toutes celles qui commencent par `prefixe`.
+    """
+    return prefixe[:-1] + chr(ord(prefixe[-1]) + 1)
+
+
+def _filtres_communs(qs, criteres):
+    numero = re.sub(r"\D", "", criteres.get("numero_national") or "")
+    if numero:
+        qs = qs.filter(filtre_prefixe("numero_national", numero))
+
+    for champ in ("postnom", "prenom"):
+        valeur = normaliser(criteres.get(champ))
+        if valeur:
+            qs = qs.filter(filtre_prefixe(f"{champ}_normalise", valeur))
+
+    if criteres.get("date_naissance"):
+        qs = qs.filter(date_naissance=criteres["date_naissance"])
+    return qs
+
+
+def paliers_recherche(criteres, queryset=None):
+    """
+    Résultats du formulaire de recherche en paliers de pertinence [(queryset, depart)],
+    chacun lu sur un index qui couvre son filtre et son ordre (voir paginer_par_paliers) :
+    - sans nom saisi : un palier trié par (nom, postnom, prenom, id) ;
+    - avec un nom, triés par (nom_normalise, nom, postnom, prenom, id) : les noms commençant
+      par la saisie — le nom identique, plus court, vient en premier —, puis les noms
+      phonétiquement proches, en deux paliers de part et d'autre de ces préfixes.
+    """
+    from .models import Personne
+
+    qs = _filtres_communs(Personne.objects.all() if queryset is None else queryset, criteres)
+    nom = normaliser(criteres.get("nom"))
+    if not nom:
+        return [(qs.order_by("nom", "postnom", "prenom", "id"), None)]
+
+    ordre = ("nom_normalise", "nom", "postnom", "prenom", "id")
+    phonetiques = qs.filter(nom_phonetique=cle_phonetique(nom)).order_by(*ordre)
+    # Bornes basses en départ de palier : remplacées par le curseur sur les pages suivantes
+    return [
+        (qs.filter(nom_normalise__lt=successeur(nom)).order_by(*ordre), [nom]),
+        (phonetiques.filter(nom_normalise__lt=nom), None),
+        (phonetiques, [successeur(nom)]),
+    ]
+
+
+def rechercher_personnes(criteres, queryset=None):
+    """
+    Tous les résultats du formulaire de recherche, sans tri (comptage) ; l'ordre d'affichage
+    est celui de paliers_recherche().
+    """
+    from .models import Personne
+
+    qs = _filtres_communs(Personne.objects.all() if queryset is None else queryset, criteres)
+    nom = normaliser(criteres.get("nom"))
+    if nom:
+        qs = qs.filter(filtre_prefixe("nom_normalise", nom) | Q(nom_phonetique=cle_phonetique(nom)))
+    return qs
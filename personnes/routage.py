@@ -0,0 +1,127 @@
+"""
+Routage lecture / écriture entre la base primaire et ses répliques.
+
+- Toutes les écritures vont sur la base primaire ("default").
+- Les lectures des modèles du registre partent sur une réplique uniquement dans les vues
+  marquées @lecture_seule (recherche, fiche, acte, statistiques, export).
+- Après une écriture sur le registre, la session lit sur la primaire pendant
+  REGISTRE_FENETRE_PRIMAIRE secondes : la page de confirmation et la fiche affichée
+  juste après un enregistrement ne dépendent pas du retard de réplication.
+
+Les répliques sont déclarées dans settings.REGISTRE_DB_REPLIQUES (alias de DATABASES).
+Sessions, comptes et journal d'audit restent toujours sur la primaire.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+CLE_SESSION = "_registre_primaire_jusqua"
+# Écritures qui n'imposent pas de relire sur la primaire (rien à afficher ensuite)
+MODELES_SANS_EPINGLAGE = {"journalaudit"}
+
+
+class EtatRoutage:
+    """
+    État de routage d'une requête (porté par une ContextVar, posé par RoutageMiddleware).
+    """
+
+    def __init__(self, primaire=False):
+        self.primaire = primaire
+        self.ecriture = False
+
+
+_etat = ContextVar("etat_routage", default=None)
+_lecture_seule = ContextVar("lecture_seule", default=False)
+
+
+def _du_registre(model):
+    return model._meta.app_label == "personnes"
+
+
+def alias_lecture():
+    """
+    Alias à utiliser pour une lecture du registre dans le contexte courant.
+    """
+    repliques = settings.REGISTRE_DB_REPLIQUES
+    etat = _etat.get()
+    if not repliques or (etat is not None and (etat.primaire or etat.ecriture)):
+        return "default"
+    return random.choice(repliques)
+
+
+class RoutageLectureEcriture:
+    """
+    Routeur de DATABASE_ROUTERS.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _du_registre(model) and _lecture_seule.get():
+            return alias_lecture()
+        return None
+
+    def db_for_write(self, model, **hints):
+        etat = _etat.get()
+        if etat is not None and _du_registre(model) and model._meta.model_name not in MODELES_SANS_EPINGLAGE:
+            etat.ecriture = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaire et répliques contiennent les mêmes données
+        bases = {"default", *settings.REGISTRE_DB_REPLIQUES}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+
+def lecture_seule(vue):
+    """
+    Décorateur de vue : les lectures du registre peuvent être servies par une réplique.
+    Les réponses en flux évaluent leurs requêtes après la vue : leur queryset doit être
+    lié explicitement avec .using(alias_lecture()).
+    Accepte les vues synchrones et asynchrones (la ContextVar suit les appels de
+    l'ORM asynchrone, exécutés via sync_to_async).
+    """
+    if iscoroutinefunction(vue):
+        @wraps(vue)
+        async def enveloppe_async(request, *args, **kwargs):
+            jeton = _lecture_seule.set(True)
+            try:
+                return await vue(request, *args, **kwargs)
+            finally:
+                _lecture_seule.reset(jeton)
+
+        return enveloppe_async
+
+    @wraps(vue)
+    def enveloppe(request, *args, **kwargs):
+        jeton = _lecture_seule.set(True)
+        try:
+            return vue(request, *args, **kwargs)
+        finally:
+            _lecture_seule.reset(jeton)
+
+    return enveloppe
+
+
+def debut_requete(primaire_jusqua):
+    """
+    Ouvre l'état de routage d'une requête ; `primaire_jusqua` est l'échéance lue en
+    session (CLE_SESSION) : la primaire est imposée si la session a écrit récemment.
+    """
+    return _etat.set(EtatRoutage(primaire=(primaire_jusqua or 0) > time.time()))
+
+
+def fin_requete(jeton):
+    """
+    Referme l'état de routage. Après une écriture, retourne la nouvelle échéance
+    d'épinglage à enregistrer en session sous CLE_SESSION ; sinon None.
+    """
+    etat = _etat.get()
+    _etat.reset(jeton)
+    if etat is not None and etat.ecriture:
+        return time.time() + settings.REGISTRE_FENETRE_PRIMAIRE
+    return None
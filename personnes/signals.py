@@ -0,0 +1,170 @@
+"""
+Récepteurs de signaux du registre : maintien des agrégats, flux de changements
+et invalidation des caches à chaque écriture.
+"""
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Personne, ActeNaissance
+from . import statistiques, analytique, cache_actes, consultation, flux, metriques
+
+
+CHAMPS_ACTE_AVANT = ("type_acte", "lieu_etablissement", "date_etablissement")
+
+
+def _valeurs_en_base(instance, champs):
+    """
+    Valeurs actuellement enregistrées (avant la modification en cours), ou None pour une création.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*champs).first()
+
+
+@receiver(pre_save, sender=Personne)
+def memoriser_personne_avant(sender, instance, raw=False, **kwargs):
+    # Une seule lecture : type (statistiques) et contribution aux agrégats avec l'acte éventuel
+    if not raw:
+        instance._valeurs_avant = _valeurs_en_base(instance, analytique.CHAMPS_SOURCE)
+
+
+@receiver(pre_save, sender=ActeNaissance)
+def memoriser_acte_avant(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._valeurs_avant = _valeurs_en_base(instance, CHAMPS_ACTE_AVANT)
+
+
+@receiver(post_save, sender=Personne)
+def statistiques_personne_enregistree(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        statistiques.ajuster(statistiques.deltas_personne(instance.type_enregistrement, 1))
+        return
+    valeurs_avant = getattr(instance, "_valeurs_avant", None)
+    avant = valeurs_avant and valeurs_avant["type_enregistrement"]
+    if avant and avant != instance.type_enregistrement:
+        statistiques.ajuster(statistiques.fusionner(
+            statistiques.deltas_personne(avant, -1),
+            statistiques.deltas_personne(instance.type_enregistrement, 1),
+        ))
+
+
+@receiver(post_save, sender=ActeNaissance)
+def statistiques_acte_enregistre(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        statistiques.ajuster(statistiques.deltas_acte(instance.type_acte, 1))
+        return
+    valeurs_avant = getattr(instance, "_valeurs_avant", None)
+    avant = valeurs_avant and valeurs_avant["type_acte"]
+    if avant and avant != instance.type_acte:
+        statistiques.ajuster(statistiques.fusionner(
+            statistiques.deltas_acte(avant, -1),
+            statistiques.deltas_acte(instance.type_acte, 1),
+        ))
+
+
+@receiver(post_delete, sender=Personne)
+def statistiques_personne_supprimee(sender, instance, **kwargs):
+    statistiques.ajuster(statistiques.deltas_personne(instance.type_enregistrement, -1))
+
+
+@receiver(post_delete, sender=ActeNaissance)
+def statistiques_acte_supprime(sender, instance, **kwargs):
+    statistiques.ajuster(statistiques.deltas_acte(instance.type_acte, -1))
+
+
+@receiver(post_save, sender=Personne)
+def analytique_personne_enregistree(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        analytique.ajuster(analytique.deltas(ajouts=[analytique.contribution_personne(instance)]))
+        return
+    avant = getattr(instance, "_valeurs_avant", None)
+    if avant is None:
+        return
+    # L'acte ne change pas : seules la date de naissance, le sexe et le type déplacent la fiche
+    valeurs = {
+        **avant,
+        "date_naissance": instance.date_naissance,
+        "sexe": instance.sexe,
+        "type_enregistrement": instance.type_enregistrement,
+    }
+    analytique.ajuster(analytique.deltas(
+        ajouts=[analytique.contribution_valeurs(valeurs)],
+        retraits=[analytique.contribution_valeurs(avant)],
+    ))
+
+
+@receiver(post_save, sender=ActeNaissance)
+def analytique_acte_enregistre(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    personne = instance.personne
+    if created:
+        # La fiche passe de « sans acte » à son acte
+        avant = analytique.contribution_personne(personne)
+    else:
+        valeurs_avant = getattr(instance, "_valeurs_avant", None)
+        if valeurs_avant is None:
+            return
+        avant = analytique.contribution(
+            personne.date_naissance, personne.sexe, personne.type_enregistrement,
+            *(valeurs_avant[champ] for champ in CHAMPS_ACTE_AVANT),
+        )
+    analytique.ajuster(analytique.deltas(
+        ajouts=[analytique.contribution_personne(personne, instance)],
+        retraits=[avant],
+    ))
+
+
+@receiver(post_delete, sender=Personne)
+def analytique_personne_supprimee(sender, instance, **kwargs):
+    # Son acte éventuel a déjà été supprimé (cascade) et retiré par analytique_acte_supprime
+    analytique.ajuster(analytique.deltas(retraits=[analytique.contribution_personne(instance)]))
+
+
+@receiver(post_delete, sender=ActeNaissance)
+def analytique_acte_supprime(sender, instance, **kwargs):
+    personne = instance.personne
+    analytique.ajuster(analytique.deltas(
+        ajouts=[analytique.contribution_personne(personne)],
+        retraits=[analytique.contribution_personne(personne, instance)],
+    ))
+
+
+@receiver(post_save, sender=Personne)
+@receiver(post_save, sender=ActeNaissance)
+def flux_ecriture(sender, instance, raw=False, **kwargs):
+    # Pas les écritures brutes : pages du flux appliquées par un miroir (personnes.flux.appliquer)
+    if not raw:
+        flux.noter([instance])
+
+
+@receiver(post_delete, sender=Personne)
+@receiver(post_delete, sender=ActeNaissance)
+def flux_suppression(sender, instance, **kwargs):
+    flux.noter([instance], "SUPPRESSION")
+
+
+@receiver(post_save, sender=Personne)
+@receiver(post_delete, sender=Personne)
+def invalider_caches_personne(sender, instance, **kwargs):
+    cache_actes.invalider(instance.pk)
+    consultation.invalider(instance.pk, instance.numero_national)
+
+
+@receiver(post_save, sender=ActeNaissance)
+@receiver(post_delete, sender=ActeNaissance)
+def invalider_caches_acte(sender, instance, **kwargs):
+    cache_actes.invalider(instance.personne_id)
+    consultation.invalider(instance.personne_id)
+
+
+@receiver(connection_created)
+def instrumenter_connexion(sender, connection, **kwargs):
+    metriques.installer_sur_connexion(connection)
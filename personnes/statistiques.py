@@ -0,0 +1,119 @@
+"""
+Agrégats du registre tenus à jour de façon incrémentale.
+
+Chaque création, modification ou suppression de Personne / ActeNaissance applique
+un delta à la ligne unique de StatistiquesRegistre, dans la même transaction
+(voir personnes.signals). La page de statistiques ne lit plus qu'une ligne ;
+`manage.py rebuild_stats` recalcule tout depuis les tables sources.
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Personne, ActeNaissance, StatistiquesRegistre
+
+PK_STATISTIQUES = 1
+
+CHAMPS_TOTAUX = (
+    "total_citoyens",
+    "total_naissances",
+    "total_adultes",
+    "total_actes",
+    "actes_normaux",
+    "actes_tardifs",
+)
+
+CHAMP_PAR_TYPE_ENREGISTREMENT = {
+    "NAISSANCE": "total_naissances",
+    "ADULTE": "total_adultes",
+}
+CHAMP_PAR_TYPE_ACTE = {
+    "NORMAL": "actes_normaux",
+    "TARDIF": "actes_tardifs",
+}
+
+
+def deltas_personne(type_enregistrement, nombre):
+    """
+    Deltas pour l'ajout (nombre > 0) ou le retrait (nombre < 0) de personnes d'un même type.
+    """
+    deltas = {"total_citoyens": nombre}
+    champ = CHAMP_PAR_TYPE_ENREGISTREMENT.get(type_enregistrement)
+    if champ:
+        deltas[champ] = nombre
+    return deltas
+
+
+def deltas_acte(type_acte, nombre):
+    deltas = {"total_actes": nombre}
+    champ = CHAMP_PAR_TYPE_ACTE.get(type_acte)
+    if champ:
+        deltas[champ] = nombre
+    return deltas
+
+
+def fusionner(*liste_deltas):
+    total = {}
+    for deltas in liste_deltas:
+        for champ, valeur in deltas.items():
+            total[champ] = total.get(champ, 0) + valeur
+    return total
+
+
+def ajuster(deltas):
+    """
+    Applique les deltas à la ligne d'agrégats (UPDATE atomique, transaction de l'appelant).
+    Si la ligne n'existe pas encore, elle est calculée depuis les tables, qui incluent
+    déjà l'écriture en cours : le delta n'est alors pas réappliqué.
+    """
+    maj = {champ: F(champ) + valeur for champ, valeur in deltas.items() if valeur}
+    if not maj:
+        return
+    if not StatistiquesRegistre.objects.filter(pk=PK_STATISTIQUES).update(date_mise_a_jour=timezone.now(), **maj):
+        recalculer()
+
+
+def calculer():
+    """
+    Totaux recalculés depuis les tables sources (deux requêtes agrégées).
+    """
+    totaux = Personne.objects.aggregate(
+        total_citoyens=Count("id"),
+        total_naissances=Count("id", filter=Q(type_enregistrement="NAISSANCE")),
+        total_adultes=Count("id", filter=Q(type_enregistrement="ADULTE")),
+    )
+    totaux.update(ActeNaissance.objects.aggregate(
+        total_actes=Count("id"),
+        actes_normaux=Count("id", filter=Q(type_acte="NORMAL")),
+        actes_tardifs=Count("id", filter=Q(type_acte="TARDIF")),
+    ))
+    return totaux
+
+
+def recalculer():
+    """
+    Reconstruit la ligne d'agrégats depuis zéro et la retourne.
+    """
+    with transaction.atomic():
+        stats, _ = StatistiquesRegistre.objects.update_or_create(
+            pk=PK_STATISTIQUES,
+            defaults={**calculer(), "date_mise_a_jour": timezone.now()},
+        )
+    return stats
+
+
+def lire():
+    """
+    Ligne d'agrégats courante (calculée au premier appel si elle n'existe pas).
+    """
+    stats = StatistiquesRegistre.objects.filter(pk=PK_STATISTIQUES).first()
+    return stats or recalculer()
+
+
+async def alire():
+    """
+    Version asynchrone de lire().
+    """
+    stats = await StatistiquesRegistre.objects.filter(pk=PK_STATISTIQUES).afirst()
+    return stats or await sync_to_async(recalculer)()
@@ -0,0 +1,194 @@
+"""
+Synchronisation des bureaux hors ligne.
+
+Un bureau rural enregistre naissances et adultes sans connexion, chacun sous un identifiant
+local (id_client), puis envoie tout en un seul appel à la reconnexion :
+
+    POST /api/synchronisation/
+    X-Registre-Bureau: bureau-kananga
+    X-Registre-Signature: <HMAC-SHA256 hexadécimal du corps avec la clé du bureau>
+
+    {"lot": "2026-10-18-01", "lieu_etablissement": "Kananga", "officier": "...",
+     "enregistrements": [{"id_client": "n-0001", "type": "NAISSANCE", "nom": "...", ...}, ...]}
+
+- chaque enregistrement est validé par PersonneForm ; une seule erreur et rien n'est écrit ;
+- le lot est enregistré dans une transaction par personnes.lots.enregistrer_lot : numéros
+  nationaux et numéros d'acte réservés par blocs, journal d'audit écrit en une fois par type ;
+- idempotent : un (bureau, id_client) déjà synchronisé renvoie sa fiche existante, un lot
+  renvoyé après une coupure ne crée aucun doublon ;
+- la réponse donne, dans l'ordre du lot, la correspondance id_client -> fiche du registre.
+"""
+import hashlib
+import hmac
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .forms import PersonneForm
+from .lots import LIEU_PAR_DEFAUT, OFFICIER_PAR_DEFAUT, enregistrer_lot
+from .models import EnregistrementSynchronise, Personne
+from .numerotation import NumeroNationalEpuise
+
+# Type d'enregistrement -> type d'acte établi avec la fiche (comme nouvelle_naissance / nouvel_adulte)
+TYPES = {"NAISSANCE": "NORMAL", "ADULTE": None}
+CHAMPS = PersonneForm.Meta.fields
+NATIONALITE_PAR_DEFAUT = Personne._meta.get_field("nationalite").default
+
+
+class ErreurSynchronisation(Exception):
+    """
+    Lot refusé : rien n'a été écrit. `erreurs` détaille les enregistrements invalides par id_client.
+    """
+
+    def __init__(self, message, statut=400, erreurs=None):
+        super().__init__(message)
+        self.message = message
+        self.statut = statut
+        self.erreurs = erreurs
+
+
+def signer(cle, corps):
+    return hmac.new(cle.encode(), corps, hashlib.sha256).hexdigest()
+
+
+def verifier_signature(bureau, signature, corps):
+    """
+    Vrai si `signature` est le HMAC du corps avec la clé du bureau (settings.REGISTRE_SYNC_CLES).
+    """
+    cle = settings.REGISTRE_SYNC_CLES.get(bureau)
+    if not cle or not signature:
+        return False
+    return hmac.compare_digest(signer(cle, corps), signature)
+
+
+def lire_lot(corps):
+    """
+    Lot décodé et contrôlé dans sa structure (pas encore dans ses données).
+    """
+    try:
+        lot = json.loads(corps)
+        enregistrements = lot["enregistrements"]
+        if not isinstance(enregistrements, list) or not all(isinstance(e, dict) for e in enregistrements):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        raise ErreurSynchronisation('Corps JSON attendu : {"lot": ..., "enregistrements": [{...}, ...]}')
+
+    maximum = settings.REGISTRE_SYNC_MAX
+    if len(enregistrements) > maximum:
+        raise ErreurSynchronisation(f"Au plus {maximum} enregistrements par lot.", 413)
+
+    ids = [str(enregistrement.get("id_client") or "").strip() for enregistrement in enregistrements]
+    if not all(ids):
+        raise ErreurSynchronisation("Chaque enregistrement doit porter un id_client.")
+    if len(set(ids)) != len(ids):
+        raise ErreurSynchronisation("id_client en double dans le lot.")
+    for id_client, enregistrement in zip(ids, enregistrements):
+        if enregistrement.get("type") not in TYPES:
+            raise ErreurSynchronisation(f"{id_client} : type {' ou '.join(TYPES)} attendu.")
+        enregistrement["id_client"] = id_client
+    return lot
+
+
+def _valider(enregistrement):
+    donnees = {champ: str(enregistrement.get(champ) or "").strip() for champ in CHAMPS}
+    if not donnees["nationalite"]:
+        donnees["nationalite"] = NATIONALITE_PAR_DEFAUT
+    return PersonneForm(data=donnees)
+
+
+def _correspondance(id_client, personne, acte, statut):
+    return {
+        "id_client": id_client,
+        "statut": statut,
+        "personne_id": personne.pk,
+        "numero_national": personne.numero_national,
+        "numero_acte": acte.numero_acte if acte else None,
+    }
+
+
+def synchroniser(bureau, lot, request=None):
+    """
+    Enregistre les fiches nouvelles du lot et retourne le bilan avec les correspondances.
+    Lève ErreurSynchronisation si le lot est refusé.
+    """
+    enregistrements = lot["enregistrements"]
+    deja = {
+        synchro.id_client: synchro.personne
+        for synchro in EnregistrementSynchronise.objects.filter(
+            bureau=bureau, id_client__in=[enregistrement["id_client"] for enregistrement in enregistrements]
+        ).select_related("personne__acte_naissance")
+    }
+
+    nouvelles = {type_enregistrement: [] for type_enregistrement in TYPES}
+    erreurs = {}
+    for enregistrement in enregistrements:
+        if enregistrement["id_client"] in deja:
+            continue
+        form = _valider(enregistrement)
+        if form.is_valid():
+            nouvelles[enregistrement["type"]].append((enregistrement["id_client"], form.save(commit=False)))
+        else:
+            erreurs[enregistrement["id_client"]] = form.errors.get_json_data()
+    if erreurs:
+        raise ErreurSynchronisation("Enregistrements invalides : aucun n'a été enregistré.", 422, erreurs)
+
+    creees = {}
+    details = f"Synchronisation du bureau {bureau}, lot {lot.get('lot') or '-'}"
+    try:
+        with transaction.atomic():
+            for type_enregistrement, lignes in nouvelles.items():
+                if not lignes:
+                    continue
+                personnes, actes = enregistrer_lot(
+                    [personne for _, personne in lignes],
+                    type_enregistrement,
+                    type_acte=TYPES[type_enregistrement],
+                    lieu_etablissement=lot.get("lieu_etablissement") or LIEU_PAR_DEFAUT,
+                    officier=lot.get("officier") or OFFICIER_PAR_DEFAUT,
+                    request=request,
+                    action_audit=f"SYNCHRO_{type_enregistrement}",
+                    details_audit=details,
+                )
+                actes = actes or [None] * len(personnes)
+                for (id_client, _), personne, acte in zip(lignes, personnes, actes):
+                    creees[id_client] = (personne, acte)
+
+            maintenant = timezone.now()
+            EnregistrementSynchronise.objects.bulk_create([
+                EnregistrementSynchronise(
+                    bureau=bureau,
+                    id_client=id_client,
+                    lot=str(lot.get("lot") or "")[:100],
+                    personne=personne,
+                    date_synchronisation=maintenant,
+                )
+                for id_client, (personne, _) in creees.items()
+            ])
+    except NumeroNationalEpuise as exc:
+        raise ErreurSynchronisation(str(exc), 422)
+    except IntegrityError:
+        # Le même lot vient d'être enregistré par une autre requête (nouvel essai du bureau) :
+        # violation de synchro_bureau_id_client. Toute autre violation est une erreur du serveur.
+        ids_nouveaux = [id_client for lignes in nouvelles.values() for id_client, _ in lignes]
+        if not EnregistrementSynchronise.objects.filter(bureau=bureau, id_client__in=ids_nouveaux).exists():
+            raise
+        raise ErreurSynchronisation("Lot déjà en cours de synchronisation : réessayer.", 409)
+
+    correspondances = []
+    for enregistrement in enregistrements:
+        id_client = enregistrement["id_client"]
+        if id_client in creees:
+            correspondances.append(_correspondance(id_client, *creees[id_client], "CREE"))
+        else:
+            personne = deja[id_client]
+            acte = getattr(personne, "acte_naissance", None)
+            correspondances.append(_correspondance(id_client, personne, acte, "DEJA_SYNCHRONISE"))
+    return {
+        "bureau": bureau,
+        "lot": lot.get("lot"),
+        "crees": len(creees),
+        "deja_synchronises": len(enregistrements) - len(creees),
+        "correspondances": correspondances,
+    }
@@ -0,0 +1,371 @@
+"""
+Tâches de fond du registre, tenues en base : aucun broker (Redis, RabbitMQ) n'est nécessaire.
+
+Les opérations lourdes (imports, exports, reconstruction des agrégats, impression par lot,
+vérification du registre) ne tiennent pas dans le délai d'une requête gunicorn. Une vue ou
+un script les planifie (planifier()) ; `manage.py run_workers` les exécute :
+
+- chaque worker est un processus qui réclame la prochaine tâche prête : sélection
+  select_for_update(skip_locked=True) sur PostgreSQL, puis UPDATE conditionnel sur le
+  statut (compare-and-swap) — un seul worker gagne, y compris sur SQLite qui n'a pas de
+  verrou de ligne ;
+- une tâche exécute une commande de gestion de COMMANDES (call_command) ; sa sortie est
+  lue au fil de l'eau : dernière ligne en message, « n/total » en progression, fin du
+  journal conservée ;
+- un échec est réessayé après un délai doublé à chaque tentative, jusqu'à tentatives_max ;
+  une erreur de paramètres (CommandError, option inconnue) n'est pas réessayée, ni une
+  commande non idempotente (NON_IDEMPOTENTES : un import rejoué dupliquerait des fiches) ;
+- un thread de signe de vie écrit date_signe_vie toutes les REGISTRE_TACHES_PERIODE_SIGNE_VIE
+  secondes, que la commande écrive ou non ; une tâche en cours sans signe de vie depuis
+  REGISTRE_TACHES_DELAI_ABANDON (worker tué) est remise en file, ou marquée échouée si ses
+  tentatives sont épuisées.
+
+La page /taches/ (lien depuis le tableau de bord) affiche l'état de la file.
+"""
+import logging
+import os
+import re
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from multiprocessing import Process
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import CommandError, call_command, get_commands, load_command_class
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tache
+
+logger = logging.getLogger(__name__)
+
+# Commandes exécutables en tâche de fond
+COMMANDES = {
+    "import_registre": "Import de recensement",
+    "export_registre": "Export du registre",
+    "imprimer_actes": "Impression d'actes par lot",
+    "rebuild_stats": "Reconstruction des statistiques",
+    "rebuild_analytique": "Reconstruction des agrégats démographiques",
+    "lier_filiations": "Liaison des filiations",
+    "detect_doublons": "Détection des doublons",
+    "verifier_registre": "Vérification d'intégrité",
+    "archive_audit": "Archivage du journal d'audit",
+}
+# Fichier produit par la commande : option et extension par défaut, placé dans REGISTRE_TACHES_DOSSIER
+FICHIERS = {
+    "export_registre": ("sortie", None),  # extension selon --format
+    "imprimer_actes": ("sortie", "html"),
+    "detect_doublons": ("sortie", "csv"),
+    "verifier_registre": ("rapport", "jsonl"),
+}
+# Commandes proposées sans paramètre sur la page des tâches (comptes staff)
+COMMANDES_DIRECTES = ("rebuild_stats", "rebuild_analytique", "lier_filiations")
+# Un essai interrompu a pu valider une partie de son travail : jamais rejouées automatiquement
+NON_IDEMPOTENTES = ("import_registre",)
+
+LIGNES_JOURNAL = 50
+INTERVALLE_SIGNE_VIE = 1.0  # secondes entre deux écritures de progression
+RECLAMATION_CANDIDATS = 5
+
+_PROGRESSION = re.compile(r"(\d+)\s*/\s*(\d+)")
+
+
+def planifier(commande, *arguments, user=None, tentatives_max=3, executer_apres=None, **options):
+    """
+    Met une commande en file et retourne la Tache. Les options sont celles de call_command
+    (noms Python : taille_lot=2000).
+    """
+    if commande not in COMMANDES:
+        raise ValueError(f"Commande non exécutable en tâche de fond : {commande}")
+    if commande in NON_IDEMPOTENTES:
+        tentatives_max = 1
+    return Tache.objects.create(
+        commande=commande,
+        arguments=[str(argument) for argument in arguments],
+        options=options,
+        tentatives_max=tentatives_max,
+        executer_apres=executer_apres or timezone.now(),
+        demandee_par=user,
+    )
+
+
+def _pretes():
+    return Tache.objects.filter(statut="EN_ATTENTE", executer_apres__lte=timezone.now())
+
+
+def reclamer(worker):
+    """
+    Réclame la prochaine tâche prête pour `worker` et la retourne, ou None.
+    """
+    if not _pretes().exists():  # lecture seule tant que la file est vide
+        return None
+    with transaction.atomic():
+        candidats = list(
+            _pretes().select_for_update(skip_locked=True)
+            .order_by("executer_apres", "id")
+            .values_list("pk", flat=True)[:RECLAMATION_CANDIDATS]
+        )
+        maintenant = timezone.now()
+        for pk in candidats:
+            # Compare-and-swap : seul le worker qui voit encore EN_ATTENTE emporte la tâche
+            if Tache.objects.filter(pk=pk, statut="EN_ATTENTE").update(
+                statut="EN_COURS",
+                worker=worker,
+                tentatives=F("tentatives") + 1,
+                date_debut=maintenant,
+                date_signe_vie=maintenant,
+                progression_faits=None,
+                progression_total=None,
+                message="",
+            ):
+                return Tache.objects.get(pk=pk)
+    return None
+
+
+def relancer_abandonnees():
+    """
+    Remet en file les tâches en cours dont le worker ne donne plus signe de vie.
+    Retourne le nombre de tâches traitées.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.REGISTRE_TACHES_DELAI_ABANDON)
+    abandonnees = Tache.objects.filter(statut="EN_COURS", date_signe_vie__lt=limite)
+    if not abandonnees.exists():
+        return 0
+    message = f"Worker sans signe de vie depuis plus de {settings.REGISTRE_TACHES_DELAI_ABANDON} s."
+    epuisees = abandonnees.filter(tentatives__gte=F("tentatives_max")).update(
+        statut="ECHOUEE", erreur=message, date_fin=timezone.now()
+    )
+    return epuisees + abandonnees.update(statut="EN_ATTENTE", erreur=message, executer_apres=timezone.now())
+
+
+class SortieTache:
+    """
+    Flux stdout/stderr d'une commande exécutée en tâche : garde la fin du journal et
+    écrit message, progression et signe de vie au plus une fois par INTERVALLE_SIGNE_VIE.
+    """
+
+    def __init__(self, tache):
+        self.tache = tache
+        self.lignes = []
+        self.en_cours = ""
+        self.derniere_ecriture = 0.0
+
+    def write(self, texte):
+        morceaux = re.split(r"[\r\n]", self.en_cours + texte)
+        self.en_cours = morceaux.pop()
+        for morceau in morceaux:
+            ligne = morceau.strip()
+            if ligne:
+                self._ligne(ligne)
+        if self.en_cours.strip():
+            self._ligne(self.en_cours.strip(), journal=False)
+        self.enregistrer()
+
+    def flush(self):
+        pass
+
+    def _ligne(self, ligne, journal=True):
+        if journal:
+            self.lignes = (self.lignes + [ligne])[-LIGNES_JOURNAL:]
+        self.tache.message = ligne[:255]
+        progression = _PROGRESSION.search(ligne)
+        if progression:
+            self.tache.progression_faits, self.tache.progression_total = map(int, progression.groups())
+
+    def enregistrer(self, forcer=False):
+        if not forcer and time.monotonic() - self.derniere_ecriture < INTERVALLE_SIGNE_VIE:
+            return
+        self.derniere_ecriture = time.monotonic()
+        self.tache.journal = "\n".join(self.lignes)
+        self.tache.date_signe_vie = timezone.now()
+        Tache.objects.filter(pk=self.tache.pk, statut="EN_COURS", worker=self.tache.worker).update(
+            message=self.tache.message,
+            progression_faits=self.tache.progression_faits,
+            progression_total=self.tache.progression_total,
+            journal=self.tache.journal,
+            date_signe_vie=self.tache.date_signe_vie,
+        )
+
+
+class SigneDeVie(threading.Thread):
+    """
+    Signe de vie d'une tâche en cours, indépendant de sa sortie : une commande silencieuse
+    (reconstruction, vérification) n'est pas prise pour abandonnée par un autre worker.
+    """
+
+    def __init__(self, tache, periode):
+        super().__init__(name=f"signe-vie-{tache.pk}", daemon=True)
+        self.tache = tache
+        self.periode = periode
+        self.arret = threading.Event()
+
+    def run(self):
+        try:
+            while not self.arret.wait(self.periode):
+                try:
+                    Tache.objects.filter(pk=self.tache.pk, statut="EN_COURS", worker=self.tache.worker).update(
+                        date_signe_vie=timezone.now()
+                    )
+                except DatabaseError:
+                    # Base occupée (verrou d'écriture SQLite tenu par la commande) : prochain essai
+                    logger.warning("Signe de vie de la tâche %s non écrit", self.tache.pk, exc_info=True)
+        finally:
+            connections.close_all()
+
+    def arreter(self):
+        self.arret.set()
+        self.join()
+
+
+def options_inconnues(commande, options):
+    """
+    Options refusées par la commande (call_command lèverait TypeError) : vérifiées avant
+    l'exécution, pour ne pas confondre une erreur de paramètres avec un TypeError du code.
+    """
+    instance = load_command_class(get_commands()[commande], commande)
+    parser = instance.create_parser("", commande)
+    valides = set(instance.stealth_options)
+    for action in parser._actions:
+        valides.add(action.dest)
+        if action.option_strings:
+            valides.add(min(action.option_strings).lstrip("-").replace("-", "_"))
+    return sorted(set(options) - valides)
+
+
+def fichier_par_defaut(tache):
+    """
+    (option, chemin) du fichier produit quand la tâche ne le précise pas, ou None.
+    """
+    if tache.commande not in FICHIERS:
+        return None
+    option, extension = FICHIERS[tache.commande]
+    if tache.options.get(option):
+        return None
+    if extension is None:
+        extension = tache.options.get("format", "csv") + (".gz" if tache.options.get("gzip") else "")
+    dossier = Path(settings.REGISTRE_TACHES_DOSSIER)
+    dossier.mkdir(parents=True, exist_ok=True)
+    return option, str(dossier / f"tache-{tache.pk}-{tache.commande}.{extension}")
+
+
+def executer(tache):
+    """
+    Exécute une tâche réclamée et enregistre son issue : terminée, remise en file
+    (nouvel essai différé) ou échouée.
+    """
+    sortie = SortieTache(tache)
+    options = dict(tache.options)
+    fichier = fichier_par_defaut(tache)
+    if fichier:
+        options[fichier[0]] = fichier[1]
+        sortie.write(f"Fichier produit : {fichier[1]}\n")
+
+    signe_de_vie = SigneDeVie(tache, settings.REGISTRE_TACHES_PERIODE_SIGNE_VIE)
+    signe_de_vie.start()
+    try:
+        inconnues = options_inconnues(tache.commande, options)
+        if inconnues:
+            raise CommandError(f"Options inconnues pour {tache.commande} : {', '.join(inconnues)}")
+        call_command(tache.commande, *tache.arguments, stdout=sortie, stderr=sortie, **options)
+    except Exception as exc:
+        definitive = isinstance(exc, CommandError) or tache.tentatives >= tache.tentatives_max
+        if definitive:
+            maj = {"statut": "ECHOUEE", "date_fin": timezone.now()}
+        else:
+            delai = settings.REGISTRE_TACHES_DELAI_NOUVEL_ESSAI * 2 ** (tache.tentatives - 1)
+            maj = {"statut": "EN_ATTENTE", "executer_apres": timezone.now() + timedelta(seconds=delai)}
+        logger.warning("Tâche %s (%s) en échec, tentative %s/%s", tache.pk, tache.commande,
+                       tache.tentatives, tache.tentatives_max, exc_info=True)
+        maj["erreur"] = traceback.format_exc()
+    else:
+        maj = {"statut": "TERMINEE", "date_fin": timezone.now(), "erreur": ""}
+        if sortie.tache.progression_total:
+            sortie.tache.progression_faits = sortie.tache.progression_total
+    finally:
+        signe_de_vie.arreter()
+
+    sortie.enregistrer(forcer=True)
+    Tache.objects.filter(pk=tache.pk, worker=tache.worker).update(**maj)
+    tache.refresh_from_db()
+    return tache
+
+
+def _recycler_connexions():
+    # Comme entre deux requêtes : connexions périmées ou en erreur refermées,
+    # jamais au milieu d'une transaction de l'appelant
+    for connexion in connections.all(initialized_only=True):
+        if not connexion.in_atomic_block:
+            connexion.close_if_unusable_or_obsolete()
+
+
+def nom_worker(indice=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{indice}"
+
+
+def travailler(worker, intervalle=2.0, une_fois=False, arret=None):
+    """
+    Boucle d'un worker : réclame et exécute les tâches prêtes jusqu'à `arret()` ;
+    avec `une_fois`, s'arrête dès que la file est vide. Retourne le nombre de tâches exécutées.
+    """
+    executees = 0
+    while not (arret and arret()):
+        _recycler_connexions()
+        relancer_abandonnees()
+        tache = reclamer(worker)
+        if tache is None:
+            if une_fois:
+                break
+            time.sleep(intervalle)
+            continue
+        logger.info("Tâche %s (%s) réclamée par %s", tache.pk, tache.commande, worker)
+        tache = executer(tache)
+        logger.info("Tâche %s (%s) : %s", tache.pk, tache.commande, tache.statut)
+        executees += 1
+    return executees
+
+
+def processus_worker(indice, intervalle, une_fois):
+    """
+    Point d'entrée d'un processus worker. SIGTERM : la tâche en cours se termine, puis
+    le processus s'arrête ; SIGINT est laissé au processus parent (run_workers).
+    """
+    django.setup()
+    arret = []
+    signal.signal(signal.SIGTERM, lambda *_: arret.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    travailler(nom_worker(indice), intervalle=intervalle, une_fois=une_fois, arret=lambda: bool(arret))
+
+
+def lancer_workers(processus, intervalle=2.0, une_fois=False):
+    """
+    Démarre `processus` workers et attend leur fin. SIGTERM ou Ctrl-C : arrêt propre
+    (chaque worker termine sa tâche en cours). Avec processus=1, la boucle tourne ici.
+    """
+    arret = []
+
+    def arreter(*_):
+        arret.append(True)
+        for enfant in enfants:
+            if enfant.is_alive():
+                os.kill(enfant.pid, signal.SIGTERM)
+
+    enfants = []
+    signal.signal(signal.SIGTERM, arreter)
+    signal.signal(signal.SIGINT, arreter)
+    if processus == 1:
+        return travailler(nom_worker(), intervalle=intervalle, une_fois=une_fois, arret=lambda: bool(arret))
+
+    connections.close_all()  # pas de connexion SQLite partagée avec les processus enfants
+    for indice in range(processus):
+        enfant = Process(target=processus_worker, args=(indice, intervalle, une_fois), name=f"worker-{indice}")
+        enfant.start()
+        enfants.append(enfant)
+    for enfant in enfants:
+        enfant.join()
+    return None
@@ -1,3 +1,1529 @@
-from django.test import TestCase
+import base64
+import hashlib
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.test import Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Personne, ActeNaissance, AgregatNaissances, Changement, EnregistrementSynchronise, Tache, CompteurNumeroNational, CompteurActe, JournalAudit
+from .numerotation import NumeroNationalEpuise, cle_controle, formater_numero_acte, numero_national_valide
+from .recherche import cle_phonetique, normaliser, paliers_recherche, rechercher_personnes
+from .pagination import paginer_par_curseur, paginer_par_paliers, compter_avec_plafond
+from . import statistiques, cache_actes, consultation, export, doublons, integrite, banc_essai, metriques, routage
+from . import analytique, filiations, flux, synchronisation, taches
+from .admin import AdminGrandeEchelle
+from .lots import enregistrer_lot
+from .audit import log_audit, vider_tampon_audit
+from . import archives_audit, audit
+from .archives_audit import archiver
+
+
+def creer_personne(**kwargs):
+    valeurs = {
+        "nom": "Kabongo",
+        "prenom": "Jean",
+        "sexe": "M",
+        "date_naissance": date(2025, 12, 9),
+        "nom_pere": "Kabongo",
+        "nom_mere": "Mbuyi",
+    }
+    valeurs.update(kwargs)
+    return Personne.objects.create(**valeurs)
+
+
+class NumeroNationalTests(TestCase):
+    def test_ordres_successifs_pour_une_meme_date(self):
+        p1 = creer_personne()
+        p2 = creer_personne(prenom="Marie", sexe="F")
+
+        self.assertEqual(p1.numero_national, "251209001" + cle_controle("251209001"))
+        self.assertEqual(p2.numero_national, "251209002" + cle_controle("251209002"))
+        self.assertEqual(CompteurNumeroNational.objects.get(prefixe="251209").dernier_ordre, 2)
+
+    def test_meme_prefixe_sur_deux_siecles(self):
+        # 1925-12-09 et 2025-12-09 partagent le préfixe 251209
+        p1 = creer_personne(date_naissance=date(1925, 12, 9))
+        p2 = creer_personne(date_naissance=date(2025, 12, 9))
+        self.assertNotEqual(p1.numero_national, p2.numero_national)
+
+    def test_amorcage_depuis_numeros_existants(self):
+        Personne.objects.create(
+            numero_national="251209041" + cle_controle("251209041"),
+            nom="Ilunga", prenom="Paul", sexe="M", date_naissance=date(2025, 12, 9),
+            nom_pere="Ilunga", nom_mere="Kapinga",
+        )
+        p = creer_personne()
+        self.assertEqual(p.numero_national[6:9], "042")
+
+    def test_depassement_de_capacite(self):
+        CompteurNumeroNational.objects.create(prefixe="251209", dernier_ordre=999)
+        with self.assertRaises(NumeroNationalEpuise):
+            creer_personne()
+        self.assertEqual(CompteurNumeroNational.objects.get(prefixe="251209").dernier_ordre, 999)
+        self.assertFalse(Personne.objects.exists())
+
+
+def executer_en_parallele(cible, nb_threads):
+    """
+    Lance `cible(indice)` dans `nb_threads` threads et remonte la première exception.
+    """
+    erreurs = []
+
+    def executer(indice):
+        try:
+            cible(indice)
+        except Exception as exc:  # remonté au thread principal
+            erreurs.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=executer, args=(i,)) for i in range(nb_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if erreurs:
+        raise erreurs[0]
+
+
+class NumeroActeTests(TestCase):
+    def test_numeros_successifs(self):
+        annee = timezone.now().year
+        a1 = ActeNaissance.objects.create(personne=creer_personne())
+        a2 = ActeNaissance.objects.create(personne=creer_personne(prenom="Marie", sexe="F"))
+        self.assertEqual(a1.numero_acte, f"AN-{annee}-00001")
+        self.assertEqual(a2.numero_acte, f"AN-{annee}-00002")
+
+    def test_reservation_d_un_bloc(self):
+        ActeNaissance.objects.create(personne=creer_personne())
+        numeros = ActeNaissance.reserver_numeros_acte(3, annee=2030)
+        self.assertEqual(numeros, ["AN-2030-00001", "AN-2030-00002", "AN-2030-00003"])
+        self.assertEqual(ActeNaissance.reserver_numeros_acte(1, annee=2030), ["AN-2030-00004"])
+
+    def test_elargissement_au_dela_de_99999(self):
+        CompteurActe.objects.create(annee=2030, dernier_numero=99999)
+        self.assertEqual(ActeNaissance.reserver_numeros_acte(1, annee=2030), ["AN-2030-100000"])
+        self.assertEqual(formater_numero_acte(2030, 7), "AN-2030-00007")
+
+    def test_amorcage_sur_le_suffixe_numerique(self):
+        # Compteur absent (base antérieure aux compteurs) : amorcé depuis les actes existants
+        for numero in ("AN-2030-99999", "AN-2030-100000"):
+            ActeNaissance.objects.create(personne=creer_personne(), numero_acte=numero)
+        CompteurActe.objects.all().delete()
+        self.assertEqual(ActeNaissance.reserver_numeros_acte(1, annee=2030), ["AN-2030-100001"])
+
+
+class CompteursConcurrentsTests(TransactionTestCase):
+    NB_THREADS = 8
+    PAR_THREAD = 15
+
+    def test_actes_crees_en_parallele_sans_doublon(self):
+        personnes = [creer_personne(prenom=f"P{i}") for i in range(self.NB_THREADS * self.PAR_THREAD)]
+
+        def creer_actes(indice):
+            debut = indice * self.PAR_THREAD
+            for personne in personnes[debut:debut + self.PAR_THREAD]:
+                ActeNaissance.objects.create(personne=personne)
+
+        executer_en_parallele(creer_actes, self.NB_THREADS)
+
+        numeros = list(ActeNaissance.objects.values_list("numero_acte", flat=True))
+        self.assertEqual(len(numeros), len(personnes))
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+    def test_blocs_reserves_en_parallele_disjoints(self):
+        blocs = []
+
+        def reserver(indice):
+            blocs.append(ActeNaissance.reserver_numeros_acte(10, annee=2031))
+
+        executer_en_parallele(reserver, self.NB_THREADS)
+
+        numeros = [n for bloc in blocs for n in bloc]
+        self.assertEqual(len(set(numeros)), self.NB_THREADS * 10)
+        self.assertEqual(CompteurActe.objects.get(annee=2031).dernier_numero, self.NB_THREADS * 10)
+
+    def test_numeros_nationaux_en_parallele_sans_doublon(self):
+        def enregistrer(indice):
+            for j in range(self.PAR_THREAD):
+                creer_personne(prenom=f"T{indice}-{j}")
+
+        executer_en_parallele(enregistrer, self.NB_THREADS)
+
+        numeros = list(Personne.objects.values_list("numero_national", flat=True))
+        self.assertEqual(len(set(numeros)), self.NB_THREADS * self.PAR_THREAD)
+
+
+class ImportRegistreTests(TestCase):
+    ENTETE = "nom,postnom,prenom,sexe,date_naissance,nom_pere,prenom_pere,nom_mere,prenom_mere,nationalite,adresse_actuelle\n"
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.dossier = Path(dossier.name)
+
+    def ecrire_source(self, lignes):
+        source = self.dossier / "recensement.csv"
+        source.write_text(self.ENTETE + "".join(lignes), encoding="utf-8")
+        return source
+
+    def test_import_par_lots_avec_rejets(self):
+        source = self.ecrire_source([
+            "Tshisekedi,Tshilombo,Felix,M,1963-06-13,Tshisekedi,Etienne,Mulumba,Marthe,,Kinshasa\n",
+            "Mukwege,,Denis,M,1955-03-01,Mukwege,,Kabambi,,,Bukavu\n",
+            "SansDate,,Alice,F,pas-une-date,Pere,,Mere,,,\n",
+            "Lumumba,,Patrice,M,1925-07-02,Lumumba,,Onema,,,\n",
+        ])
+
+        call_command("import_registre", str(source), "--taille-lot", "2", "--acte-tardif", stdout=io.StringIO())
+
+        self.assertEqual(Personne.objects.filter(type_enregistrement="ADULTE").count(), 3)
+        self.assertEqual(ActeNaissance.objects.filter(type_acte="TARDIF").count(), 3)
+        self.assertEqual(JournalAudit.objects.filter(action="IMPORT_ADULTE").count(), 3)
+        self.assertEqual(Personne.objects.get(prenom="Felix").nationalite, "Congolaise")
+        rapport = (self.dossier / "recensement.csv.erreurs.csv").read_text(encoding="utf-8")
+        self.assertIn("date_naissance", rapport)
+
+    def test_reprise_apres_checkpoint(self):
+        source = self.ecrire_source([
+            "Kabila,,Laurent,M,1939-11-27,Kabila,,Mujinga,,,\n",
+            "Kasavubu,,Joseph,M,1915-01-01,Kasavubu,,Kiala,,,\n",
+        ])
+        checkpoint = Path(f"{source}.checkpoint.json")
+        checkpoint.write_text(json.dumps({
+            "source": str(source.resolve()), "lignes_traitees": 1, "inserees": 1, "rejetees": 0,
+        }))
+
+        call_command("import_registre", str(source), "--reprendre", stdout=io.StringIO())
+
+        self.assertEqual(list(Personne.objects.values_list("nom", flat=True)), ["Kasavubu"])
+        self.assertEqual(json.loads(checkpoint.read_text())["inserees"], 2)
+
+    def test_ligne_d_origine_rejetee_quand_la_date_deborde(self):
+        CompteurNumeroNational.objects.create(prefixe="250702", dernier_ordre=999)
+        source = self.ecrire_source([
+            "Lumumba,,Patrice,M,1925-07-02,Lumumba,,Onema,,,Onalua\n",
+            "Kimbangu,,Simon,M,1887-09-12,Kuyela,,Lwezi,,,Nkamba\n",
+        ])
+
+        call_command("import_registre", str(source), stdout=io.StringIO())
+
+        self.assertEqual(list(Personne.objects.values_list("nom", flat=True)), ["Kimbangu"])
+        with open(f"{source}.erreurs.csv", encoding="utf-8", newline="") as fichier:
+            (rejet,) = csv.DictReader(fichier)
+        self.assertEqual(rejet["ligne"], "1")
+        self.assertEqual(json.loads(rejet["donnees"])["adresse_actuelle"], "Onalua")
+        self.assertEqual(json.loads(rejet["donnees"])["date_naissance"], "1925-07-02")
+
+
+class RechercheTests(TestCase):
+    def test_normalisation_et_phonetique(self):
+        self.assertEqual(normaliser("  N'Gaïe-Mbuyi "), "n gaie mbuyi")
+        self.assertEqual(cle_phonetique("Tshisekedi"), cle_phonetique("Chisekedi"))
+        self.assertEqual(cle_phonetique("Mbuyi"), cle_phonetique("Mbouyi"))
+        self.assertEqual(cle_phonetique("Ngoy"), cle_phonetique("Ngoie"))
+
+    def test_cles_tenues_a_jour_au_save(self):
+        p = creer_personne(nom="Ilunga", prenom="Élodie", sexe="F")
+        self.assertEqual(p.prenom_normalise, "elodie")
+        p.nom = "Lukusa"
+        p.save(update_fields=["nom"])
+        p.refresh_from_db()
+        self.assertEqual(p.nom_normalise, "lukusa")
+
+    def test_recherche_classee_par_pertinence(self):
+        exact = creer_personne(nom="Mbuyi")
+        prefixe = creer_personne(nom="Mbuyimbuyi")
+        phonetique = creer_personne(nom="Mbouyi")
+        creer_personne(nom="Kalala")
+
+        resultats = paginer_par_paliers(paliers_recherche({"nom": "MBUYI"})).elements
+        self.assertEqual(resultats, [exact, prefixe, phonetique])
+        self.assertEqual(set(rechercher_personnes({"nom": "MBUYI"})), {exact, prefixe, phonetique})
+
+    def test_recherche_sans_accents_et_numero_avec_tiret(self):
+        p = creer_personne(nom="Kasaï", prenom="Hélène", sexe="F")
+        self.assertEqual(list(rechercher_personnes({"nom": "kasai", "prenom": "hel"})), [p])
+        saisie = f"{p.numero_national[:9]}-{p.numero_national[9:]}"
+        self.assertEqual(list(rechercher_personnes({"numero_national": saisie})), [p])
+
+
+class PaginationRechercheTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("officier", password="x"))
+        for prenom in ["Aline", "Bertin", "Carine", "Dieudonne", "Espoir"]:
+            creer_personne(nom="Kabamba", prenom=prenom)
+
+    def test_parcours_par_curseur(self):
+        qs = Personne.objects.order_by("nom", "postnom", "prenom", "id")
+        page1 = paginer_par_curseur(qs, taille=2)
+        page2 = paginer_par_curseur(qs, page1.curseur_suivant, taille=2)
+        page3 = paginer_par_curseur(qs, page2.curseur_suivant, taille=2)
+
+        prenoms = [p.prenom for page in (page1, page2, page3) for p in page.elements]
+        self.assertEqual(prenoms, ["Aline", "Bertin", "Carine", "Dieudonne", "Espoir"])
+        self.assertFalse(page3.a_suivante)
+
+    def test_parcours_des_paliers_sur_index(self):
+        creer_personne(nom="Cabamba", prenom="Fabrice")  # phonétiquement proche
+        paliers = paliers_recherche({"nom": "kabamba"})
+        prenoms, curseur = [], None
+        while True:
+            page = paginer_par_paliers(paliers, curseur, taille=2)
+            prenoms += [p.prenom for p in page.elements]
+            if not page.a_suivante:
+                break
+            curseur = page.curseur_suivant
+        self.assertEqual(prenoms, ["Aline", "Bertin", "Carine", "Dieudonne", "Espoir", "Fabrice"])
+
+        # Première page et page reprise au curseur : lues dans l'ordre de l'index, sans tri
+        with CaptureQueriesContext(connection) as requetes:
+            paginer_par_paliers(paliers, taille=2)
+            paginer_par_paliers(paliers, paginer_par_paliers(paliers, taille=2).curseur_suivant, taille=2)
+        with connection.cursor() as curseur_sql:
+            for requete in requetes:
+                curseur_sql.execute(f"EXPLAIN QUERY PLAN {requete['sql']}".replace("%", "%%"), ())
+                plan = " ".join(str(ligne[-1]) for ligne in curseur_sql.fetchall())
+                self.assertIn("personne_recherche_", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_total_plafonne(self):
+        self.assertEqual(compter_avec_plafond(Personne.objects.all(), plafond=3), (3, True))
+        self.assertEqual(compter_avec_plafond(Personne.objects.all(), plafond=10), (5, False))
+
+    def test_vue_paginee(self):
+        url = reverse("recherche_citoyen")
+        reponse = self.client.get(url, {"nom": "kabamba", "taille": 3})
+        self.assertEqual(len(reponse.context["resultats"]), 3)
+        self.assertIn("url_page_suivante", reponse.context)
+
+        reponse = self.client.get(url + reponse.context["url_page_suivante"])
+        self.assertEqual([p.prenom for p in reponse.context["resultats"]], ["Dieudonne", "Espoir"])
+        self.assertNotIn("url_page_suivante", reponse.context)
+
+
+class StatistiquesTests(TestCase):
+    def totaux(self):
+        stats = statistiques.lire()
+        return {champ: getattr(stats, champ) for champ in statistiques.CHAMPS_TOTAUX}
+
+    def test_agregats_suivent_les_ecritures(self):
+        naissance = creer_personne(type_enregistrement="NAISSANCE")
+        ActeNaissance.objects.create(personne=naissance)
+        adulte = creer_personne(type_enregistrement="ADULTE", prenom="Paul")
+        acte = ActeNaissance.objects.create(personne=adulte, type_acte="TARDIF")
+        self.assertEqual(self.totaux(), statistiques.calculer())
+
+        adulte.type_enregistrement = "NAISSANCE"
+        adulte.save()
+        acte.type_acte = "NORMAL"
+        acte.save()
+        self.assertEqual(self.totaux(), statistiques.calculer())
+
+        Personne.objects.filter(pk=naissance.pk).delete()
+        self.assertEqual(self.totaux(), statistiques.calculer())
+        self.assertEqual(self.totaux()["total_actes"], 1)
+
+    def test_vue_lit_une_seule_ligne(self):
+        creer_personne()
+        statistiques.lire()
+        self.client.force_login(User.objects.create_user("officier", password="x"))
+        # session + utilisateur + ligne d'agrégats
+        with self.assertNumQueries(3):
+            reponse = self.client.get(reverse("stats"))
+        self.assertEqual(reponse.context["total_citoyens"], 1)
+
+    def test_rebuild_stats_reconcilie(self):
+        creer_personne()
+        Personne.objects.update(type_enregistrement="ADULTE")  # contourne les signaux
+        call_command("rebuild_stats", stdout=io.StringIO())
+        self.assertEqual(self.totaux()["total_adultes"], 1)
+        self.assertEqual(self.totaux()["total_naissances"], 0)
+
+
+class AuditTamponTests(TestCase):
+    def setUp(self):
+        # Tampon propre au test, sans thread de fond : seul vider_tampon_audit() écrit
+        tampon = audit.TamponAudit()
+        tampon._demarrer = lambda: None
+        remplacement = mock.patch.object(audit, "_tampon", tampon)
+        remplacement.start()
+        self.addCleanup(remplacement.stop)
+
+    def requete(self):
+        return RequestFactory().post("/", REMOTE_ADDR="10.0.0.1", HTTP_USER_AGENT="test")
+
+    @override_settings(REGISTRE_AUDIT_MODE="tampon")
+    def test_entrees_ecrites_par_lot_apres_commit(self):
+        personne = creer_personne()
+        with self.captureOnCommitCallbacks(execute=True):
+            log_audit(self.requete(), "CREATION_ADULTE", personne=personne)
+            log_audit(self.requete(), "CONSULTATION", personne=personne)
+        heure_action = timezone.now()
+        self.assertFalse(JournalAudit.objects.filter(personne=personne).exists())
+
+        self.assertEqual(vider_tampon_audit(), 2)
+        entrees = JournalAudit.objects.filter(personne=personne)
+        self.assertEqual(entrees.count(), 2)
+        self.assertTrue(all(e.created_at <= heure_action for e in entrees))
+
+    @override_settings(REGISTRE_AUDIT_MODE="tampon")
+    def test_mode_strict_force(self):
+        log_audit(self.requete(), "ETABLIR_ACTE_TARDIF", strict=True)
+        self.assertEqual(JournalAudit.objects.filter(action="ETABLIR_ACTE_TARDIF").count(), 1)
+
+    def test_mode_strict_par_defaut(self):
+        log_audit(self.requete(), "CREATION_NAISSANCE")
+        self.assertEqual(JournalAudit.objects.get().ip_address, "10.0.0.1")
+
+
+class ArchiveAuditTests(TestCase):
+    def test_archivage_puis_recherche(self):
+        temporaire = tempfile.TemporaryDirectory()
+        self.addCleanup(temporaire.cleanup)
+        dossier = temporaire.name
+        personne = creer_personne()
+        ancien = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            JournalAudit.objects.create(action="CREATION_ADULTE", personne=personne, created_at=ancien)
+        JournalAudit.objects.create(action="CONSULTATION", personne=personne, created_at=ancien)
+        recent = JournalAudit.objects.create(action="CREATION_ADULTE", personne=personne)
+
+        manifeste = archiver(timezone.now() - timedelta(days=365), dossier, taille_lot=2)
+
+        self.assertEqual(manifeste["nombre"], 6)
+        self.assertEqual(list(JournalAudit.objects.all()), [recent])
+        trouvees = list(archives_audit.rechercher(
+            dossier, action="CREATION_ADULTE", numero_national=personne.numero_national,
+        ))
+        self.assertEqual(len(trouvees), 5)
+
+        # Une archive altérée est détectée
+        with open(Path(dossier) / manifeste["fichier"], "ab") as fichier:
+            fichier.write(b"x")
+        with self.assertRaises(archives_audit.ArchiveCorrompue):
+            list(archives_audit.rechercher(dossier))
+
+
+class RenduActeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user("officier", password="x"))
+        self.personne = creer_personne()
+        self.acte = ActeNaissance.objects.create(personne=self.personne)
+        self.url = reverse("acte_naissance", args=[self.personne.id])
+
+    def test_rendu_mis_en_cache_et_304(self):
+        reponse = self.client.get(self.url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn(self.acte.numero_acte, reponse.content.decode())
+        self.assertIsNotNone(cache.get(cache_actes.cle_cache(self.personne.pk)))
+
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=reponse["ETag"])
+        self.assertEqual(reponse.status_code, 304)
+
+    def test_modification_invalide_le_rendu(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.personne.adresse_actuelle = "Lubumbashi"
+        self.personne.save()
+        self.assertIsNone(cache.get(cache_actes.cle_cache(self.personne.pk)))
+
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse["ETag"], etag)
+
+
+class ImpressionLotTests(TestCase):
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = override_settings(REGISTRE_IMPRESSION_DOSSIER_PAGES=Path(dossier.name) / "pages")
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.actes = [
+            ActeNaissance.objects.create(
+                personne=creer_personne(prenom=f"Adulte {i}"), type_acte="TARDIF", lieu_etablissement=lieu
+            )
+            for i, lieu in enumerate(["Kampemba", "Kampemba", "Ruashi"])
+        ]
+
+    def imprimer(self, dossier, processus=1, **options):
+        chemin = os.path.join(dossier, "lot.html")
+        call_command(
+            "imprimer_actes", sortie=chemin, processus=processus, taille_paquet=1,
+            stdout=io.StringIO(), stderr=io.StringIO(), **options,
+        )
+        with open(f"{chemin}.manifeste.json", encoding="utf-8") as fichier:
+            manifeste = json.load(fichier)
+        with open(f"{chemin}.progression.json", encoding="utf-8") as fichier:
+            progression = json.load(fichier)
+        return Path(chemin).read_bytes(), manifeste, progression
+
+    def test_document_et_manifeste(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            document, manifeste, progression = self.imprimer(dossier, type="TARDIF", lieu="Kampemba")
+            texte = document.decode()
+            self.assertEqual([acte["numero_acte"] for acte in manifeste["actes"]],
+                             [acte.numero_acte for acte in self.actes[:2]])
+            self.assertEqual(manifeste["sha256"], hashlib.sha256(document).hexdigest())
+            self.assertEqual(manifeste["bilan"]["pages"], 3)
+            self.assertEqual(texte.count('<section class="feuille"'), 3)
+            self.assertIn(f"Acte {self.actes[1].numero_acte} – page 3 / 3", texte)
+            self.assertNotIn(self.actes[2].numero_acte, texte)
+            self.assertNotIn("Imprimer / Enregistrer en PDF", texte)
+            self.assertEqual((progression["etat"], progression["faits"]), ("termine", 2))
+
+            # Deuxième impression : pages servies par le cache, sauf l'acte modifié
+            self.actes[0].officier = "Officier principal"
+            self.actes[0].save()
+            _, manifeste, _ = self.imprimer(dossier, type="TARDIF", lieu="Kampemba")
+            self.assertEqual((manifeste["bilan"]["depuis_cache"], manifeste["bilan"]["rendus"]), (1, 1))
+
+    def test_selection_vide(self):
+        with tempfile.TemporaryDirectory() as dossier, self.assertRaises(CommandError):
+            self.imprimer(dossier, type="NORMAL")
+
+    def test_date_inexistante(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            with self.assertRaisesMessage(CommandError, "Date invalide : 2026-02-30"):
+                self.imprimer(dossier, etabli_depuis="2026-02-30")
+
+
+class ImpressionPoolTests(TransactionTestCase):
+    """Rendu dans un pool de processus : les enfants lisent les actes enregistrés."""
+
+    imprimer = ImpressionLotTests.imprimer
+    setUp = ImpressionLotTests.setUp
+
+    def test_pages_rendues_par_le_pool_puis_reprises_du_disque(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            document, manifeste, _ = self.imprimer(dossier, processus=2, type="TARDIF")
+            self.assertEqual((manifeste["bilan"]["rendus"], manifeste["bilan"]["manquants"]), (3, 0))
+            for acte in self.actes:
+                self.assertIn(f'id="acte-{acte.numero_acte}"', document.decode())
+                self.assertIn(acte.personne.numero_national, document.decode())
+
+            # Nouvelle exécution : pages relues sur disque, rien à rendre
+            _, manifeste, _ = self.imprimer(dossier, processus=2, type="TARDIF")
+            self.assertEqual((manifeste["bilan"]["depuis_cache"], manifeste["bilan"]["rendus"]), (3, 0))
+
+
+class ConsultationTests(TestCase):
+    def setUp(self):
+        caches["citoyens"].clear()
+        consultation.compteurs.reinitialiser()
+        self.personne = creer_personne()
+        self.acte = ActeNaissance.objects.create(personne=self.personne)
+
+    def test_lecture_en_une_requete_puis_depuis_le_cache(self):
+        with self.assertNumQueries(1):
+            personne = consultation.obtenir_personne(self.personne.pk)
+            self.assertEqual(consultation.acte_de(personne), self.acte)
+        with self.assertNumQueries(0):
+            personne = consultation.obtenir_par_numero(self.personne.numero_national)
+            self.assertEqual(consultation.acte_de(personne).numero_acte, self.acte.numero_acte)
+        self.assertEqual(consultation.compteurs.instantane()["succes"], 1)
+        self.assertEqual(consultation.compteurs.instantane()["echecs"], 1)
+
+    def test_personne_sans_acte(self):
+        adulte = creer_personne(type_enregistrement="ADULTE", prenom="Paul")
+        self.assertIsNone(consultation.acte_de(consultation.obtenir_personne(adulte.pk)))
+        self.assertIsNone(consultation.obtenir_personne(999999))
+
+    def test_invalidation_a_l_ecriture(self):
+        consultation.obtenir_personne(self.personne.pk)
+        self.personne.adresse_actuelle = "Goma"
+        self.personne.save()
+        self.assertEqual(consultation.obtenir_personne(self.personne.pk).adresse_actuelle, "Goma")
+
+        self.acte.delete()
+        self.assertIsNone(consultation.acte_de(consultation.obtenir_personne(self.personne.pk)))
+
+    def test_acte_jamais_rendu_depuis_une_fiche_perimee(self):
+        self.client.force_login(User.objects.create_user("officier", password="x"))
+        url = reverse("acte_naissance", args=[self.personne.pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Modification par un autre processus : le cache de celui-ci n'est pas invalidé
+        Personne.objects.filter(pk=self.personne.pk).update(nom="Tshibanda", date_modification=timezone.now())
+        self.assertEqual(consultation.obtenir_personne(self.personne.pk).nom, "Kabongo")
+        self.assertContains(self.client.get(url), "<strong>Tshibanda")
+
+    def test_etablir_acte_tardif_via_la_vue(self):
+        self.client.force_login(User.objects.create_user("officier", password="x"))
+        adulte = creer_personne(type_enregistrement="ADULTE", prenom="Paul")
+        self.client.get(reverse("detail_citoyen", args=[adulte.pk]))
+
+        self.client.get(reverse("etablir_acte_naissance", args=[adulte.pk]))
+        reponse = self.client.get(reverse("detail_citoyen", args=[adulte.pk]))
+        self.assertEqual(reponse.context["acte"].type_acte, "TARDIF")
+
+
+class VerificationApiTests(TestCase):
+    def setUp(self):
+        self.partenaire = User.objects.create_user("banque", password="secret")
+        self.partenaire.user_permissions.add(Permission.objects.get(codename="view_personne"))
+        self.url = reverse("api_verification")
+
+    def appeler(self, numeros, identifiants=("banque", "secret")):
+        jeton = base64.b64encode(":".join(identifiants).encode()).decode()
+        return self.client.post(
+            self.url,
+            json.dumps({"numeros_nationaux": numeros}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Basic {jeton}",
+        )
+
+    def test_controle_mod_97(self):
+        self.assertTrue(numero_national_valide("251209001" + cle_controle("251209001")))
+        self.assertFalse(numero_national_valide("25120900100"))
+        self.assertFalse(numero_national_valide("251309001" + cle_controle("251309001")))
+
+    def test_verification_en_lot(self):
+        p = creer_personne()
+        inconnu = "251209002" + cle_controle("251209002")
+        numero_tiret = f"{p.numero_national[:9]}-{p.numero_national[9:]}"
+
+        with self.assertNumQueries(5):  # utilisateur, 2 × permissions, IN, audit
+            reponse = self.appeler([numero_tiret, "12345", inconnu])
+            corps = json.loads(b"".join(reponse.streaming_content))
+
+        self.assertEqual([r["statut"] for r in corps["resultats"]], ["TROUVE", "INVALIDE", "INCONNU"])
+        self.assertEqual(corps["resultats"][0]["nom"], "Kabongo")
+        self.assertEqual(JournalAudit.objects.get().action, "VERIFICATION_LOT")
+
+    def test_authentification_et_limites(self):
+        self.assertEqual(self.appeler([], ("banque", "faux")).status_code, 401)
+        User.objects.create_user("curieux", password="x")
+        self.assertEqual(self.appeler([], ("curieux", "x")).status_code, 403)
+        with self.settings(REGISTRE_API_VERIFICATION_MAX=2):
+            self.assertEqual(self.appeler(["1", "2", "3"]).status_code, 413)
+
+    def test_session_soumise_au_controle_csrf(self):
+        navigateur = Client(enforce_csrf_checks=True)
+        navigateur.force_login(self.partenaire)
+        corps = json.dumps({"numeros_nationaux": []})
+
+        reponse = navigateur.post(self.url, corps, content_type="application/json")
+        self.assertEqual(reponse.status_code, 403)
+        self.assertIn("CSRF", reponse.json()["erreur"])
+
+        jeton = "a" * 32
+        navigateur.cookies["csrftoken"] = jeton
+        reponse = navigateur.post(self.url, corps, content_type="application/json", HTTP_X_CSRFTOKEN=jeton)
+        self.assertEqual(reponse.status_code, 200)
+
+        self.client = Client(enforce_csrf_checks=True)
+        self.assertEqual(self.appeler([]).status_code, 200)  # Basic : pas de jeton
+
+
+class ExportRegistreTests(TestCase):
+    def setUp(self):
+        self.ancien = creer_personne(nom="Ilunga")
+        self.recent = creer_personne(nom="Mwamba", type_enregistrement="ADULTE")
+        hier = timezone.now() - timedelta(days=1)
+        Personne.objects.filter(pk=self.ancien.pk).update(date_modification=hier - timedelta(days=30))
+        Personne.objects.filter(pk=self.recent.pk).update(date_modification=hier)
+        self.depuis = hier - timedelta(days=1)
+
+    def test_export_jsonl_incremental(self):
+        qs = export.filtrer(modifie_depuis=self.depuis)
+        lignes = [json.loads(ligne) for ligne in export.produire(export.iterer_lignes(qs), "jsonl")]
+        self.assertEqual([ligne["nom"] for ligne in lignes], ["Mwamba"])
+
+        # Un acte modifié fait ressortir la personne
+        ActeNaissance.objects.create(personne=self.ancien, lieu_etablissement="Kinshasa", officier="Officier")
+        self.assertEqual(export.filtrer(modifie_depuis=self.depuis).count(), 2)
+
+    def test_export_incremental_sur_index(self):
+        with CaptureQueriesContext(connection) as requetes:
+            list(export.iterer_lignes(export.filtrer(modifie_depuis=self.depuis)))
+        # Chaque branche du OU sur son index de date_modification, sans parcours de table
+        with connection.cursor() as curseur_sql:
+            curseur_sql.execute(f"EXPLAIN QUERY PLAN {requetes[0]['sql']}".replace("%", "%%"), ())
+            plan = " ".join(str(ligne[-1]) for ligne in curseur_sql.fetchall())
+        self.assertIn("personne_modification_idx", plan)
+        self.assertIn("acte_modification_idx", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_export_csv_gzip(self):
+        flux = export.compresser(export.produire(export.iterer_lignes(export.filtrer()), "csv"))
+        texte = gzip.decompress(b"".join(flux)).decode()
+        lignes = list(csv.DictReader(io.StringIO(texte)))
+        self.assertEqual([ligne["nom"] for ligne in lignes], ["Ilunga", "Mwamba"])
+        self.assertEqual(lignes[0]["numero_national"], self.ancien.numero_national)
+
+    def test_vue_export(self):
+        url = reverse("export_registre")
+        User.objects.create_user("agent", password="x")
+        self.client.login(username="agent", password="x")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        User.objects.get(username="agent").user_permissions.add(Permission.objects.get(codename="view_personne"))
+        reponse = self.client.get(url, {"format": "jsonl", "type": "ADULTE"})
+        lignes = b"".join(reponse.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(ligne)["nom"] for ligne in lignes], ["Mwamba"])
+        self.assertEqual(JournalAudit.objects.get().action, "EXPORT_REGISTRE")
+        self.assertEqual(self.client.get(url, {"ne_depuis": "hier"}).status_code, 400)
+
+
+class DoublonsTests(TestCase):
+    def setUp(self):
+        self.original = creer_personne(nom="Tshibangu", postnom="Kalala", prenom="Joseph", nom_mere="Mwamba")
+        # Même personne recensée adulte : graphie différente, jour et mois inversés
+        self.doublon = creer_personne(
+            nom="Chibangu", postnom="Kalala", prenom="Joseph", nom_mere="Mouamba",
+            date_naissance=date(2025, 9, 12), type_enregistrement="ADULTE",
+        )
+        creer_personne(nom="Tshibangu", prenom="Marie", sexe="F", nom_mere="Ngalula")
+
+    def test_detection_par_blocs(self):
+        paires = doublons.detecter(processus=1)
+        self.assertEqual([(a, b) for _, a, b, _ in paires], [(self.original.pk, self.doublon.pk)])
+        self.assertEqual(paires[0][3], ["nom+prenom+mere"])
+
+    def test_rapport_avec_pool(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            sortie = os.path.join(dossier, "doublons.csv")
+            call_command("detect_doublons", sortie=sortie, processus=2, stdout=io.StringIO(), stderr=io.StringIO())
+            with open(sortie, encoding="utf-8") as fichier:
+                lignes = list(csv.DictReader(fichier))
+        self.assertEqual(len(lignes), 1)
+        self.assertEqual(lignes[0]["numero_national_b"], self.doublon.numero_national)
+
+    def test_alerte_a_la_saisie(self):
+        User.objects.create_user("agent", password="x")
+        self.client.login(username="agent", password="x")
+        donnees = {
+            "nom": "Tshibangou", "postnom": "Kalala", "prenom": "Joseph", "sexe": "M",
+            "date_naissance": "2025-12-09", "nom_pere": "Kabongo", "nom_mere": "Mwamba",
+            "nationalite": "Congolaise",
+        }
+        url = reverse("nouvel_adulte")
+
+        reponse = self.client.post(url, donnees)
+        self.assertContains(reponse, "Doublon probable")
+        self.assertEqual(Personne.objects.count(), 3)
+
+        reponse = self.client.post(url, dict(donnees, confirmer_doublon="1"))
+        self.assertEqual(reponse.status_code, 302)
+        self.assertEqual(Personne.objects.count(), 4)
+
+    def test_blocs_de_saisie_lus_separement_sur_leur_index(self):
+        Personne.objects.all().delete()
+        # Homonymes du prénom nés le même jour, enregistrés avant la fiche recherchée
+        for nom in ("Ilunga", "Kasongo", "Mutombo", "Ngoy"):
+            creer_personne(nom=nom, prenom="Joseph", nom_mere=f"Mère {nom}")
+        original = creer_personne(nom="Tshibangu", postnom="Kalala", prenom="Joseph", nom_mere="Mwamba")
+        saisie = Personne(
+            nom="Tshibangou", postnom="Kalala", prenom="Joseph", sexe="M",
+            date_naissance=original.date_naissance, nom_pere="Kabongo", nom_mere="Mwamba",
+        )
+
+        with mock.patch.object(doublons, "CANDIDATS_MAX", 2), CaptureQueriesContext(connection) as requetes:
+            resultats = doublons.doublons_probables(saisie)
+        self.assertEqual([resultat["id"] for resultat in resultats], [original.pk])
+        self.assertEqual(len(requetes), 3)
+        self.assertTrue(all(requete["sql"].endswith("LIMIT 2") for requete in requetes))
+
+        plans = [
+            Personne.objects.filter(**criteres).order_by("pk").explain()
+            for criteres in ({"nom_phonetique": "x", "prenom_normalise": "joseph"},
+                             {"date_naissance": original.date_naissance, "prenom_normalise": "joseph"})
+        ]
+        self.assertIn("personne_phon_prenom_idx", plans[0])
+        self.assertIn("personne_date_prenom_idx", plans[1])
+        self.assertFalse([plan for plan in plans if "TEMP B-TREE" in plan])
+
+
+class VerificationRegistreTests(TestCase):
+    def setUp(self):
+        self.personnes = [creer_personne(prenom=f"Enfant {i}") for i in range(4)]
+        for personne in self.personnes[:3]:
+            ActeNaissance.objects.create(personne=personne)
+        # Ordre 002 supprimé, clé de l'ordre 004 corrompue
+        self.personnes[1].delete()
+        base = self.personnes[3].numero_national[:9]
+        Personne.objects.filter(pk=self.personnes[3].pk).update(numero_national=base + "00")
+
+    def verifier(self, **options):
+        with tempfile.TemporaryDirectory() as dossier:
+            rapport = os.path.join(dossier, "rapport.jsonl")
+            call_command("verifier_registre", rapport=rapport, stdout=io.StringIO(), **options)
+            with open(rapport, encoding="utf-8") as fichier:
+                return [json.loads(ligne) for ligne in fichier]
+
+    def test_plages(self):
+        plages = [[1, 3], [7, 9]]
+        self.assertEqual(integrite.fusionner_plage(plages, 4, 5), [])
+        self.assertEqual(integrite.fusionner_plage(plages, 5, 7), [5, 7])
+        self.assertEqual(plages, [[1, 9]])
+        self.assertEqual(integrite.trous([[2, 3], [6, 6]]), [[1, 1], [4, 5]])
+
+    def test_rapport(self):
+        lignes = self.verifier(taille_lot=1, processus=1)
+        types = sorted(ligne["type"] for ligne in lignes)
+        self.assertEqual(types, ["CLE_CONTROLE", "NAISSANCE_SANS_ACTE", "NUMEROS_ACTE_MANQUANTS", "ORDRES_MANQUANTS", "RESUME"])
+        manquants = next(ligne for ligne in lignes if ligne["type"] == "ORDRES_MANQUANTS")
+        self.assertEqual(manquants["plages"], [[2, 2]])
+        self.assertEqual(lignes[-1]["lus"], {"personnes": 3, "actes": 2})
+
+        # Même résultat avec le pool de processus
+        avec_pool = self.verifier(taille_lot=2, processus=2)
+        self.assertEqual(sorted(ligne["type"] for ligne in avec_pool), types)
+
+
+class BancEssaiTests(TransactionTestCase):
+    def test_donnees_reproductibles(self):
+        self.assertEqual(banc_essai.Generateur(7).donnees(), banc_essai.Generateur(7).donnees())
+        repartition = list(banc_essai.naissances_par_jour(1000))
+        self.assertEqual(sum(effectif for _, effectif in repartition), 1000)
+        self.assertEqual(banc_essai.lire_taille("1m"), 1_000_000)
+
+    def test_banc_essai_json(self):
+        sortie = io.StringIO()
+        call_command("banc_essai", taille="300", requetes=4, clients=2, stdout=sortie, stderr=io.StringIO())
+        resultat = json.loads(sortie.getvalue())
+
+        self.assertEqual(resultat["peuplement"]["fiches"], 300)
+        self.assertEqual(resultat["volumes"]["journal_audit"], resultat["volumes"]["personnes"])
+        for nom in ("recherche_citoyen", "detail_citoyen", "stats_view", "nouvelle_naissance_concurrente"):
+            self.assertEqual(resultat["scenarios"][nom]["erreurs"], 0)
+            self.assertIsNotNone(resultat["scenarios"][nom]["p99_ms"])
+
+        # Enregistrements : chaque réponse sans avertissement de doublon a créé une fiche
+        inscriptions = ("nouvelle_naissance", "nouvelle_naissance_concurrente", "nouvel_adulte", "nouvel_adulte_concurrent")
+        for nom in inscriptions:
+            self.assertEqual(resultat["scenarios"][nom]["erreurs"], 0)
+        creees = sum(resultat["scenarios"][nom]["n"] - resultat["scenarios"][nom]["doublons"] for nom in inscriptions)
+        self.assertEqual(resultat["volumes"]["personnes"], 300 + creees)
+
+    def test_doublon_et_formulaire_renvoye_distingues(self):
+        utilisateur = User.objects.create_user("banc", password="x")
+        existante = banc_essai.Generateur(3).donnees(adulte=True)
+        creer_personne(**existante)
+
+        def meme_personne(generateur):
+            return "post", reverse("nouvel_adulte"), dict(existante, date_naissance=existante["date_naissance"].isoformat())
+
+        def formulaire_invalide(generateur):
+            return "post", reverse("nouvel_adulte"), {"nom": "Ilunga"}
+
+        scenario = banc_essai.scenario_inscription(utilisateur, True)
+        scenario.requetes = meme_personne
+        self.assertEqual({cle: scenario.executer(2)[cle] for cle in ("erreurs", "doublons")}, {"erreurs": 0, "doublons": 2})
+        scenario.requetes = formulaire_invalide
+        self.assertEqual({cle: scenario.executer(2)[cle] for cle in ("erreurs", "doublons")}, {"erreurs": 2, "doublons": 0})
+
+
+class MetriquesTests(TestCase):
+    def setUp(self):
+        metriques.registre.reinitialiser()
+        self.agent = User.objects.create_user("agent", password="x")
+        self.client.force_login(self.agent)
+
+    def lire_metriques(self, **entetes):
+        return self.client.get(reverse("metriques"), **entetes)
+
+    def test_histogrammes_par_vue(self):
+        creer_personne()
+        self.client.get(reverse("recherche_citoyen"), {"nom": "Kab"})
+        self.client.get(reverse("stats"))
+
+        self.assertEqual(self.lire_metriques().status_code, 403)
+        self.agent.is_staff = True
+        self.agent.save()
+        texte = self.lire_metriques().content.decode()
+
+        self.assertIn('registre_requete_duree_secondes_count{vue="recherche_citoyen"} 1', texte)
+        self.assertIn('registre_reponses_total{vue="stats",statut="200"} 1', texte)
+        sql = next(l for l in texte.splitlines() if l.startswith('registre_requete_sql_nombre_sum{vue="recherche_citoyen"}'))
+        self.assertGreater(float(sql.split()[-1]), 0)
+        gabarits = next(l for l in texte.splitlines()
+                        if l.startswith('registre_requete_gabarit_duree_secondes_sum{vue="stats"}'))
+        self.assertGreater(float(gabarits.split()[-1]), 0)
+
+    @override_settings(REGISTRE_METRIQUES_JETON="secret-collecteur", REGISTRE_METRIQUES_SEUIL_LENT=0)
+    def test_jeton_et_requetes_lentes(self):
+        self.client.logout()
+        with self.assertLogs("personnes.metriques", "WARNING") as journaux:
+            reponse = self.lire_metriques(HTTP_AUTHORIZATION="Bearer secret-collecteur")
+            self.assertEqual(self.lire_metriques(HTTP_AUTHORIZATION="Bearer faux").status_code, 403)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn("Requête lente : metriques", journaux.output[0])
+
+
+@override_settings(REGISTRE_DB_REPLIQUES=["replique_1"])
+class RoutageTests(TestCase):
+    def setUp(self):
+        self.routeur = routage.RoutageLectureEcriture()
+
+    def lire(self, session):
+        """Bases choisies pour Personne et User dans une vue @lecture_seule."""
+        @routage.lecture_seule
+        def vue(request):
+            return self.routeur.db_for_read(Personne), self.routeur.db_for_read(User)
+
+        jeton = routage.debut_requete(session.get(routage.CLE_SESSION))
+        try:
+            return vue(None)
+        finally:
+            routage.fin_requete(jeton)
+
+    def test_lectures_du_registre_sur_replique(self):
+        self.assertEqual(self.lire({}), ("replique_1", None))
+        # Hors vue en lecture seule, et pour toutes les écritures : primaire
+        self.assertIsNone(self.routeur.db_for_read(Personne))
+        self.assertEqual(self.routeur.db_for_write(Personne), "default")
+
+    def test_primaire_apres_ecriture(self):
+        User.objects.create_user("agent", password="x")
+        self.client.login(username="agent", password="x")
+        self.client.post(reverse("nouvel_adulte"), {
+            "nom": "Ilunga", "prenom": "Paul", "sexe": "M", "date_naissance": "1990-05-04",
+            "nom_pere": "Ilunga", "nom_mere": "Ngoy", "nationalite": "Congolaise",
+        })
+        session = dict(self.client.session)
+        self.assertGreater(session[routage.CLE_SESSION], time.time())
+        self.assertEqual(self.lire(session)[0], "default")
+
+        # Fenêtre écoulée : retour sur la réplique
+        self.assertEqual(self.lire({routage.CLE_SESSION: time.time() - 1})[0], "replique_1")
+
+
+class RepliqueSQLiteTests(TransactionTestCase):
+    """
+    Routage sur une vraie réplique : second fichier SQLite, copie de la base de test ouverte
+    en lecture seule comme dans settings, jamais rattrapée (retard de réplication).
+    """
+    ALIAS = "replique_test"
+
+    def setUp(self):
+        caches[consultation.ALIAS_CACHE].clear()
+        self.personne = creer_personne(type_enregistrement="ADULTE", date_naissance=date(1990, 5, 4))
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        chemin = Path(dossier.name) / "replique.sqlite3"
+        connection.ensure_connection()
+        with closing(sqlite3.connect(chemin)) as copie:
+            connection.connection.backup(copie)
+
+        connections.settings[self.ALIAS] = dict(
+            connections.settings["default"], NAME=f"file:{chemin}?mode=ro", OPTIONS={"timeout": 20},
+        )
+        # Alias créé après la mise en place de la classe : autorisé explicitement (vues asynchrones en thread)
+        bases = type(self).databases
+        type(self).databases = bases | {self.ALIAS}
+        self.addCleanup(setattr, type(self), "databases", bases)
+        self.addCleanup(self.retirer_replique)
+        reglages = override_settings(REGISTRE_DB_REPLIQUES=[self.ALIAS])
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def retirer_replique(self):
+        connections[self.ALIAS].close()
+        del connections[self.ALIAS]
+        del connections.settings[self.ALIAS]
+
+    def connecter(self, nom):
+        client = self.client_class()
+        User.objects.create_user(nom, password="x")
+        client.login(username=nom, password="x")
+        return client
+
+    def test_lectures_epinglage_et_cache(self):
+        ecrivain, lecteur = self.connecter("officier"), self.connecter("consultant")
+        fiche = reverse("detail_citoyen", args=[self.personne.pk])
+
+        # L'officier établit l'acte sur la primaire : sa session y est épinglée
+        ecrivain.get(reverse("etablir_acte_naissance", args=[self.personne.pk]))
+        self.assertGreater(ecrivain.session[routage.CLE_SESSION], time.time())
+
+        # Autre session : lue sur la réplique en retard, sans l'acte ; rien n'est mis en cache
+        reponse = lecteur.get(fiche)
+        self.assertEqual(reponse.context["personne"]._state.db, self.ALIAS)
+        self.assertIsNone(reponse.context["acte"])
+
+        # Session épinglée : relit sa propre écriture sur la primaire, pas la fiche de la réplique
+        reponse = ecrivain.get(fiche)
+        self.assertEqual(reponse.context["personne"]._state.db, "default")
+        self.assertIsNotNone(reponse.context["acte"])
+
+        # Fiche lue sur la primaire : en cache, servie sans requête à la réplique
+        with CaptureQueriesContext(connections[self.ALIAS]) as requetes:
+            reponse = lecteur.get(fiche)
+        self.assertIsNotNone(reponse.context["acte"])
+        self.assertEqual(len(requetes), 0)
+
+    def test_flux_lu_sur_la_primaire(self):
+        miroir = User.objects.create_user("miroir-kasai", password="secret")
+        miroir.user_permissions.add(Permission.objects.get(codename="view_personne"))
+        jeton = base64.b64encode(b"miroir-kasai:secret").decode()
+        # Fiche écrite après la copie : absente de la réplique en retard
+        recente = creer_personne(prenom="Aline", sexe="F")
+
+        with CaptureQueriesContext(connections[self.ALIAS]) as requetes:
+            reponse = self.client.get(reverse("api_flux"), HTTP_AUTHORIZATION=f"Basic {jeton}")
+        self.assertEqual(entree_api(reponse), [
+            ("PERSONNE", self.personne.pk, "ECRITURE"), ("PERSONNE", recente.pk, "ECRITURE"),
+        ])
+        self.assertEqual(len(requetes), 0)
+
+
+class VuesAsynchronesTests(TestCase):
+    """Vues de consultation servies par la pile ASGI (AsyncClient, middlewares asynchrones)."""
+
+    def setUp(self):
+        cache.clear()
+        self.personne = creer_personne(nom="Tshibanda", prenom="Marie", sexe="F")
+        ActeNaissance.objects.create(personne=self.personne, lieu_etablissement="Lubumbashi", officier="Officier")
+        self.agent = User.objects.create_user("agent", password="x")
+
+    async def test_consultation_en_asgi(self):
+        await self.async_client.aforce_login(self.agent)
+
+        reponse = await self.async_client.get(reverse("recherche_citoyen"), {"nom": "Tshibanda"})
+        self.assertContains(reponse, self.personne.numero_national)
+        self.assertEqual(reponse.context["total"], 1)
+
+        reponse = await self.async_client.get(reverse("detail_citoyen", args=[self.personne.pk]))
+        self.assertContains(reponse, "Marie")
+
+        reponse = await self.async_client.get(reverse("acte_naissance", args=[self.personne.pk]))
+        self.assertEqual(reponse.status_code, 200)
+        reponse = await self.async_client.get(
+            reverse("acte_naissance", args=[self.personne.pk]), headers={"if-none-match": reponse["ETag"]}
+        )
+        self.assertEqual(reponse.status_code, 304)
+
+        reponse = await self.async_client.get(reverse("stats"))
+        self.assertEqual(reponse.context["total_actes"], 1)
+        self.assertContains(reponse, "agent")
+
+    async def test_fiche_inconnue_et_connexion_requise(self):
+        reponse = await self.async_client.get(reverse("stats"))
+        self.assertEqual(reponse.status_code, 302)
+        await self.async_client.aforce_login(self.agent)
+        reponse = await self.async_client.get(reverse("detail_citoyen", args=[999999]))
+        self.assertEqual(reponse.status_code, 404)
+
+
+class AdminGrandeEchelleTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        self.agent = User.objects.create_user("agent", password="x")
+        self.ajouter(3)
+
+    def ajouter(self, nombre):
+        for _ in range(nombre):
+            personne = creer_personne(nom="Kabongo")
+            acte = ActeNaissance.objects.create(personne=personne)
+            JournalAudit.objects.create(user=self.agent, action="CREATION_NAISSANCE", personne=personne, acte=acte)
+
+    def requetes_liste(self, modele, **params):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get(reverse(f"admin:personnes_{modele}_changelist"), params)
+        self.assertEqual(reponse.status_code, 200)
+        return reponse, [requete["sql"] for requete in requetes]
+
+    def test_nombre_de_requetes_constant_et_sans_count(self):
+        for modele in ("personne", "actenaissance", "journalaudit"):
+            _, avant = self.requetes_liste(modele)
+            self.ajouter(4)
+            reponse, apres = self.requetes_liste(modele)
+            self.assertEqual(len(apres), len(avant), modele)
+            self.assertFalse([sql for sql in apres if "COUNT(" in sql.upper()], modele)
+        self.assertEqual(reponse.context["cl"].result_count, JournalAudit.objects.count())
+
+    def test_recherche_sur_colonnes_normalisees(self):
+        creer_personne(nom="Ngoïe", prenom="Éloïse", sexe="F")
+        reponse, requetes = self.requetes_liste("personne", q="ELOI")
+        self.assertEqual([p.nom for p in reponse.context["cl"].result_list], ["Ngoïe"])
+        self.assertFalse([sql for sql in requetes if " LIKE " in sql.upper()])
+
+        reponse, _ = self.requetes_liste("journalaudit", q="agent")
+        self.assertEqual(reponse.context["cl"].result_count, 3)
+
+    def test_recherche_standard_sans_filtre_recherche(self):
+        modele_admin = AdminGrandeEchelle(Tache, admin.site)
+        modele_admin.search_fields = ("commande",)
+        Tache.objects.create(commande="export_registre")
+        Tache.objects.create(commande="imprimer_actes")
+        queryset, _ = modele_admin.get_search_results(
+            RequestFactory().get("/"), Tache.objects.all(), "export"
+        )
+        self.assertEqual([tache.commande for tache in queryset], ["export_registre"])
+
+
+class FiliationsTests(TestCase):
+    def setUp(self):
+        self.pere = creer_personne(nom="Ilunga", postnom="Kasongo", prenom="Paul", date_naissance=date(1980, 3, 1))
+        self.mere = creer_personne(nom="Mbuyi", prenom="Ruth", sexe="F", date_naissance=date(1985, 7, 9))
+        parents = {"nom_pere": "Ilunga Kasongo", "prenom_pere": "paul", "nom_mere": "MBUYI", "prenom_mere": "Ruth"}
+        self.aine = creer_personne(nom="Ilunga", prenom="Jean", date_naissance=date(2010, 1, 5), **parents)
+        self.cadet = creer_personne(nom="Ilunga", prenom="Marc", date_naissance=date(2015, 6, 2), **parents)
+
+    def test_liaison_et_requetes_familiales(self):
+        # Mère trop jeune à la naissance, père au prénom non saisi : non reliés
+        trop_tot = creer_personne(
+            nom="Ilunga", prenom="Luc", date_naissance=date(1990, 1, 1),
+            nom_pere="Ilunga", nom_mere="Mbuyi", prenom_mere="Ruth",
+        )
+        bilan = filiations.lier(taille_lot=2)
+        self.assertEqual((bilan["pere_relie"], bilan["mere_relie"]), (2, 2))
+
+        self.aine.refresh_from_db()
+        self.assertEqual((self.aine.pere_id, self.aine.mere_id), (self.pere.pk, self.mere.pk))
+        trop_tot.refresh_from_db()
+        self.assertEqual((trop_tot.pere_id, trop_tot.mere_id), (None, None))
+        self.assertEqual(list(filiations.enfants(self.mere)), [self.aine, self.cadet])
+        self.cadet.refresh_from_db()
+        self.assertEqual(list(filiations.fratrie(self.cadet)), [self.aine])
+
+        # Relance : seules les fiches encore incomplètes sont réexaminées
+        self.assertEqual(filiations.lier()["examinees"], 3)
+
+    def test_noms_de_plusieurs_mots(self):
+        pere = creer_personne(nom="N'Gandu", prenom="Albert", date_naissance=date(1978, 4, 2))
+        mere = creer_personne(
+            nom="Mbuyi-Kalala", postnom="Tshala", prenom="Ruth", sexe="F", date_naissance=date(1982, 8, 15)
+        )
+        enfant = creer_personne(
+            nom="N'Gandu", prenom="Grace", sexe="F", date_naissance=date(2012, 5, 3),
+            nom_pere="N'GANDU", prenom_pere="Albert", nom_mere="Mbuyi-Kalala Tshala", prenom_mere="Ruth",
+        )
+
+        filiations.lier(Personne.objects.filter(pk=enfant.pk))
+
+        enfant.refresh_from_db()
+        self.assertEqual((enfant.pere_id, enfant.mere_id), (pere.pk, mere.pk))
+
+    def test_ambiguite_signalee(self):
+        homonyme = creer_personne(nom="Mbuyi", prenom="Ruth", sexe="F", date_naissance=date(1979, 2, 2))
+        signales = []
+        filiations.lier(signaler=lambda enfant, role, ids: signales.append((enfant["id"], role, sorted(ids))))
+        self.assertIn((self.aine.pk, "mere", sorted([self.mere.pk, homonyme.pk])), signales)
+        self.aine.refresh_from_db()
+        self.assertIsNone(self.aine.mere_id)
+        self.assertEqual(self.aine.pere_id, self.pere.pk)
+
+    def test_commande_simulation(self):
+        sortie = io.StringIO()
+        call_command("lier_filiations", simulation=True, stdout=sortie, stderr=io.StringIO())
+        self.assertIn("pères reliés : 2", sortie.getvalue())
+        self.assertFalse(Personne.objects.filter(pere__isnull=False).exists())
+
+
+class AnalytiqueTests(TestCase):
+    def agregats(self):
+        return {
+            tuple(ligne[champ] for champ in analytique.CLE): {
+                mesure: ligne[mesure] for mesure in analytique.MESURES if ligne[mesure]
+            }
+            for ligne in AgregatNaissances.objects.values() if ligne["naissances"]
+        }
+
+    def attendus(self):
+        return analytique.deltas(ajouts=[
+            analytique.contribution_valeurs(valeurs) for valeurs in Personne.objects.values(*analytique.CHAMPS_SOURCE)
+        ])
+
+    def test_agregats_suivent_les_ecritures(self):
+        naissance = creer_personne()
+        ActeNaissance.objects.create(personne=naissance, lieu_etablissement="Kinshasa")
+        adulte = creer_personne(type_enregistrement="ADULTE", prenom="Paul", date_naissance=date(1990, 5, 1))
+        self.assertEqual(self.agregats(), self.attendus())
+
+        acte = ActeNaissance.objects.create(personne=adulte, type_acte="TARDIF", lieu_etablissement="Goma")
+        adulte.sexe = "F"
+        adulte.date_naissance = date(1991, 5, 1)
+        adulte.save()
+        acte.lieu_etablissement = "Bukavu"
+        acte.save()
+        self.assertEqual(self.agregats(), self.attendus())
+
+        acte.delete()
+        Personne.objects.filter(pk=naissance.pk).delete()
+        self.assertEqual(self.agregats(), self.attendus())
+        self.assertEqual(sum(mesures["naissances"] for mesures in self.agregats().values()), 1)
+
+    def test_lots_et_reconstruction(self):
+        # Au-delà de SEUIL_EN_MASSE clés : passage groupé, clés nouvelles puis existantes
+        for prenom in ("Aline", "Bruno"):
+            enregistrer_lot(
+                [Personne(nom="Ilunga", prenom=prenom, sexe="MF"[i % 2], date_naissance=date(2000, 1, 1 + i),
+                          nom_pere="Ilunga", nom_mere="Kasongo") for i in range(analytique.SEUIL_EN_MASSE + 5)],
+                "ADULTE", type_acte="TARDIF",
+            )
+            self.assertEqual(self.agregats(), self.attendus())
+
+        Personne.objects.update(sexe="F")  # contourne les signaux
+        self.assertNotEqual(self.agregats(), self.attendus())
+        call_command("rebuild_analytique", stdout=io.StringIO())
+        self.assertEqual(self.agregats(), self.attendus())
+
+    def test_series_api_et_page_ne_lisent_que_les_agregats(self):
+        for jour in (date(2000, 1, 10), date(2000, 1, 20), date(2000, 3, 1)):
+            creer_personne(date_naissance=jour)
+        tardif = creer_personne(date_naissance=date(2000, 3, 5), sexe="F", prenom="Marie")
+        ActeNaissance.objects.create(personne=tardif, type_acte="TARDIF")
+        self.client.force_login(User.objects.create_superuser("ministere", password="x"))
+
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get(reverse("api_series_naissances"), {"par": "sexe", "depuis": "2000-01-01"})
+        self.assertFalse([r["sql"] for r in requetes if '"personnes_personne"' in r["sql"]])
+        delai = (timezone.localdate() - tardif.date_naissance).days
+        self.assertEqual(reponse.json()["series"], [
+            {"periode": "2000-01", "sexe": "M", "naissances": 2, "actes": 0, "delai_moyen_jours": None,
+             "delais": dict.fromkeys(analytique.CHAMPS_TRANCHES, 0)},
+            {"periode": "2000-03", "sexe": "F", "naissances": 1, "actes": 1, "delai_moyen_jours": delai,
+             "delais": {**dict.fromkeys(analytique.CHAMPS_TRANCHES, 0), "delai_5ans_et_plus": 1}},
+            {"periode": "2000-03", "sexe": "M", "naissances": 1, "actes": 0, "delai_moyen_jours": None,
+             "delais": dict.fromkeys(analytique.CHAMPS_TRANCHES, 0)},
+        ])
+
+        reponse = self.client.get(reverse("api_series_naissances"), {"granularite": "annee", "type_acte": ""})
+        self.assertEqual([(l["periode"], l["naissances"]) for l in reponse.json()["series"]], [("2000", 3)])
+        self.assertEqual(self.client.get(reverse("api_series_naissances"), {"par": "age"}).status_code, 400)
+
+        reponse = self.client.get(reverse("tendances"), {"par": "type_acte"})
+        self.assertContains(reponse, "TARDIF")
+        self.assertEqual([l["naissances"] for l in reponse.context["lignes"]], [3, 1])
+
+
+@override_settings(REGISTRE_SYNC_CLES={"bureau-kananga": "cle-secrete"})
+class SynchronisationBureauTests(TestCase):
+    def envoyer(self, lot, cle="cle-secrete"):
+        corps = json.dumps(lot).encode()
+        return self.client.post(
+            reverse("api_synchronisation"), corps, content_type="application/json",
+            headers={"x-registre-bureau": "bureau-kananga", "x-registre-signature": synchronisation.signer(cle, corps)},
+        )
+
+    def lot(self, *enregistrements):
+        return {"lot": "L1", "lieu_etablissement": "Kananga", "enregistrements": [
+            {"id_client": id_client, "type": type_enregistrement, "nom": "Mukendi", "prenom": prenom, "sexe": "F",
+             "date_naissance": "2026-09-01", "nom_pere": "Mukendi", "nom_mere": "Ngalula"}
+            for id_client, type_enregistrement, prenom in enregistrements
+        ]}
+
+    def test_lot_enregistre_puis_renvoye_sans_doublon(self):
+        lot = self.lot(("n-1", "NAISSANCE", "Grace"), ("a-1", "ADULTE", "Esther"), ("n-2", "NAISSANCE", "Ruth"))
+        reponse = self.envoyer(lot)
+        self.assertEqual(reponse.status_code, 200)
+        bilan = reponse.json()
+        self.assertEqual(bilan["crees"], 3)
+        correspondances = {c["id_client"]: c for c in bilan["correspondances"]}
+        self.assertEqual([c["id_client"] for c in bilan["correspondances"]], ["n-1", "a-1", "n-2"])
+        naissance = Personne.objects.get(pk=correspondances["n-1"]["personne_id"])
+        self.assertEqual(naissance.acte_naissance.numero_acte, correspondances["n-1"]["numero_acte"])
+        self.assertEqual(naissance.acte_naissance.lieu_etablissement, "Kananga")
+        self.assertIsNone(correspondances["a-1"]["numero_acte"])
+        self.assertEqual(JournalAudit.objects.filter(action__startswith="SYNCHRO_").count(), 3)
+
+        # Nouvel essai du bureau avec un enregistrement de plus
+        lot["enregistrements"].append(self.lot(("a-2", "ADULTE", "Sarah"))["enregistrements"][0])
+        bilan = self.envoyer(lot).json()
+        self.assertEqual((bilan["crees"], bilan["deja_synchronises"]), (1, 3))
+        self.assertEqual(
+            {c["id_client"]: c["personne_id"] for c in bilan["correspondances"][:3]},
+            {id_client: c["personne_id"] for id_client, c in correspondances.items()},
+        )
+        self.assertEqual(Personne.objects.count(), 4)
+        self.assertEqual(EnregistrementSynchronise.objects.count(), 4)
+
+    def test_lot_refuse_en_entier(self):
+        self.assertEqual(self.envoyer(self.lot(("n-1", "NAISSANCE", "Grace")), cle="autre").status_code, 403)
+
+        lot = self.lot(("n-1", "NAISSANCE", "Grace"), ("n-2", "NAISSANCE", "Ruth"))
+        lot["enregistrements"][1]["sexe"] = "X"
+        reponse = self.envoyer(lot)
+        self.assertEqual(reponse.status_code, 422)
+        self.assertIn("sexe", reponse.json()["erreurs"]["n-2"])
+        self.assertFalse(Personne.objects.exists())
+
+        self.assertEqual(self.envoyer(self.lot(("n-1", "NAISSANCE", "A"), ("n-1", "ADULTE", "B"))).status_code, 400)
+
+    def test_conflit_signale_seulement_pour_un_envoi_concurrent(self):
+        lot = self.lot(("n-1", "NAISSANCE", "Grace"))
+        valider = synchronisation._valider
+
+        def envoi_concurrent(enregistrement):
+            # L'autre requête du bureau enregistre n-1 après notre lecture des id_client connus
+            EnregistrementSynchronise.objects.create(
+                bureau="bureau-kananga", id_client="n-1", personne=creer_personne(), date_synchronisation=timezone.now()
+            )
+            return valider(enregistrement)
+
+        with mock.patch.object(synchronisation, "_valider", envoi_concurrent):
+            reponse = self.envoyer(lot)
+        self.assertEqual(reponse.status_code, 409)
+
+        def contrainte_violee(*args, **kwargs):
+            raise IntegrityError("NOT NULL constraint failed: personnes_personne.nom")
+
+        with mock.patch.object(synchronisation, "enregistrer_lot", contrainte_violee):
+            with self.assertRaises(IntegrityError):
+                synchronisation.synchroniser("bureau-kananga", self.lot(("n-2", "NAISSANCE", "Ruth")))
+
+
+class TachesTests(TestCase):
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dossier.cleanup)
+        reglages = override_settings(
+            REGISTRE_TACHES_DOSSIER=self.dossier.name,
+            REGISTRE_IMPRESSION_DOSSIER_PAGES=Path(self.dossier.name) / "pages",
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_reclamation_unique_et_execution(self):
+        tache = taches.planifier("rebuild_stats")
+        self.assertEqual(taches.reclamer("w1").pk, tache.pk)
+        self.assertIsNone(taches.reclamer("w2"))
+
+        Tache.objects.filter(pk=tache.pk).update(statut="EN_ATTENTE", tentatives=0)
+        self.assertEqual(taches.travailler("w1", une_fois=True), 1)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives, tache.worker), ("TERMINEE", 1, "w1"))
+        self.assertIn("Statistiques reconstruites.", tache.journal)
+        with self.assertRaises(ValueError):
+            taches.planifier("flush")
+
+    def test_progression_et_fichier_par_defaut(self):
+        for prenom in ("Aline", "Bruno", "Chantal"):
+            ActeNaissance.objects.create(personne=creer_personne(prenom=prenom), type_acte="TARDIF")
+        tache = taches.planifier("imprimer_actes", type="TARDIF", processus=1)
+        taches.travailler("w1", une_fois=True)
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, "TERMINEE", tache.erreur)
+        self.assertEqual((tache.progression_faits, tache.progression_total, tache.pourcentage), (3, 3, 100))
+        self.assertTrue(Path(self.dossier.name, f"tache-{tache.pk}-imprimer_actes.html").exists())
+
+    def test_nouvel_essai_puis_echec(self):
+        tache = taches.planifier("export_registre", sortie="/inexistant/export.csv", tentatives_max=2)
+        with self.assertLogs("personnes.taches", "WARNING"):
+            taches.travailler("w1", une_fois=True)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("EN_ATTENTE", 1))
+        self.assertGreater(tache.executer_apres, timezone.now())
+        self.assertIn("FileNotFoundError", tache.erreur)
+
+        Tache.objects.filter(pk=tache.pk).update(executer_apres=timezone.now())
+        with self.assertLogs("personnes.taches", "WARNING"):
+            taches.travailler("w1", une_fois=True)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("ECHOUEE", 2))
+
+        # Erreur de paramètres : pas de nouvel essai
+        for arguments, options in ((("rebuild_stats",), {"taille": 10}), (("verifier_registre", "en-trop"), {})):
+            tache = taches.planifier(*arguments, **options)
+            with self.assertLogs("personnes.taches", "WARNING"):
+                taches.travailler("w1", une_fois=True)
+            tache.refresh_from_db()
+            self.assertEqual((tache.statut, tache.tentatives, tache.tentatives_max), ("ECHOUEE", 1, 3))
+        self.assertIn("Options inconnues pour rebuild_stats : taille", Tache.objects.get(commande="rebuild_stats").erreur)
+
+        # Import non idempotent : un seul essai, quoi que demande l'appelant
+        tache = taches.planifier("import_registre", "/inexistant.csv", tentatives_max=3)
+        self.assertEqual(tache.tentatives_max, 1)
+
+    def test_tache_abandonnee_remise_en_file(self):
+        tache = taches.planifier("rebuild_stats", tentatives_max=1)
+        autre = taches.planifier("rebuild_analytique")
+        taches.reclamer("w1")
+        taches.reclamer("w1")
+        Tache.objects.update(date_signe_vie=timezone.now() - timedelta(hours=1))
+        self.assertEqual(taches.relancer_abandonnees(), 2)
+        tache.refresh_from_db()
+        autre.refresh_from_db()
+        self.assertEqual((tache.statut, autre.statut), ("ECHOUEE", "EN_ATTENTE"))
+
+    def test_page_des_taches(self):
+        agent = User.objects.create_user("agent", password="x")
+        self.client.force_login(agent)
+        self.assertEqual(self.client.post(reverse("taches"), {"commande": "rebuild_stats"}).status_code, 403)
+
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        self.client.post(reverse("taches"), {"commande": "rebuild_analytique"})
+        reponse = self.client.get(reverse("taches"))
+        self.assertContains(reponse, "Reconstruction des agrégats démographiques")
+        self.assertContains(reponse, 'http-equiv="refresh"')
+        self.assertContains(self.client.get(reverse("dashboard")), reverse("taches"))
+
+        # Trace d'erreur réservée aux comptes staff
+        Tache.objects.update(statut="ECHOUEE", erreur="Traceback: secret")
+        self.assertContains(self.client.get(reverse("taches")), "Traceback: secret")
+        self.client.force_login(agent)
+        reponse = self.client.get(reverse("taches"))
+        self.assertNotContains(reponse, "Traceback: secret")
+        self.assertContains(reponse, "réservés aux administrateurs")
+
+
+class SigneDeVieTests(TransactionTestCase):
+    @override_settings(REGISTRE_TACHES_PERIODE_SIGNE_VIE=0.05)
+    def test_signe_de_vie_sans_sortie(self):
+        tache = taches.planifier("rebuild_stats")
+        tache = taches.reclamer("w1")
+        ancien = timezone.now() - timedelta(hours=1)
+        Tache.objects.filter(pk=tache.pk).update(date_signe_vie=ancien)
+
+        signe_de_vie = taches.SigneDeVie(tache, 0.05)
+        signe_de_vie.start()
+        time.sleep(0.3)
+        signe_de_vie.arreter()
+        tache.refresh_from_db()
+        self.assertGreater(tache.date_signe_vie, ancien + timedelta(minutes=59))
+        self.assertEqual(taches.relancer_abandonnees(), 0)
+
+
+def entree_api(reponse):
+    return [(c["modele"], c["id"], c["operation"]) for c in reponse.json()["changements"]]
+
+
+@override_settings(REGISTRE_FLUX_RECUL=0)
+class FluxChangementsTests(TestCase):
+    def setUp(self):
+        self.miroir = User.objects.create_user("miroir-kasai", password="secret")
+        self.miroir.user_permissions.add(Permission.objects.get(codename="view_personne"))
+        jeton = base64.b64encode(b"miroir-kasai:secret").decode()
+        self.entetes = {"HTTP_AUTHORIZATION": f"Basic {jeton}"}
+
+    def lire(self, **parametres):
+        return self.client.get(reverse("api_flux"), parametres, **self.entetes)
+
+    def test_instantane_puis_changements_compactes(self):
+        naissance = creer_personne()
+        acte = ActeNaissance.objects.create(personne=naissance)
+        adulte = creer_personne(type_enregistrement="ADULTE", prenom="Paul", date_naissance=date(1990, 5, 1))
+
+        premiere = self.lire(limite=1)
+        self.assertEqual(premiere.json()["phase"], "instantane")
+        self.assertEqual(entree_api(premiere), [("PERSONNE", naissance.pk, "ECRITURE"), ("ACTE", acte.pk, "ECRITURE")])
+        seconde = self.lire(limite=1, curseur=premiere.json()["curseur"])
+        self.assertEqual(entree_api(seconde), [("PERSONNE", adulte.pk, "ECRITURE")])
+        curseur = self.lire(limite=1, curseur=seconde.json()["curseur"]).json()["curseur"]
+        page = self.lire(curseur=curseur).json()
+        self.assertEqual((page["phase"], page["changements"], page["fin"]), ("changements", [], True))
+
+        naissance.adresse_actuelle = "Kananga"
+        naissance.save()
+        naissance.save()
+        Personne.objects.filter(pk=adulte.pk).delete()
+        personnes, actes = enregistrer_lot(
+            [Personne(nom="Ilunga", prenom="Aline", sexe="F", date_naissance=date(2000, 1, 1))], "ADULTE", type_acte="TARDIF",
+        )
+        reponse = self.lire(curseur=page["curseur"])
+        self.assertEqual(entree_api(reponse), [
+            ("PERSONNE", naissance.pk, "ECRITURE"),
+            ("PERSONNE", adulte.pk, "SUPPRESSION"),
+            ("PERSONNE", personnes[0].pk, "ECRITURE"),
+            ("ACTE", actes[0].pk, "ECRITURE"),
+        ])
+        self.assertEqual(reponse.json()["changements"][0]["donnees"]["adresse_actuelle"], "Kananga")
+        self.assertEqual(self.lire(curseur=reponse.json()["curseur"]).json()["changements"], [])
+
+        with override_settings(REGISTRE_FLUX_RECUL=3600):
+            naissance.save()
+            self.assertEqual(self.lire(curseur=reponse.json()["curseur"]).json()["changements"], [])
+        self.assertEqual(self.lire(curseur="pas-un-curseur").status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_flux")).status_code, 401)
+
+    def test_appliquer_reconstruit_le_miroir(self):
+        mere = creer_personne(prenom="Marie", sexe="F", date_naissance=date(1990, 1, 1), type_enregistrement="ADULTE")
+        enfant = creer_personne(mere=mere)
+        ActeNaissance.objects.create(personne=enfant, lieu_etablissement="Kananga")
+        source = list(Personne.objects.order_by("pk").values())
+        pages, curseur = [], None
+        while not pages or pages[-1]["fin"] is False:
+            pages.append(flux.page(curseur, limite=1))
+            curseur = pages[-1]["curseur"]
+
+        # Miroir vide : les pages recréent fiches, acte et lien de filiation à l'identique
+        Personne.objects.all().delete()
+        for page in pages:
+            flux.appliquer(json.loads(json.dumps(page))["changements"])
+        self.assertEqual(list(Personne.objects.order_by("pk").values()), source)
+        self.assertEqual(ActeNaissance.objects.get().lieu_etablissement, "Kananga")
+        self.assertEqual(statistiques.lire().total_actes, 1)
+        self.assertEqual(
+            {champ: getattr(statistiques.lire(), champ) for champ in statistiques.CHAMPS_TOTAUX},
+            statistiques.calculer(),
+        )
+        self.assertEqual(sum(AgregatNaissances.objects.values_list("naissances", flat=True)), 2)
+
+        flux.appliquer([{"modele": "PERSONNE", "id": enfant.pk, "id_personne": enfant.pk, "operation": "SUPPRESSION"}])
+        self.assertEqual(list(Personne.objects.values_list("pk", flat=True)), [mere.pk])
+        self.assertEqual(statistiques.lire().total_actes, 0)
+        self.assertEqual(sum(AgregatNaissances.objects.values_list("naissances", flat=True)), 1)
+
+    def test_page_porte_les_parents_enregistres_apres_l_enfant(self):
+        enfant = creer_personne()
+        pere = creer_personne(prenom="Jean", date_naissance=date(1980, 2, 3), type_enregistrement="ADULTE")
+        grand_pere = creer_personne(prenom="Jean", date_naissance=date(1950, 2, 3), type_enregistrement="ADULTE")
+        Personne.objects.filter(pk=pere.pk).update(pere=grand_pere)
+        Personne.objects.filter(pk=enfant.pk).update(pere=pere)
+        source = list(Personne.objects.order_by("pk").values())
+
+        pages, curseur = [], None
+        while not pages or pages[-1]["fin"] is False:
+            pages.append(flux.page(curseur, limite=1))
+            curseur = pages[-1]["curseur"]
+        self.assertEqual(
+            [c["id"] for c in pages[0]["changements"]], [pere.pk, grand_pere.pk, enfant.pk],
+        )
+
+        # Miroir vide, chaque page appliquée seule : clés étrangères valides après chacune
+        Personne.objects.all().delete()
+        for page in pages:
+            flux.appliquer(json.loads(json.dumps(page))["changements"])
+            connection.check_constraints()
+        self.assertEqual(list(Personne.objects.order_by("pk").values()), source)
+
+
+@override_settings(REGISTRE_FLUX_RECUL=0)
+class PullChangesTests(LiveServerTestCase):
+    def test_pull_changes_reprend_au_curseur(self):
+        miroir = User.objects.create_user("miroir-kasai", password="secret")
+        miroir.user_permissions.add(Permission.objects.get(codename="view_personne"))
+        for prenom in ("Aline", "Bruno", "Carine"):
+            creer_personne(prenom=prenom)
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        etat = Path(dossier.name) / "miroir.json"
+        commande = ["pull_changes", self.live_server_url + reverse("api_flux"), "--utilisateur", "miroir-kasai",
+                    "--mot-de-passe", "secret", "--etat", str(etat), "--limite", "2"]
+
+        sortie = io.StringIO()
+        call_command(*commande, stdout=sortie)
+        self.assertIn("3 écritures et 0 suppressions", sortie.getvalue())
+        curseur = json.loads(etat.read_text())["curseur"]
+        self.assertEqual(flux.lire_curseur(curseur), {"s": Changement.objects.latest("pk").pk})
+
+        Personne.objects.filter(prenom="Bruno").delete()
+        sortie = io.StringIO()
+        call_command(*commande, stdout=sortie)
+        self.assertIn("0 écritures et 1 suppressions", sortie.getvalue())
+
+        with self.assertRaisesMessage(CommandError, "401"):
+            call_command(*commande[:-4], "--mot-de-passe", "faux", "--etat", str(etat), stdout=io.StringIO())
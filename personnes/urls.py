@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     # Authentification
@@ -18,4 +18,14 @@ urlpatterns = [
     path("citoyen/<int:personne_id>/acte-naissance/", views.acte_naissance_view, name="acte_naissance"),
     path("citoyen/<int:personne_id>/etablir-acte-naissance/", views.etablir_acte_naissance, name="etablir_acte_naissance"),
     path("stats/", views.stats_view, name="stats"),
+    path("stats/tendances/", views.tendances_view, name="tendances"),
+    path("export/", views.export_registre, name="export_registre"),
+    path("metriques/", views.metriques_view, name="metriques"),
+    path("taches/", views.taches_view, name="taches"),
+
+    # API partenaires
+    path("api/verification/", api.verification_identites, name="api_verification"),
+    path("api/analytique/naissances/", api.series_naissances, name="api_series_naissances"),
+    path("api/synchronisation/", api.synchronisation_bureau, name="api_synchronisation"),
+    path("api/flux/", api.flux_changements, name="api_flux"),
 ]
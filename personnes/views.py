@@ -1,11 +1,25 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+import hmac
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import logout, login
 from django.contrib.auth.forms import AuthenticationForm
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.urls import reverse
+from django.utils.http import http_date
 
 from .forms import PersonneForm, RecherchePersonneForm
-from .models import Personne, ActeNaissance
+from .models import ActeNaissance, Personne, Tache
+from .numerotation import NumeroNationalEpuise
+from .recherche import paliers_recherche, rechercher_personnes
+from .pagination import apaginer_par_paliers, acompter_avec_plafond
 from .audit import log_audit
+from .routage import alias_lecture, lecture_seule
+from . import statistiques, analytique, taches, cache_actes, consultation, export, doublons, metriques
 
 
 @login_required
@@ -13,6 +27,16 @@ def dashboard(request):
     return render(request, "dashboard.html")
 
 
+def _doublons_a_confirmer(request, personne):
+    """
+    Doublons probables de la saisie, sauf si l'agent a déjà confirmé qu'il s'agit
+    d'une autre personne (champ caché confirmer_doublon renvoyé par le formulaire).
+    """
+    if request.POST.get("confirmer_doublon"):
+        return []
+    return doublons.doublons_probables(personne)
+
+
 @login_required
 def nouvelle_naissance(request):
     """
@@ -24,7 +48,14 @@ def nouvelle_naissance(request):
         if form.is_valid():
             personne = form.save(commit=False)
             personne.type_enregistrement = "NAISSANCE"
-            personne.save()
+            candidats = _doublons_a_confirmer(request, personne)
+            if candidats:
+                return render(request, "naissance_form.html", {"form": form, "doublons": candidats})
+            try:
+                personne.save()
+            except NumeroNationalEpuise as exc:
+                form.add_error(None, str(exc))
+                return render(request, "naissance_form.html", {"form": form})
 
             # Créer l'acte NORMAL (évite doublon si déjà existant)
             acte, created = ActeNaissance.objects.get_or_create(
@@ -42,7 +73,8 @@ def nouvelle_naissance(request):
                 action="CREATION_NAISSANCE",
                 personne=personne,
                 acte=acte,
-                details="Création d'une naissance avec acte automatique",
+                details="Création d'une naissance avec acte automatique"
+                + (" (doublon probable écarté par l'agent)" if request.POST.get("confirmer_doublon") else ""),
             )
 
             return render(
@@ -67,14 +99,22 @@ def nouvel_adulte(request):
         if form.is_valid():
             personne = form.save(commit=False)
             personne.type_enregistrement = "ADULTE"
-            personne.save()
+            candidats = _doublons_a_confirmer(request, personne)
+            if candidats:
+                return render(request, "adulte_form.html", {"form": form, "doublons": candidats})
+            try:
+                personne.save()
+            except NumeroNationalEpuise as exc:
+                form.add_error(None, str(exc))
+                return render(request, "adulte_form.html", {"form": form})
 
             # Journal d'audit
             log_audit(
                 request,
                 action="CREATION_ADULTE",
                 personne=personne,
-                details="Enregistrement adulte (recensement)",
+                details="Enregistrement adulte (recensement)"
+                + (" (doublon probable écarté par l'agent)" if request.POST.get("confirmer_doublon") else ""),
             )
 
             return redirect("detail_citoyen", personne_id=personne.id)
@@ -89,20 +129,22 @@ def etablir_acte_naissance(request, personne_id):
     """
     Établissement d'un acte de naissance tardif pour un adulte
     """
-    personne = get_object_or_404(Personne, id=personne_id)
+    personne = consultation.obtenir_personne_ou_404(personne_id)
 
     # Si l'acte existe déjà, on redirige simplement
-    acte = ActeNaissance.objects.filter(personne=personne).first()
-    if acte:
+    if consultation.acte_de(personne):
         return redirect("acte_naissance", personne_id=personne.id)
 
-    # Création de l'acte tardif
-    acte = ActeNaissance.objects.create(
-        personne=personne,
-        lieu_etablissement="Commune de Démonstration",
-        officier="Officier de l'état civil (démo)",
-        type_acte="TARDIF",
-    )
+    # Création de l'acte tardif (la contrainte OneToOne protège d'un double établissement)
+    try:
+        acte = ActeNaissance.objects.create(
+            personne=personne,
+            lieu_etablissement="Commune de Démonstration",
+            officier="Officier de l'état civil (démo)",
+            type_acte="TARDIF",
+        )
+    except IntegrityError:
+        return redirect("acte_naissance", personne_id=personne.id)
 
     # Journal d'audit
     log_audit(
@@ -116,47 +158,67 @@ def etablir_acte_naissance(request, personne_id):
     return redirect("acte_naissance", personne_id=personne.id)
 
 
+async def _charger_utilisateur(request):
+    """
+    Résout request.user avant le rendu : dans une vue asynchrone, le gabarit ne peut pas
+    déclencher la requête paresseuse de l'utilisateur (context processor auth).
+    """
+    request.user = await request.auser()
+
+
 @login_required
-def recherche_citoyen(request):
+@lecture_seule
+async def recherche_citoyen(request):
     """
-    Recherche d'un citoyen
+    Recherche d'un citoyen (clés de noms normalisées, voir personnes.recherche)
+    → résultats paginés par curseur, total compté jusqu'à un plafond (ORM asynchrone)
     """
     form = RecherchePersonneForm(request.GET or None)
-    resultats = None
+    contexte = {"form": form, "resultats": None}
 
     if form.is_valid():
         data = form.cleaned_data
         if any(data.values()):
-            qs = Personne.objects.all()
+            page = await apaginer_par_paliers(paliers_recherche(data), request.GET.get("curseur"), _taille_page(request))
+            total, total_plafonne = await acompter_avec_plafond(
+                rechercher_personnes(data), settings.REGISTRE_RECHERCHE_PLAFOND_COMPTAGE
+            )
 
-            if data.get("numero_national"):
-                qs = qs.filter(numero_national__icontains=data["numero_national"])
-            if data.get("nom"):
-                qs = qs.filter(nom__icontains=data["nom"])
-            if data.get("postnom"):
-                qs = qs.filter(postnom__icontains=data["postnom"])
-            if data.get("prenom"):
-                qs = qs.filter(prenom__icontains=data["prenom"])
-            if data.get("date_naissance"):
-                qs = qs.filter(date_naissance=data["date_naissance"])
+            params = request.GET.copy()
+            params.pop("curseur", None)
+            contexte.update({
+                "resultats": page.elements,
+                "total": total,
+                "total_plafonne": total_plafonne,
+                "url_premiere_page": f"?{params.urlencode()}" if request.GET.get("curseur") else None,
+            })
+            if page.a_suivante:
+                params["curseur"] = page.curseur_suivant
+                contexte["url_page_suivante"] = f"?{params.urlencode()}"
 
-            resultats = qs.order_by("nom", "postnom", "prenom")
+    await _charger_utilisateur(request)
+    return render(request, "recherche_citoyen.html", contexte)
 
-    return render(
-        request,
-        "recherche_citoyen.html",
-        {"form": form, "resultats": resultats},
-    )
+
+def _taille_page(request):
+    try:
+        taille = int(request.GET.get("taille", settings.REGISTRE_RECHERCHE_TAILLE_PAGE))
+    except ValueError:
+        taille = settings.REGISTRE_RECHERCHE_TAILLE_PAGE
+    return max(1, min(taille, settings.REGISTRE_RECHERCHE_TAILLE_PAGE_MAX))
 
 
 @login_required
-def detail_citoyen(request, personne_id):
+@lecture_seule
+async def detail_citoyen(request, personne_id):
     """
     Fiche citoyenne
+    → personne et acte lus en une requête, via le cache de consultation
     """
-    personne = get_object_or_404(Personne, id=personne_id)
-    acte = ActeNaissance.objects.filter(personne=personne).first()
+    personne = await consultation.aobtenir_personne_ou_404(personne_id)
+    acte = consultation.acte_de(personne)
 
+    await _charger_utilisateur(request)
     return render(
         request,
         "citoyen_detail.html",
@@ -165,43 +227,173 @@ def detail_citoyen(request, personne_id):
 
 
 @login_required
-def acte_naissance_view(request, personne_id):
+@lecture_seule
+async def acte_naissance_view(request, personne_id):
     """
     Affiche l'acte de naissance officiel.
+    → fiche et acte relus en base (jamais la fiche du cache de consultation, éventuellement
+      périmée dans ce processus), rendu mis en cache (personnes.cache_actes), réponses
+      conditionnelles ETag / Last-Modified
     """
-    personne = get_object_or_404(Personne, id=personne_id)
-    acte = get_object_or_404(ActeNaissance, personne=personne)
+    personne = await consultation.aobtenir_personne_ou_404(personne_id, frais=True)
+    acte = consultation.acte_de(personne)
+    if acte is None:
+        raise Http404("Aucun acte de naissance pour ce citoyen.")
+
+    etag, derniere_modification = cache_actes.version(personne, acte)
+    reponse = get_conditional_response(
+        request, etag=etag, last_modified=int(derniere_modification.timestamp())
+    )
+    if reponse is None:
+        reponse = HttpResponse(await cache_actes.arendre(personne, acte))
 
-    contexte = {
-        "personne": personne,
-        "acte": acte,
-    }
-    return render(request, "acte_naissance.html", contexte)
+    reponse["ETag"] = etag
+    reponse["Last-Modified"] = http_date(derniere_modification.timestamp())
+    # Page réservée aux agents connectés : revalidation systématique, jamais de cache partagé
+    patch_cache_control(reponse, private=True, no_cache=True)
+    patch_vary_headers(reponse, ["Cookie"])
+    return reponse
 
 
 @login_required
-def stats_view(request):
+@lecture_seule
+async def stats_view(request):
     """
     Vue pour afficher les statistiques du registre.
+    → lit la ligne d'agrégats tenue à jour à chaque écriture (personnes.statistiques)
     """
-    total_citoyens = Personne.objects.count()
-    total_naissances = Personne.objects.filter(type_enregistrement="NAISSANCE").count()
-    total_adultes = Personne.objects.filter(type_enregistrement="ADULTE").count()
-    total_actes = ActeNaissance.objects.count()
-    actes_normaux = ActeNaissance.objects.filter(type_acte="NORMAL").count()
-    actes_tardifs = ActeNaissance.objects.filter(type_acte="TARDIF").count()
+    stats = await statistiques.alire()
 
     contexte = {
-        "total_citoyens": total_citoyens,
-        "total_naissances": total_naissances,
-        "total_adultes": total_adultes,
-        "total_actes": total_actes,
-        "actes_normaux": actes_normaux,
-        "actes_tardifs": actes_tardifs,
+        "total_citoyens": stats.total_citoyens,
+        "total_naissances": stats.total_naissances,
+        "total_adultes": stats.total_adultes,
+        "total_actes": stats.total_actes,
+        "actes_normaux": stats.actes_normaux,
+        "actes_tardifs": stats.actes_tardifs,
+        "date_mise_a_jour": stats.date_mise_a_jour,
     }
+    await _charger_utilisateur(request)
     return render(request, "stats.html", contexte)
 
 
+@login_required
+@lecture_seule
+async def tendances_view(request):
+    """
+    Séries démographiques : naissances, actes et délais d'établissement par période.
+    → ne lit que les agrégats précalculés (personnes.analytique)
+    Paramètres GET : ceux de l'API (granularite, par, depuis, jusqua, filtres par dimension).
+    """
+    saisie = request.GET.copy()
+    saisie.setdefault("granularite", "annee")
+    saisie.setdefault("par", "sexe")
+    try:
+        parametres = analytique.lire_parametres(saisie)
+    except ValueError as erreur:
+        return HttpResponseBadRequest(str(erreur))
+
+    maximum = settings.REGISTRE_ANALYTIQUE_LIGNES_MAX
+    granularite = parametres["granularite"]
+    lignes = [
+        analytique.mettre_en_forme(ligne, granularite)
+        async for ligne in analytique.series(**parametres)[:maximum + 1]
+    ]
+    for ligne in lignes:
+        ligne["valeurs_dimensions"] = [ligne[dimension] for dimension in parametres["par"]]
+    contexte = {
+        "lignes": lignes[:maximum],
+        "tronque": len(lignes) > maximum,
+        "maximum": maximum,
+        "saisie": saisie,
+        "dimensions": parametres["par"],
+        "choix_granularites": analytique.GRANULARITES,
+        "choix_dimensions": analytique.DIMENSIONS,
+        "url_api": f"{reverse('api_series_naissances')}?{saisie.urlencode()}",
+    }
+    await _charger_utilisateur(request)
+    return render(request, "tendances.html", contexte)
+
+
+@login_required
+@permission_required("personnes.view_personne", raise_exception=True)
+@lecture_seule
+def export_registre(request):
+    """
+    Export du registre en flux (CSV ou JSONL, gzip optionnel), sans charger le queryset en mémoire.
+    Paramètres GET : format, type, ne_depuis, ne_jusqua, modifie_depuis, gzip=1
+    """
+    format_export = request.GET.get("format", "csv")
+    if format_export not in export.FORMATS:
+        return HttpResponseBadRequest(f"Format inconnu : {format_export}")
+    try:
+        filtres = export.filtres_depuis_parametres(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    # Le flux est lu après le retour de la vue : la base de lecture est fixée ici
+    queryset = Personne.objects.using(alias_lecture())
+    fragments = export.produire(export.iterer_lignes(export.filtrer(**filtres, queryset=queryset)), format_export)
+    nom_fichier = f"registre_{timezone.now():%Y%m%d_%H%M%S}.{format_export}"
+    if request.GET.get("gzip") == "1":
+        reponse = StreamingHttpResponse(export.compresser(fragments), content_type="application/gzip")
+        nom_fichier += ".gz"
+    else:
+        type_contenu = "text/csv" if format_export == "csv" else "application/x-ndjson"
+        reponse = StreamingHttpResponse(fragments, content_type=f"{type_contenu}; charset=utf-8")
+    reponse["Content-Disposition"] = f'attachment; filename="{nom_fichier}"'
+
+    log_audit(
+        request,
+        action="EXPORT_REGISTRE",
+        details=f"Export {format_export} : " + ", ".join(f"{cle}={valeur}" for cle, valeur in filtres.items() if valeur),
+    )
+    return reponse
+
+
+TACHES_AFFICHEES = 50
+
+
+@login_required
+def taches_view(request):
+    """
+    État de la file des tâches de fond (personnes.taches) : dernières tâches, progression,
+    erreurs (trace complète pour les comptes staff seulement). Les comptes staff peuvent
+    y lancer les reconstructions sans paramètre.
+    """
+    if request.method == "POST":
+        if not request.user.is_staff:
+            return HttpResponseForbidden("Réservé aux administrateurs.")
+        commande = request.POST.get("commande")
+        if commande not in taches.COMMANDES_DIRECTES:
+            return HttpResponseBadRequest(f"Commande inconnue : {commande}")
+        tache = taches.planifier(commande, user=request.user)
+        log_audit(request, action="PLANIFICATION_TACHE", details=f"Tâche {tache.pk} : {commande}")
+        return redirect("taches")
+
+    liste = list(Tache.objects.select_related("demandee_par").order_by("-id")[:TACHES_AFFICHEES])
+    for tache in liste:
+        tache.libelle = taches.COMMANDES.get(tache.commande, tache.commande)
+    return render(request, "taches.html", {
+        "taches": liste,
+        "actives": any(tache.statut in ("EN_ATTENTE", "EN_COURS") for tache in liste),
+        "commandes_directes": [(commande, taches.COMMANDES[commande]) for commande in taches.COMMANDES_DIRECTES],
+    })
+
+
+def metriques_view(request):
+    """
+    Métriques de performance au format texte Prometheus.
+    Accès : jeton REGISTRE_METRIQUES_JETON (collecteur) ou compte staff connecté.
+    """
+    jeton = settings.REGISTRE_METRIQUES_JETON
+    fourni = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ").strip()
+    autorise = (jeton and fourni and hmac.compare_digest(fourni, jeton)) or request.user.is_staff
+    if not autorise:
+        return HttpResponseForbidden("Accès aux métriques refusé.")
+    return HttpResponse(metriques.registre.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def login_view(request):
     # Si déjà connecté, aller au dashboard
     if request.user.is_authenticated:
@@ -3,6 +3,8 @@ ASGI config for registre_national project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Profil de déploiement (gunicorn + workers uvicorn) : deploiement/gunicorn_asgi.conf.py
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
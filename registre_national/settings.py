@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,8 +42,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En premier : la mesure couvre tous les autres middlewares
+    'personnes.middleware.MetriquesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Lectures sur réplique / primaire après écriture (après les sessions)
+    'personnes.middleware.RoutageMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -54,7 +59,8 @@ ROOT_URLCONF = 'registre_national.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates dont le temps de rendu est compté par personnes.metriques
+        'BACKEND': 'personnes.metriques.GabaritsMesures',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,11 +82,63 @@ WSGI_APPLICATION = 'registre_national.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # REGISTRE_DB_CHEMIN : base alternative (ex. bases de banc d'essai, voir manage.py banc_essai)
+        'NAME': os.environ.get('REGISTRE_DB_CHEMIN', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # BEGIN IMMEDIATE : le verrou d'écriture est pris dès l'ouverture de la transaction,
+            # les workers concurrents attendent leur tour au lieu d'échouer en "database is locked".
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Base de test sur fichier : les tests multi-threads ont besoin de vraies connexions
+        # concurrentes (une base en mémoire partagée lève "table is locked" sans attendre).
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'registre-defaut',
+    },
+    # Fiches citoyennes (personnes.consultation) : éviction LRU au-delà de MAX_ENTRIES.
+    # Le TIMEOUT borne la durée d'une fiche périmée dans les autres workers ;
+    # avec un cache partagé (Memcached, Redis) il peut être allongé.
+    'citoyens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'registre-citoyens',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+}
+
+
+# Répliques en lecture : chemins SQLite séparés par des virgules, copies de la base primaire
+# tenues à jour par la réplication (Litestream, LiteFS...), ouvertes en lecture seule.
+# Ex. en local : cp db.sqlite3 replique.sqlite3 && REGISTRE_DB_REPLIQUES=replique.sqlite3 python manage.py runserver
+for numero, chemin in enumerate(filter(None, os.environ.get('REGISTRE_DB_REPLIQUES', '').split(',')), start=1):
+    DATABASES[f'replique_{numero}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{Path(chemin.strip()).resolve()}?mode=ro',
+        'OPTIONS': {'timeout': 20},
+        # Pendant les tests, la réplique est un miroir de la base de test
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REGISTRE_DB_REPLIQUES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['personnes.routage.RoutageLectureEcriture']
+# Durée (secondes) pendant laquelle une session qui vient d'écrire relit sur la primaire
+REGISTRE_FENETRE_PRIMAIRE = 10
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -123,6 +181,65 @@ LOGIN_REDIRECT_URL = "/dashboard/"
 LOGOUT_REDIRECT_URL = "/login/"
 
 
-
-
-
+# Recherche de citoyens : pagination par curseur
+REGISTRE_RECHERCHE_TAILLE_PAGE = 50
+REGISTRE_RECHERCHE_TAILLE_PAGE_MAX = 200
+# Au-delà, la page affiche "plus de N résultats" au lieu de compter toutes les lignes
+REGISTRE_RECHERCHE_PLAFOND_COMPTAGE = 1000
+
+# Admin : listes filtrées comptées jusqu'à ce plafond (listes complètes : total estimé)
+REGISTRE_ADMIN_PLAFOND_COMPTAGE = 10000
+
+# Séries démographiques (page Tendances et API) : nombre maximal de lignes par réponse
+REGISTRE_ANALYTIQUE_LIGNES_MAX = 5000
+
+
+# Journal d'audit : "strict" = INSERT dans la requête,
+# "tampon" = écriture différée par lots depuis un thread de fond (voir personnes.audit)
+REGISTRE_AUDIT_MODE = "strict"
+REGISTRE_AUDIT_TAMPON_TAILLE = 200
+REGISTRE_AUDIT_TAMPON_INTERVALLE = 2.0  # secondes
+
+# Archives compressées du journal d'audit (manage.py archive_audit)
+REGISTRE_ARCHIVES_AUDIT_DOSSIER = BASE_DIR / "archives" / "audit"
+
+# Pages rendues par manage.py imprimer_actes, réutilisées d'une impression à l'autre
+REGISTRE_IMPRESSION_DOSSIER_PAGES = BASE_DIR / "cache" / "impression"
+
+# API partenaires : nombre maximal de numéros nationaux par requête de vérification
+REGISTRE_API_VERIFICATION_MAX = 5000
+
+# Synchronisation des bureaux hors ligne (POST /api/synchronisation/, voir personnes.synchronisation)
+# Clé HMAC de chaque bureau : REGISTRE_SYNC_CLES="bureau-kananga:cle1,bureau-tshikapa:cle2"
+REGISTRE_SYNC_CLES = dict(
+    entree.split(":", 1) for entree in filter(None, os.environ.get("REGISTRE_SYNC_CLES", "").split(","))
+)
+# Nombre maximal d'enregistrements par lot
+REGISTRE_SYNC_MAX = 2000
+
+# Tâches de fond (manage.py run_workers, voir personnes.taches)
+# Dossier des fichiers produits quand la tâche n'en précise pas (exports, lots d'impression, rapports)
+REGISTRE_TACHES_DOSSIER = BASE_DIR / "taches"
+# Secondes sans signe de vie après lesquelles une tâche en cours est considérée abandonnée
+REGISTRE_TACHES_DELAI_ABANDON = 900
+# Secondes entre deux signes de vie d'une tâche en cours (thread du worker, même sans sortie)
+REGISTRE_TACHES_PERIODE_SIGNE_VIE = 30
+# Délai avant le premier nouvel essai d'une tâche échouée (doublé à chaque tentative)
+REGISTRE_TACHES_DELAI_NOUVEL_ESSAI = 60
+
+# Flux de changements des miroirs provinciaux (GET /api/flux/, manage.py pull_changes, voir personnes.flux)
+# Changements par page (défaut et maximum demandable)
+REGISTRE_FLUX_TAILLE_PAGE = 1000
+REGISTRE_FLUX_TAILLE_PAGE_MAX = 5000
+# Secondes de recul : les changements plus récents ne sont pas encore servis (sur PostgreSQL,
+# une transaction en cours peut valider une séquence inférieure à une séquence déjà visible)
+REGISTRE_FLUX_RECUL = 5
+
+# Détection des doublons : score à partir duquel la saisie demande une confirmation
+REGISTRE_DOUBLONS_SEUIL_ALERTE = 0.85
+
+# Métriques de performance (endpoint /metriques/ au format Prometheus)
+# Jeton "Authorization: Bearer ..." du collecteur ; sans jeton, seuls les comptes staff y accèdent.
+REGISTRE_METRIQUES_JETON = os.environ.get("REGISTRE_METRIQUES_JETON", "")
+# Les requêtes plus longues (secondes) sont journalisées avec leurs requêtes SQL les plus lentes
+REGISTRE_METRIQUES_SEUIL_LENT = 1.0